@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Ensure repo root is on sys.path when this file is executed directly.
+repo_root = Path(__file__).resolve().parents[1]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.config import load_app_config
+from src.embeddings.embedder import Embedder
+from src.retrieval.cross_encoder_reranker import CrossEncoderReranker
+from src.retrieval.retriever import RetrievedChunk, Retriever
+from src.utils.jsonl import iter_jsonl
+
+DEFAULT_DATASETS = ("eval/manual.jsonl", "eval_v2/*.jsonl")
+MODES = ("dense", "bm25", "hybrid")
+PERCENTILES = (50, 95, 99)
+STAGES = ("retrieve", "dense", "bm25", "rerank", "total")
+
+
+def _resolve_datasets(patterns: Sequence[str]) -> List[Path]:
+    """Expand globs relative to the repo root; run outputs (*_results.jsonl) are skipped."""
+    out: List[Path] = []
+    for pattern in patterns:
+        matches = sorted(repo_root.glob(pattern)) if any(ch in pattern for ch in "*?[") else [repo_root / pattern]
+        out.extend(p for p in matches if p.exists() and not p.name.endswith("_results.jsonl"))
+    return out
+
+
+def _load_queries(paths: Sequence[Path]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for path in paths:
+        for rec in iter_jsonl(path):
+            if not str(rec.get("query") or "").strip():
+                continue
+            ref = rec.get("reference") or {}
+            rows.append(
+                {
+                    "dataset": str(path.relative_to(repo_root)),
+                    "id": rec.get("id"),
+                    "query": str(rec["query"]),
+                    "gold_chunks": set(ref.get("support_chunk_ids") or []),
+                    "gold_docs": set(ref.get("support_doc_ids") or []),
+                }
+            )
+    return rows
+
+
+def _hit_chunk_ids(hit: RetrievedChunk) -> set[str]:
+    """The hit plus any near-duplicate chunks folded into it at build time."""
+    aliases = (hit.meta or {}).get("aliases") or []
+    return {hit.chunk_id, *(a["chunk_id"] for a in aliases)}
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    arr = np.asarray(values, dtype=np.float64)
+    return {f"p{p}": round(float(np.percentile(arr, p)), 3) for p in PERCENTILES}
+
+
+def _quality(rows: List[Dict[str, Any]], ranked: List[List[RetrievedChunk]], ks: Sequence[int]) -> Dict[str, Any]:
+    """recall@k (chunk level), doc hit@k and MRR over rows with reference labels."""
+    labelled = [(row, hits) for row, hits in zip(rows, ranked) if row["gold_chunks"] or row["gold_docs"]]
+    out: Dict[str, Any] = {"n_labelled": len(labelled)}
+    if not labelled:
+        return out
+    for k in ks:
+        recall, doc_hit = [], []
+        for row, hits in labelled:
+            top = hits[:k]
+            found = set().union(*(_hit_chunk_ids(h) for h in top)) if top else set()
+            if row["gold_chunks"]:
+                recall.append(len(row["gold_chunks"] & found) / len(row["gold_chunks"]))
+            if row["gold_docs"]:
+                doc_hit.append(float(bool(row["gold_docs"] & {h.doc_id for h in top})))
+        out[f"recall@{k}"] = round(float(np.mean(recall)), 4) if recall else None
+        out[f"doc_hit@{k}"] = round(float(np.mean(doc_hit)), 4) if doc_hit else None
+
+    rr = []
+    for row, hits in labelled:
+        rank = next(
+            (
+                i
+                for i, h in enumerate(hits, start=1)
+                if (_hit_chunk_ids(h) & row["gold_chunks"]) or (not row["gold_chunks"] and h.doc_id in row["gold_docs"])
+            ),
+            None,
+        )
+        rr.append(1.0 / rank if rank else 0.0)
+    out["mrr"] = round(float(np.mean(rr)), 4)
+    return out
+
+
+def _run(
+    retriever: Retriever,
+    reranker: Optional[CrossEncoderReranker],
+    rows: List[Dict[str, Any]],
+    *,
+    k: int,
+    warmup: int,
+) -> Dict[str, Any]:
+    fetch_k = max(k, reranker.candidate_k) if reranker is not None else k
+    for row in rows[:warmup]:
+        hits = retriever.retrieve(row["query"], top_k=fetch_k)
+        if reranker is not None:
+            reranker.rerank(row["query"], hits, top_k=k)
+
+    ranked: List[List[RetrievedChunk]] = []
+    latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    for row in rows:
+        trace: Dict[str, Any] = {}
+        t0 = time.perf_counter()
+        hits = retriever.retrieve(row["query"], top_k=fetch_k, trace=trace)
+        t1 = time.perf_counter()
+        if reranker is not None:
+            hits = reranker.rerank(row["query"], hits, top_k=k)
+            latencies["rerank"].append((time.perf_counter() - t1) * 1000)
+        t2 = time.perf_counter()
+        latencies["retrieve"].append((t1 - t0) * 1000)
+        latencies["total"].append((t2 - t0) * 1000)
+        for leg in ("dense", "bm25"):
+            if f"latency_ms_{leg}" in trace:
+                latencies[leg].append(float(trace[f"latency_ms_{leg}"]))
+        ranked.append(list(hits)[:k])
+    return {"ranked": ranked, "latency_ms": {stage: _percentiles(v) for stage, v in latencies.items() if v}}
+
+
+def _markdown(report: Dict[str, Any]) -> str:
+    ks = report["ks"]
+    lines = [
+        f"# Retrieval benchmark: {report['label']}",
+        "",
+        f"- created: {report['created_at']}",
+        f"- index: {report['index']}",
+        f"- embedding model: {report['embedding_model']}",
+        f"- datasets: {', '.join(report['datasets'])} ({report['n_queries']} queries, "
+        f"{report['runs'][0]['overall']['n_labelled'] if report['runs'] else 0} with reference chunks)",
+        "",
+        "| run | " + " | ".join(f"recall@{k}" for k in ks) + " | MRR | "
+        + " | ".join(f"{stage} p50/p95/p99 ms" for stage in STAGES) + " |",
+        "|---|" + "---:|" * (len(ks) + 1 + len(STAGES)),
+    ]
+
+    def fmt(v: Optional[float]) -> str:
+        return "-" if v is None else f"{v:.4f}"
+
+    for run in report["runs"]:
+        q = run["overall"]
+        cells = [fmt(q.get(f"recall@{k}")) for k in ks] + [fmt(q.get("mrr"))]
+        for stage in STAGES:
+            lat = run["latency_ms"].get(stage)
+            cells.append("-" if lat is None else " / ".join(f"{lat[f'p{p}']:.1f}" for p in PERCENTILES))
+        lines.append(f"| {run['run']} | " + " | ".join(cells) + " |")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark retrieval alone (no generation): recall@k, MRR and per-stage latency for "
+            "dense/bm25/hybrid retrieval with and without the cross-encoder."
+        )
+    )
+    parser.add_argument("--config", type=str, default="", help="Config file (default: config.yaml).")
+    parser.add_argument("--datasets", nargs="+", default=list(DEFAULT_DATASETS), help="JSONL files or globs.")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument(
+        "--rerank",
+        choices=("off", "on", "both"),
+        default="both",
+        help="Run without and/or with the cross-encoder (independent of reranker.enabled).",
+    )
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 3, 5, 10], help="Cutoffs for recall@k.")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed queries per run before measuring.")
+    parser.add_argument("--label", type=str, default="", help="Run label used in the output file names.")
+    parser.add_argument("--out-dir", type=str, default="artifacts/retrieval_benchmark")
+    args = parser.parse_args()
+
+    config_path = (repo_root / args.config) if args.config else None
+    cfg, config_path = load_app_config(repo_root, config_path)
+    datasets = _resolve_datasets(args.datasets)
+    rows = _load_queries(datasets)
+    if not rows:
+        raise SystemExit(f"No queries found in {args.datasets}")
+    ks = sorted(set(args.ks))
+    k = ks[-1]
+
+    embedder = Embedder(config_path) if any(m != "bm25" for m in args.modes) else None
+    reranker = (
+        CrossEncoderReranker(repo_root, config_path=config_path, enabled=True) if args.rerank != "off" else None
+    )
+    rerank_options = {"off": [False], "on": [True], "both": [False, True]}[args.rerank]
+
+    index_desc = f"{cfg.index.type}/{cfg.index.storage}"
+    if cfg.index.shards > 1:
+        index_desc += f" x{cfg.index.shards} shards"
+    label = args.label or f"{cfg.index.type}_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}"
+    print(f"[INFO] {len(rows)} queries from {len(datasets)} datasets; index={index_desc}; k={ks}")
+
+    runs: List[Dict[str, Any]] = []
+    for mode in args.modes:
+        retriever = Retriever(repo_root, config_path=config_path, embedder=embedder, mode=mode)
+        try:
+            for use_rerank in rerank_options:
+                name = f"{mode}{' + rerank' if use_rerank else ''}"
+                result = _run(retriever, reranker if use_rerank else None, rows, k=k, warmup=args.warmup)
+                by_dataset = {}
+                for dataset in sorted({r["dataset"] for r in rows}):
+                    idx = [i for i, r in enumerate(rows) if r["dataset"] == dataset]
+                    by_dataset[dataset] = _quality([rows[i] for i in idx], [result["ranked"][i] for i in idx], ks)
+                overall = _quality(rows, result["ranked"], ks)
+                runs.append(
+                    {
+                        "run": name,
+                        "mode": mode,
+                        "rerank": use_rerank,
+                        "overall": overall,
+                        "by_dataset": by_dataset,
+                        "latency_ms": result["latency_ms"],
+                    }
+                )
+                total = result["latency_ms"]["total"]
+                print(
+                    f"[OK] {name:<16} recall@{k}={overall.get(f'recall@{k}')} mrr={overall.get('mrr')} "
+                    f"total p50={total['p50']}ms p95={total['p95']}ms p99={total['p99']}ms"
+                )
+        finally:
+            retriever.close()
+
+    report = {
+        "label": label,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config_path": str(config_path),
+        "index": index_desc,
+        "embedding_model": cfg.embeddings.model_name,
+        "reranker_model": reranker.model_name if reranker is not None else None,
+        "datasets": [str(p.relative_to(repo_root)) for p in datasets],
+        "n_queries": len(rows),
+        "ks": ks,
+        "runs": runs,
+    }
+    out_dir = repo_root / args.out_dir
+    out_dir.mkdir(parents=True, exist_ok=True)
+    json_path = out_dir / f"{label}.json"
+    md_path = out_dir / f"{label}.md"
+    json_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    md_path.write_text(_markdown(report), encoding="utf-8")
+    print(f"[OK] Wrote {json_path} and {md_path}")
+
+
+if __name__ == "__main__":
+    main()
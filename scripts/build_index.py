@@ -1,61 +1,572 @@
 from __future__ import annotations
 
+import argparse
+import shutil
+import time
 from pathlib import Path
-import yaml
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import faiss
+import numpy as np
+
+from src.config import load_app_config
 from src.utils.jsonl import iter_jsonl, write_jsonl
 from src.embeddings.embedder import Embedder
-from src.retrieval.faiss_store import FaissStore
+from src.embeddings.embedding_cache import CachedEmbedder, EmbeddingCache
+from src.embeddings.onnx_backend import embedding_model_id
+from src.embeddings.parallel import EmbedderFactory, ParallelEmbedder
+from src.retrieval.bm25_index import BM25Index, bm25_artifact_dir, tokenize_for_bm25
+from src.retrieval.dedup import dedup_chunks
+from src.retrieval.faiss_store import (
+    FaissStore,
+    base_index,
+    compact_ids,
+    min_training_points,
+    rescore_vectors_path,
+    supports_incremental_update,
+)
+from src.retrieval.index_manifest import (
+    build_settings,
+    diff_docs,
+    doc_fingerprints,
+    index_manifest_path,
+    load_manifest,
+    plan_reorder,
+    write_manifest,
+)
+from src.retrieval.meta_store import meta_columns_dir, write_columnar_meta, write_meta_offsets
+from src.retrieval.neighbours import build_neighbour_table, neighbours_path
+from src.retrieval.shards import shards_dir, write_shards
+from src.retrieval.snapshots import (
+    current_snapshot_id,
+    new_snapshot_id,
+    prune_snapshots,
+    publish_snapshot,
+    snapshots_root,
+    staging_dir,
+)
+from src.retrieval.symbol_index import SymbolIndex, symbol_index_path
 
+# Number of chunk vectors used as probe queries for the ANN recall report.
+RECALL_SAMPLE_SIZE = 1000
+RECALL_KS = (1, 5, 10)
+# Training points per IVF list for streaming builds (FAISS warns below 39).
+IVF_TRAIN_POINTS_PER_LIST = 39
 
-def main():
-    repo_root = Path(__file__).resolve().parents[1]
-    config_path = repo_root / "config.yaml"
 
-    with config_path.open("r", encoding="utf-8") as f:
-        config = yaml.safe_load(f)
+def exact_top_ids(vectors: np.ndarray, queries: np.ndarray, k: int, *, block_size: int = 4096) -> np.ndarray:
+    """
+    Exact inner-product top-k ids, scanning `vectors` (array or memmap) in
+    blocks so the corpus never has to be copied into a second flat index.
+    """
+    heap = faiss.ResultHeap(queries.shape[0], k, keep_max=True)
+    for start in range(0, vectors.shape[0], block_size):
+        block = np.ascontiguousarray(vectors[start : start + block_size], dtype=np.float32)
+        scores = np.ascontiguousarray(queries @ block.T, dtype=np.float32)
+        ids = np.broadcast_to(np.arange(start, start + block.shape[0], dtype=np.int64), scores.shape)
+        heap.add_result(scores, np.ascontiguousarray(ids))
+    heap.finalize()
+    return heap.I
+
+
+def report_ann_recall(index: faiss.Index, vectors: np.ndarray, index_type: str, *, queries: np.ndarray) -> None:
+    """Compare an approximate index against exact search for sample chunk vectors."""
+    for k in RECALL_KS:
+        k = min(k, vectors.shape[0])
+        _, approx_ids = index.search(queries, k)
+        exact_ids = exact_top_ids(vectors, queries, k)
+        found = sum(len(set(e.tolist()) & set(a.tolist())) for e, a in zip(exact_ids, approx_ids))
+        print(f"[INFO] {index_type} recall@{k} vs flat: {found / exact_ids.size:.4f} (queries={queries.shape[0]})")
+
+
+def recall_sample_ids(n: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return np.sort(rng.choice(n, size=min(RECALL_SAMPLE_SIZE, n), replace=False))
 
-    chunks_path = repo_root / "data" / "processed" / "chunks.jsonl"
-    index_path = repo_root / config["index"]["index_path"]
-    meta_path = repo_root / config["index"]["meta_path"]
 
-    # Load chunks
-    chunks = list(iter_jsonl(chunks_path))
-    print(f"[INFO] Loaded {len(chunks)} chunks")
+def meta_record(vector_id: int, c: Dict[str, Any]) -> Dict[str, Any]:
+    """meta.jsonl row for the chunk stored at `vector_id`."""
+    return {
+        "vector_id": vector_id,
+        "chunk_id": c["chunk_id"],
+        "doc_id": c["doc_id"],
+        "module": c["module"],
+        "text": c["text"],
+        "meta": c["meta"],
+        "start_char": c["start_char"],
+        "end_char": c["end_char"],
+        "chunk_index": c["chunk_index"],
+    }
 
-    # Initialize embedder
-    embedder = Embedder(config_path)
 
+def full_build(
+    cfg: Any,
+    embedder: Embedder,
+    chunks: List[Dict[str, Any]],
+    index_path: Path,
+) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """Embed every chunk into a fresh index. Returns chunks in vector_id order and their vectors."""
     texts = [c["text"] for c in chunks]
     embeddings = embedder.encode(texts)
 
     print(f"[INFO] Embeddings shape: {embeddings.shape}")
 
-    # Build FAISS index
+    if cfg.index.dedup_threshold > 0:
+        chunks, embeddings, n_aliases = dedup_chunks(chunks, embeddings, cfg.index.dedup_threshold)
+        print(
+            f"[INFO] Dedup (cosine > {cfg.index.dedup_threshold}): folded {n_aliases} near-duplicate chunks "
+            f"into meta aliases, indexing {len(chunks)} ({n_aliases / max(1, n_aliases + len(chunks)):.1%} smaller)"
+        )
+
+    # Build FAISS index (IndexIDMap2 with id = vector_id, for incremental updates)
+    index_manifest_path(index_path).unlink(missing_ok=True)
     dim = embeddings.shape[1]
-    store = FaissStore(dim)
+    store = FaissStore(dim, index_cfg=cfg.index, id_map=True)
     store.add(embeddings)
     store.save(index_path)
 
-    print(f"[OK] Saved FAISS index to {index_path}")
-
-    # Write metadata aligned by vector row
-    def meta_records():
-        for i, c in enumerate(chunks):
-            yield {
-                "vector_id": i,
-                "chunk_id": c["chunk_id"],
-                "doc_id": c["doc_id"],
-                "module": c["module"],
-                "text": c["text"],
-                "meta": c["meta"],
-                "start_char": c["start_char"],
-                "end_char": c["end_char"],
-                "chunk_index": c["chunk_index"],
-            }
-
-    n = write_jsonl(meta_path, meta_records(), append=False)
-    print(f"[OK] Wrote {n} metadata rows to {meta_path}")
+    print(f"[OK] Saved FAISS index ({cfg.index.type}) to {index_path}")
+
+    if cfg.index.type != "flat" or cfg.index.storage != "float32":
+        queries = embeddings[recall_sample_ids(embeddings.shape[0])]
+        report_ann_recall(store.index, embeddings, f"{cfg.index.type}/{cfg.index.storage}", queries=queries)
+    if cfg.index.type == "ivfpq":
+        ivf = faiss.extract_index_ivf(store.index)
+        print(
+            f"[INFO] ivfpq code_size={ivf.code_size}B/vector "
+            f"(float32 would be {4 * dim}B/vector), file={index_path.stat().st_size}B"
+        )
+    return chunks, embeddings
+
+
+def incremental_build(
+    cfg: Any,
+    embedder: Embedder,
+    chunks: List[Dict[str, Any]],
+    docs: Dict[str, Dict[str, str]],
+    index_path: Path,
+    meta_path: Path,
+) -> Optional[Tuple[List[Dict[str, Any]], np.ndarray]]:
+    """
+    Update the previous build: drop the vectors of changed/removed documents
+    and embed only changed/added documents. Returns chunks in the new
+    vector_id order and their vectors, or None when a full rebuild is required.
+    """
+    if cfg.index.dedup_threshold > 0:
+        # A changed chunk can change which of its duplicates is canonical.
+        print("[INFO] index.dedup_threshold is set; doing a full build")
+        return None
+    manifest = load_manifest(index_manifest_path(index_path))
+    if manifest is None or not index_path.exists() or not meta_path.exists():
+        print("[INFO] No previous build manifest; doing a full build")
+        return None
+    if manifest["settings"] != build_settings(cfg):
+        print("[INFO] Embedding/index settings changed since the last build; doing a full build")
+        return None
+
+    index = FaissStore.load(index_path)
+    if not supports_incremental_update(index):
+        print(f"[INFO] {type(faiss.downcast_index(index)).__name__} cannot remove vectors; doing a full build")
+        return None
+    if int(index.ntotal) != int(manifest["n_vectors"]):
+        print("[INFO] FAISS index does not match the manifest; doing a full build")
+        return None
+
+    changed, removed, added = diff_docs(manifest["docs"], docs)
+    print(f"[INFO] Incremental build: changed={len(changed)} added={len(added)} removed={len(removed)}")
+
+    removed_ids, kept, fresh = plan_reorder(
+        (str(rec["doc_id"]) for rec in iter_jsonl(meta_path)),
+        chunks,
+        changed | added,
+    )
+    index_manifest_path(index_path).unlink()
+    if removed_ids:
+        index.remove_ids(np.asarray(removed_ids, dtype=np.int64))
+        compact_ids(index)
+    if int(index.ntotal) != len(kept):
+        raise ValueError(f"Index/meta mismatch after removal: index.ntotal={index.ntotal} kept={len(kept)}")
+
+    if fresh:
+        embeddings = embedder.encode([c["text"] for c in fresh])
+        start = int(index.ntotal)
+        index.add_with_ids(embeddings, np.arange(start, start + len(fresh), dtype=np.int64))
+
+    faiss.write_index(index, str(index_path))
+    print(
+        f"[OK] Updated FAISS index: removed {len(removed_ids)} vectors, "
+        f"embedded {len(fresh)} chunks, total {index.ntotal}"
+    )
+    # Flat storage is in vector_id order after compaction; reconstruction is exact.
+    return kept + fresh, base_index(index).reconstruct_n(0, int(index.ntotal))
+
+
+def stream_spill_path(index_path: Path) -> Path:
+    """Temporary float32 copy of every vector, for consumers that need them all after a streaming build."""
+    return index_path.parent / "vectors.build.npy"
+
+
+def iter_batches(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for rec in records:
+        batch.append(rec)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_build(
+    cfg: Any,
+    embedder: Embedder,
+    chunks_path: Path,
+    index_path: Path,
+    meta_path: Path,
+    *,
+    batch_size: int,
+) -> Tuple[int, Optional[np.ndarray]]:
+    """
+    Read, embed, index and write meta for `batch_size` chunks at a time, so
+    peak memory is one batch of chunks and vectors instead of the corpus.
+    Vectors that later steps need in full (rescore side file, shards, ANN
+    recall report) are written to .npy memmaps as they are produced.
+
+    IVF indexes are trained first on a uniform sample of chunks (embedded
+    twice) rather than on the whole corpus. Returns the vector count and a
+    read-only float32 memmap of all vectors when shards or the recall report
+    need one, else None.
+    """
+    n_total = sum(1 for _ in iter_jsonl(chunks_path))
+    if n_total == 0:
+        raise ValueError(f"No chunks in {chunks_path}")
+    index_manifest_path(index_path).unlink(missing_ok=True)
+    approx = cfg.index.type != "flat" or cfg.index.storage != "float32"
+    sample_ids = recall_sample_ids(n_total) if approx else np.zeros(0, dtype=np.int64)
+    sample_rows: List[np.ndarray] = []
+
+    store: Optional[FaissStore] = None
+    rescore_out: Optional[np.ndarray] = None
+    spill: Optional[np.ndarray] = None
+    vectors_path = rescore_vectors_path(index_path)
+    write_jsonl(meta_path, [], append=False)
+
+    n = 0
+    for batch in iter_batches(iter_jsonl(chunks_path), batch_size):
+        vectors = embedder.encode([c["text"] for c in batch], show_progress_bar=False)
+        if store is None:
+            dim = vectors.shape[1]
+            store = FaissStore(dim, index_cfg=cfg.index, id_map=True)
+            if min_training_points(store.index):
+                store.train(_training_sample(cfg, embedder, chunks_path, n_total, store.index))
+            if cfg.index.rescore != "none":
+                rescore_out = np.lib.format.open_memmap(
+                    vectors_path, mode="w+", dtype=cfg.index.rescore, shape=(n_total, dim)
+                )
+            if cfg.index.shards > 1 or approx:
+                spill = (
+                    rescore_out
+                    if cfg.index.rescore == "float32"
+                    else np.lib.format.open_memmap(
+                        stream_spill_path(index_path), mode="w+", dtype=np.float32, shape=(n_total, dim)
+                    )
+                )
+
+        end = n + len(batch)
+        store.add(vectors)
+        write_jsonl(meta_path, (meta_record(n + i, c) for i, c in enumerate(batch)), append=True)
+        if rescore_out is not None:
+            rescore_out[n:end] = vectors.astype(cfg.index.rescore)
+        if spill is not None and spill is not rescore_out:
+            spill[n:end] = vectors
+        in_batch = sample_ids[(sample_ids >= n) & (sample_ids < end)]
+        if in_batch.size:
+            sample_rows.append(vectors[in_batch - n])
+        n = end
+        print(f"[INFO] Streamed {n}/{n_total} chunks")
+
+    if n != n_total:
+        raise ValueError(f"chunks.jsonl changed during the build: counted {n_total}, read {n}")
+    for mm in (rescore_out, spill):
+        if mm is not None:
+            mm.flush()
+    store.save(index_path)
+    print(f"[OK] Saved FAISS index ({cfg.index.type}) to {index_path} ({n} vectors, batches of {batch_size})")
+
+    if spill is None:
+        return n, None
+    spill_file = vectors_path if spill is rescore_out else stream_spill_path(index_path)
+    del rescore_out, spill
+    vectors = np.load(spill_file, mmap_mode="r")
+    if approx:
+        label = f"{cfg.index.type}/{cfg.index.storage}"
+        report_ann_recall(store.index, vectors, label, queries=np.concatenate(sample_rows))
+    return n, vectors
+
+
+def _training_sample(
+    cfg: Any,
+    embedder: Embedder,
+    chunks_path: Path,
+    n_total: int,
+    index: faiss.Index,
+) -> np.ndarray:
+    """Embed a uniform sample of chunks for IVF training (~39 points per list, FAISS's lower bound)."""
+    ivf = faiss.extract_index_ivf(index)
+    size = min(n_total, max(min_training_points(index), IVF_TRAIN_POINTS_PER_LIST * int(ivf.nlist)))
+    picked = set(np.random.default_rng(0).choice(n_total, size=size, replace=False).tolist())
+    texts = [c["text"] for i, c in enumerate(iter_jsonl(chunks_path)) if i in picked]
+    print(f"[INFO] Training {cfg.index.type} on {len(texts)} sampled chunks")
+    return embedder.encode(texts, show_progress_bar=False)
+
+
+def build_artifacts(
+    cfg: Any,
+    embedder: Embedder,
+    chunks_path: Path,
+    docs: Dict[str, Dict[str, str]],
+    index_path: Path,
+    meta_path: Path,
+    *,
+    incremental: bool,
+    stream_batch_size: int,
+    t0: float,
+) -> int:
+    """Write the index and every side artifact next to `index_path`; returns the vector count."""
+    streaming = stream_batch_size > 0 and not incremental
+    if streaming and cfg.index.dedup_threshold > 0:
+        # Near-duplicate folding compares every vector with every other one.
+        print("[INFO] index.dedup_threshold is set; building in memory instead of streaming")
+        streaming = False
+
+    if streaming:
+        n, vectors = stream_build(cfg, embedder, chunks_path, index_path, meta_path, batch_size=stream_batch_size)
+        print(f"[OK] Wrote {n} metadata rows to {meta_path}")
+
+        def meta_records():
+            return iter_jsonl(meta_path)
+
+    else:
+        chunks = list(iter_jsonl(chunks_path))
+        print(f"[INFO] Loaded {len(chunks)} chunks")
+        built = None
+        if incremental:
+            built = incremental_build(cfg, embedder, chunks, docs, index_path, meta_path)
+        if built is None:
+            built = full_build(cfg, embedder, chunks, index_path)
+        ordered, vectors = built
+
+        # Write metadata aligned by vector row
+        def meta_records():
+            return (meta_record(i, c) for i, c in enumerate(ordered))
+
+        n = write_jsonl(meta_path, meta_records(), append=False)
+        print(f"[OK] Wrote {n} metadata rows to {meta_path}")
+
+    offsets_path = write_meta_offsets(meta_path)
+    print(f"[OK] Wrote metadata row offsets to {offsets_path}")
+
+    columns_dir = meta_columns_dir(meta_path)
+    n_cols = write_columnar_meta(columns_dir, meta_records())
+    print(f"[OK] Wrote {n_cols} columnar metadata rows to {columns_dir}")
+
+    bm25_dir = bm25_artifact_dir(index_path)
+    bm25 = BM25Index.build(tokenize_for_bm25(r["text"]) for r in meta_records())
+    bm25.save(bm25_dir)
+    print(f"[OK] Wrote BM25 index ({len(bm25)} docs, {bm25.vocab.shape[0]} terms) to {bm25_dir}")
+
+    # Full-precision side file for exact rescoring of reduced-precision storage.
+    vectors_path = rescore_vectors_path(index_path)
+    if cfg.index.rescore != "none":
+        if not streaming:  # streaming builds write it batch by batch
+            np.save(vectors_path, vectors.astype(cfg.index.rescore))
+        print(f"[OK] Wrote {cfg.index.rescore} rescore vectors ({vectors_path.stat().st_size}B) to {vectors_path}")
+    else:
+        vectors_path.unlink(missing_ok=True)
+
+    # Shards are always rewritten from the whole corpus (or removed), so they
+    # never outlive the index they were cut from.
+    shard_root = shards_dir(index_path)
+    if cfg.index.shards > 1:
+        ranges = write_shards(shard_root, vectors, bm25, n_shards=cfg.index.shards, index_cfg=cfg.index)
+        sizes = ", ".join(str(end - start) for start, end in ranges)
+        print(f"[OK] Wrote {len(ranges)} index shards ({sizes} vectors) to {shard_root}")
+    elif shard_root.exists():
+        shutil.rmtree(shard_root)
+        print(f"[INFO] index.shards <= 1; removed stale shards at {shard_root}")
+    vectors = None
+    stream_spill_path(index_path).unlink(missing_ok=True)
+
+    symbols_path = symbol_index_path(index_path)
+    symbols = SymbolIndex.build(meta_records())
+    symbols.save(symbols_path)
+    print(
+        f"[OK] Wrote symbol index ({len(symbols)} mentioned symbols, "
+        f"{len(symbols.definitions)} defined symbols) to {symbols_path}"
+    )
+
+    neighbours_file = neighbours_path(index_path)
+    neighbours = build_neighbour_table(meta_records())
+    np.save(neighbours_file, neighbours)
+    print(f"[OK] Wrote neighbour table ({int((neighbours >= 0).sum())} links) to {neighbours_file}")
+
+    # The manifest is removed before the index is written and recreated
+    # last, so a build interrupted in between is followed by a full build.
+    manifest_path = index_manifest_path(index_path)
+    write_manifest(manifest_path, settings=build_settings(cfg), docs=docs, n_vectors=n)
+    print(f"[OK] Wrote build manifest ({len(docs)} docs) to {manifest_path} in {time.perf_counter() - t0:.1f}s")
+
+    return n
+
+
+def build(
+    cfg: Any,
+    embedder: Embedder,
+    chunks_path: Path,
+    docs: Dict[str, Dict[str, str]],
+    index_path: Path,
+    meta_path: Path,
+    *,
+    incremental: bool,
+    stream_batch_size: int,
+    t0: float,
+) -> None:
+    """Build in place, or into a new snapshot that is published when complete (index.snapshots)."""
+    options = {"incremental": incremental, "stream_batch_size": stream_batch_size, "t0": t0}
+    if not cfg.index.snapshots:
+        build_artifacts(cfg, embedder, chunks_path, docs, index_path, meta_path, **options)
+        return
+
+    # Snapshot mode: build into a private staging dir, then publish it as a
+    # new immutable snapshot. Readers only ever follow CURRENT.
+    root = snapshots_root(index_path)
+    parent = current_snapshot_id(root)
+    snapshot_id = new_snapshot_id()
+    staging = staging_dir(root, snapshot_id)
+    staging.mkdir(parents=True)
+    index_name, meta_name = index_path.name, meta_path.name
+    index_path, meta_path = staging / index_name, staging / meta_name
+    try:
+        if incremental and parent is not None:
+            # Incremental updates edit their inputs in place, so work on copies.
+            previous = root / parent
+            for name in (index_name, meta_name, index_manifest_path(index_path).name):
+                if (previous / name).exists():
+                    shutil.copy2(previous / name, staging / name)
+        n = build_artifacts(cfg, embedder, chunks_path, docs, index_path, meta_path, **options)
+        publish_snapshot(
+            root,
+            snapshot_id,
+            staging,
+            info={"parent": parent, "n_vectors": n, "settings": build_settings(cfg)},
+        )
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    print(f"[OK] Published index snapshot {snapshot_id} (parent: {parent}) under {root}")
+    removed = prune_snapshots(root, cfg.index.snapshot_keep)
+    if removed:
+        print(f"[INFO] Pruned {len(removed)} old snapshots: {', '.join(removed)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the FAISS index and retrieval artifacts from chunks.jsonl.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-embed documents whose sha256/chunks changed since the last build (flat index only).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Encode chunks in this many worker processes (default: embeddings.encode_workers; <= 1 = in-process).",
+    )
+    parser.add_argument(
+        "--stream-batch-size",
+        type=int,
+        default=None,
+        help="Read/embed/index this many chunks at a time (default: index.stream_batch_size; 0 = all in memory).",
+    )
+    parser.add_argument(
+        "--no-embedding-cache",
+        action="store_true",
+        help="Encode every chunk, ignoring (and not updating) embeddings.cache_dir.",
+    )
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parents[1]
+    config_path = repo_root / "config.yaml"
+    cfg, _ = load_app_config(repo_root, config_path)
+
+    docs_path = repo_root / "data" / "processed" / "docs.jsonl"
+    chunks_path = repo_root / "data" / "processed" / "chunks.jsonl"
+    index_path = repo_root / cfg.index.index_path
+    meta_path = repo_root / cfg.index.meta_path
+
+    t0 = time.perf_counter()
+
+    # Per-doc fingerprints for the manifest, hashed while streaming over chunks.jsonl.
+    doc_shas = {str(d["id"]): str(d.get("sha256", "")) for d in iter_jsonl(docs_path)} if docs_path.exists() else {}
+    docs = doc_fingerprints(iter_jsonl(chunks_path), doc_shas)
+    stream_batch_size = cfg.index.stream_batch_size if args.stream_batch_size is None else args.stream_batch_size
+
+    # Initialize embedder; with several workers the model is loaded in each
+    # worker process and vectors are gathered back in vector_id order.
+    workers = cfg.embeddings.encode_workers if args.workers is None else args.workers
+    if workers > 1:
+        # A streaming build encodes batch by batch: use the pool from the
+        # first batch on, whatever its size.
+        embedder = ParallelEmbedder(
+            EmbedderFactory(config_path),
+            workers=workers,
+            batch_size=cfg.embeddings.batch_size,
+            min_pool_texts=0 if stream_batch_size > 0 else None,
+        )
+        print(f"[INFO] Encoding with {workers} worker processes")
+        if 0 < stream_batch_size < cfg.embeddings.batch_size * workers:
+            print(
+                f"[WARN] --stream-batch-size {stream_batch_size} is below embeddings.batch_size x workers "
+                f"({cfg.embeddings.batch_size * workers}); each worker encodes partial batches"
+            )
+    else:
+        embedder = Embedder(config_path)
+
+    # Content-addressed vectors from earlier builds: only unseen chunk text
+    # reaches the encoder (and the worker pool is not started at all when
+    # every chunk is a hit).
+    if cfg.embeddings.cache_dir and not args.no_embedding_cache:
+        cache = EmbeddingCache(
+            repo_root / cfg.embeddings.cache_dir,
+            model_id=embedding_model_id(
+                cfg.embeddings.model_name, cfg.embeddings.backend, cfg.embeddings.onnx_quantize
+            ),
+            normalize=cfg.embeddings.normalize,
+        )
+        print(f"[INFO] Embedding cache {cache.dir} ({len(cache)} vectors)")
+        embedder = CachedEmbedder(embedder, cache)
+
+    try:
+        build(
+            cfg,
+            embedder,
+            chunks_path,
+            docs,
+            index_path,
+            meta_path,
+            incremental=args.incremental,
+            stream_batch_size=stream_batch_size,
+            t0=t0,
+        )
+    finally:
+        if isinstance(embedder, (ParallelEmbedder, CachedEmbedder)):
+            embedder.close()
+    if isinstance(embedder, CachedEmbedder):
+        st = embedder.cache.stats()
+        print(
+            f"[OK] Embedding cache: {st['hits']} hits, {st['misses']} misses "
+            f"({st['hit_rate']:.1%} hit rate), {st['written']} new vectors, {st['entries']} total in {st['path']}"
+        )
 
 
 if __name__ == "__main__":
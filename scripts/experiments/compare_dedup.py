@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import faiss
+import numpy as np
+
+# Ensure repo root is on sys.path when this file is executed directly.
+repo_root = Path(__file__).resolve().parents[2]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.config import load_app_config
+from src.embeddings.embedder import Embedder
+from src.embeddings.embedding_cache import CachedEmbedder, EmbeddingCache
+from src.retrieval.dedup import near_duplicate_canonicals
+from src.retrieval.faiss_store import FaissStore, base_index, rescore_vectors_path
+from src.retrieval.snapshots import resolve_index_paths
+from src.utils.jsonl import iter_jsonl
+
+
+def _chunk_vectors(cfg: Any, embedder: Embedder, chunks: List[Dict[str, Any]]) -> np.ndarray:
+    """Vectors for every chunk: reuse a float32, non-deduplicated build when there is one."""
+    try:
+        index_path, _, _ = resolve_index_paths(repo_root, cfg.index)
+    except FileNotFoundError:
+        index_path = repo_root / cfg.index.index_path
+    vectors_path = rescore_vectors_path(index_path)
+    if vectors_path.exists():
+        vectors = np.load(vectors_path)
+        if vectors.dtype == np.float32 and vectors.shape[0] == len(chunks):
+            return vectors
+    if index_path.exists() and cfg.index.type == "flat" and cfg.index.storage == "float32":
+        index = FaissStore.load(index_path)
+        if int(index.ntotal) == len(chunks):
+            return base_index(index).reconstruct_n(0, int(index.ntotal))
+    print("[INFO] No reusable float32 vectors for all chunks; embedding chunks.jsonl")
+    if not cfg.embeddings.cache_dir:
+        return embedder.encode([c["text"] for c in chunks])
+    cache = EmbeddingCache(
+        repo_root / cfg.embeddings.cache_dir, model_id=embedder.model_id, normalize=cfg.embeddings.normalize
+    )
+    cached = CachedEmbedder(embedder, cache)
+    vectors = cached.encode([c["text"] for c in chunks])
+    cached.close()
+    print(f"[INFO] Embedding cache: {cache.hits} hits, {cache.misses} misses")
+    return vectors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Measure build-time near-duplicate suppression: index size per cosine threshold and "
+            "alias-aware recall of the deduplicated index against the full index on eval queries."
+        )
+    )
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.99, 0.97, 0.95, 0.93])
+    parser.add_argument("--eval-file", type=str, default="eval/manual.jsonl", help="JSONL with a `query` field.")
+    parser.add_argument("--k", type=int, default=5, help="Hits compared per query (retrieval.top_k scale).")
+    parser.add_argument("--out", type=str, default="", help="Optional path to write the JSON report.")
+    args = parser.parse_args()
+
+    cfg, config_path = load_app_config(repo_root)
+    chunks = list(iter_jsonl(repo_root / "data" / "processed" / "chunks.jsonl"))
+    embedder = Embedder(config_path)
+    vectors = _chunk_vectors(cfg, embedder, chunks)
+    texts = [str(r["query"]) for r in iter_jsonl(repo_root / args.eval_file) if r.get("query")]
+    queries = embedder.encode(texts, show_progress_bar=False)
+    k = args.k
+
+    full = faiss.IndexFlatIP(vectors.shape[1])
+    full.add(vectors)
+    _, full_ids = full.search(queries, k)
+    print(f"[INFO] chunks={len(chunks)} queries={len(texts)} k={k}")
+
+    rows: List[Dict[str, Any]] = []
+    for threshold in args.thresholds:
+        canonical, _ = near_duplicate_canonicals(vectors, threshold)
+        kept_ids = np.flatnonzero(canonical == np.arange(len(chunks)))
+        deduped = faiss.IndexFlatIP(vectors.shape[1])
+        deduped.add(vectors[kept_ids])
+        _, local_ids = deduped.search(queries, k)
+        dedup_ids = kept_ids[local_ids]
+
+        # A full-index hit is recovered if the hit itself or the chunk it was
+        # folded into is returned; duplicates in the full top-k count once.
+        recall, strict, distinct = [], [], []
+        for ref, got in zip(full_ids, dedup_ids):
+            ref_groups = set(canonical[ref].tolist())
+            recall.append(len(ref_groups & set(got.tolist())) / len(ref_groups))
+            strict.append(len(set(ref.tolist()) & set(got.tolist())) / k)
+            distinct.append(len(ref_groups) / k)
+
+        rows.append(
+            {
+                "threshold": threshold,
+                "kept": int(kept_ids.size),
+                "aliases": int(len(chunks) - kept_ids.size),
+                "shrink": round(1 - kept_ids.size / len(chunks), 4),
+                "index_bytes": int(kept_ids.size * vectors.shape[1] * 4),
+                f"alias_recall@{k}": round(float(np.mean(recall)), 4),
+                f"strict_recall@{k}": round(float(np.mean(strict)), 4),
+                "full_topk_distinct": round(float(np.mean(distinct)), 4),
+            }
+        )
+
+    print(
+        f"{'threshold':>9} {'kept':>8} {'aliases':>8} {'shrink':>7} {'index_MB':>9} "
+        f"{'alias_rec':>10} {'strict_rec':>11} {'full_distinct':>14}"
+    )
+    for r in rows:
+        print(
+            f"{r['threshold']:>9.3f} {r['kept']:>8d} {r['aliases']:>8d} {r['shrink']:>7.1%} "
+            f"{r['index_bytes'] / 1e6:>9.2f} {r[f'alias_recall@{k}']:>10.4f} {r[f'strict_recall@{k}']:>11.4f} "
+            f"{r['full_topk_distinct']:>14.4f}"
+        )
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"k": k, "n_chunks": len(chunks), "n_queries": len(texts), "results": rows}
+        out_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"[OK] Wrote {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+# Ensure repo root is on sys.path when this file is executed directly.
+repo_root = Path(__file__).resolve().parents[2]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.config import load_app_config
+from src.embeddings.onnx_backend import (
+    MODEL_FILENAME,
+    QUANTIZED_FILENAME,
+    OnnxEncoder,
+    export_onnx,
+    onnx_model_dir,
+)
+from src.utils.jsonl import iter_jsonl
+
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype="float32")
+    return x / np.clip(np.linalg.norm(x, axis=1, keepdims=True), 1e-12, None)
+
+
+def _throughput(encode: Callable[[List[str]], np.ndarray], texts: List[str], queries: List[str]) -> Dict[str, Any]:
+    """Document batches (texts/s) and single-query latency, as the build and the API call the encoder."""
+    encode(texts[:8])  # warm-up: graph optimisation / lazy init
+    t0 = time.perf_counter()
+    encode(texts)
+    doc_s = time.perf_counter() - t0
+
+    latencies = []
+    for q in queries:
+        t1 = time.perf_counter()
+        encode([q])
+        latencies.append((time.perf_counter() - t1) * 1000)
+    arr = np.asarray(latencies)
+    return {
+        "docs_per_s": round(len(texts) / doc_s, 1),
+        "query_ms_p50": round(float(np.percentile(arr, 50)), 2),
+        "query_ms_p95": round(float(np.percentile(arr, 95)), 2),
+    }
+
+
+def _parity(ref_docs, ref_queries, docs, queries, *, k: int) -> Dict[str, Any]:
+    """Agreement with the torch encoder: per-row cosine, query-chunk score drift and top-k overlap."""
+    row_cos = np.sum(ref_docs * docs, axis=1)
+    ref_scores = ref_queries @ ref_docs.T
+    scores = queries @ docs.T
+    drift = np.abs(scores - ref_scores)
+    ref_top = np.argsort(-ref_scores, axis=1, kind="stable")[:, :k]
+    top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    overlap = [len(set(a.tolist()) & set(b.tolist())) / k for a, b in zip(ref_top, top)]
+    return {
+        "row_cosine_min": round(float(row_cos.min()), 5),
+        "row_cosine_mean": round(float(row_cos.mean()), 5),
+        "score_abs_diff_mean": round(float(drift.mean()), 5),
+        "score_abs_diff_max": round(float(drift.max()), 5),
+        f"top{k}_overlap": round(float(np.mean(overlap)), 4),
+        "top1_agreement": round(float(np.mean(ref_top[:, 0] == top[:, 0])), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare the torch SentenceTransformer encoder with ONNX Runtime fp32/int8 exports: "
+            "cosine/score parity on chunk and eval-query embeddings, and CPU throughput."
+        )
+    )
+    parser.add_argument("--n-docs", type=int, default=2000, help="Chunks from chunks.jsonl to encode.")
+    parser.add_argument("--eval-file", type=str, default="eval/manual.jsonl", help="JSONL with a `query` field.")
+    parser.add_argument("--k", type=int, default=10, help="Cutoff for top-k overlap with torch rankings.")
+    parser.add_argument("--threads", type=int, default=0, help="onnxruntime intra-op threads (0 = default).")
+    parser.add_argument("--re-export", action="store_true", help="Export again even if the ONNX files exist.")
+    parser.add_argument("--out", type=str, default="", help="Optional path to write the JSON report.")
+    args = parser.parse_args()
+
+    cfg, _ = load_app_config(repo_root)
+    model_name = cfg.embeddings.model_name
+    batch_size = int(cfg.embeddings.batch_size)
+    model_dir = onnx_model_dir(repo_root / cfg.embeddings.onnx_dir, model_name)
+    if args.re_export or not (model_dir / QUANTIZED_FILENAME).exists() or not (model_dir / MODEL_FILENAME).exists():
+        print(f"[INFO] Exporting {model_name} to {model_dir}")
+        export_onnx(model_name, model_dir, quantize=True)
+
+    chunks = list(iter_jsonl(repo_root / "data" / "processed" / "chunks.jsonl"))
+    texts = [c["text"] for c in chunks[: args.n_docs]]
+    queries = [str(r["query"]) for r in iter_jsonl(repo_root / args.eval_file) if r.get("query")]
+    print(f"[INFO] docs={len(texts)} queries={len(queries)} batch_size={batch_size}")
+
+    from sentence_transformers import SentenceTransformer
+
+    torch_model = SentenceTransformer(model_name, device="cpu")
+    encoders: Dict[str, Callable[[List[str]], np.ndarray]] = {
+        "torch": lambda xs: _unit(torch_model.encode(xs, batch_size=batch_size, show_progress_bar=False)),
+    }
+    for label, quantized in (("onnx", False), ("onnx-int8", True)):
+        enc = OnnxEncoder(model_dir, quantized=quantized, threads=args.threads)
+        encoders[label] = lambda xs, enc=enc: _unit(enc.encode(xs, batch_size=batch_size))
+
+    ref_docs = encoders["torch"](texts)
+    ref_queries = encoders["torch"](queries)
+    rows: List[Dict[str, Any]] = []
+    for label, encode in encoders.items():
+        row: Dict[str, Any] = {"backend": label, **_throughput(encode, texts, queries)}
+        if label != "torch":
+            row.update(_parity(ref_docs, ref_queries, encode(texts), encode(queries), k=args.k))
+        rows.append(row)
+
+    base = rows[0]
+    print(
+        f"{'backend':<10} {'docs/s':>9} {'speedup':>8} {'q_p50_ms':>9} {'q_p95_ms':>9} "
+        f"{'cos_min':>8} {'score_dmax':>10} {f'top{args.k}':>7} {'top1':>6}"
+    )
+    for r in rows:
+        print(
+            f"{r['backend']:<10} {r['docs_per_s']:>9.1f} {r['docs_per_s'] / base['docs_per_s']:>7.2f}x "
+            f"{r['query_ms_p50']:>9.2f} {r['query_ms_p95']:>9.2f} "
+            f"{r.get('row_cosine_min', 1.0):>8.4f} {r.get('score_abs_diff_max', 0.0):>10.4f} "
+            f"{r.get(f'top{args.k}_overlap', 1.0):>7.4f} {r.get('top1_agreement', 1.0):>6.4f}"
+        )
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"model_name": model_name, "n_docs": len(texts), "n_queries": len(queries), "results": rows}
+        out_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"[OK] Wrote {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+# Ensure repo root is on sys.path when this file is executed directly.
+repo_root = Path(__file__).resolve().parents[2]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.config import load_app_config
+from src.retrieval.meta_store import (
+    ColumnarMetaStore,
+    FaissMetaStore,
+    MmapMetaStore,
+    meta_columns_dir,
+    meta_offsets_path,
+)
+
+
+def _measure(label: str, factory: Callable[[], Any], *, lookups: int) -> Dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    store = factory()
+    load_ms = (time.perf_counter() - t0) * 1000
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    n = len(store)
+    rng = random.Random(0)
+    ids = [rng.randrange(n) for _ in range(lookups)] if n else []
+    t1 = time.perf_counter()
+    for vid in ids:
+        store.get(vid)
+    lookup_us = ((time.perf_counter() - t1) * 1e6 / len(ids)) if ids else 0.0
+
+    out = {
+        "store": label,
+        "rows": n,
+        "load_ms": round(load_ms, 2),
+        "resident_bytes": int(current),
+        "peak_bytes": int(peak),
+        "bytes_per_row": round(current / n, 1) if n else 0.0,
+        "avg_get_us": round(lookup_us, 2),
+    }
+    del store
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare Python heap usage of the JSONL and columnar chunk metadata loaders."
+    )
+    parser.add_argument("--meta-path", type=str, default="", help="Override index.meta_path from config.yaml.")
+    parser.add_argument("--lookups", type=int, default=2000, help="Random get() calls timed per store.")
+    parser.add_argument("--out", type=str, default="", help="Optional path to write the JSON report.")
+    args = parser.parse_args()
+
+    cfg, _ = load_app_config(repo_root)
+    meta_path = Path(args.meta_path) if args.meta_path else repo_root / cfg.index.meta_path
+    columns_dir = meta_columns_dir(meta_path)
+
+    candidates = [("jsonl (FaissMetaStore)", lambda: FaissMetaStore(meta_path))]
+    if meta_offsets_path(meta_path).exists():
+        candidates.append(("jsonl mmap (MmapMetaStore)", lambda: MmapMetaStore(meta_path)))
+    if (columns_dir / "strings.json").exists():
+        candidates.append(("columnar", lambda: ColumnarMetaStore(columns_dir)))
+        candidates.append(("columnar mmap", lambda: ColumnarMetaStore(columns_dir, mmap_mode=True)))
+
+    # tracemalloc only sees heap allocations, so memory-mapped pages (shared
+    # page cache) are excluded from the mmap variants by construction.
+    rows = [_measure(label, factory, lookups=args.lookups) for label, factory in candidates]
+
+    print(f"{'store':<28} {'rows':>8} {'load_ms':>10} {'resident_MB':>12} {'B/row':>10} {'get_us':>8}")
+    for r in rows:
+        print(
+            f"{r['store']:<28} {r['rows']:>8} {r['load_ms']:>10.2f} "
+            f"{r['resident_bytes'] / 1e6:>12.2f} {r['bytes_per_row']:>10.1f} {r['avg_get_us']:>8.2f}"
+        )
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps({"meta_path": str(meta_path), "results": rows}, indent=2), encoding="utf-8")
+        print(f"[OK] Wrote {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+# Ensure repo root is on sys.path when this file is executed directly.
+repo_root = Path(__file__).resolve().parents[2]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+from src.config import load_app_config
+from src.embeddings.embedder import Embedder
+from src.retrieval.faiss_store import FaissStore, base_index, configure_search, rescore_vectors_path
+from src.retrieval.snapshots import resolve_index_paths
+from src.utils.jsonl import iter_jsonl
+
+
+def _load_corpus_vectors(cfg: Any) -> np.ndarray:
+    """float32 chunk vectors: the rescore side file if it is float32, else the float32 index itself."""
+    index_path, _, _ = resolve_index_paths(repo_root, cfg.index)
+    vectors_path = rescore_vectors_path(index_path)
+    if vectors_path.exists():
+        vectors = np.load(vectors_path)
+        if vectors.dtype == np.float32:
+            return vectors
+    if cfg.index.storage != "float32" or cfg.index.type == "ivfpq":
+        raise SystemExit(
+            "Need float32 vectors: build with index.rescore=float32, or with index.type=flat/hnsw "
+            "and index.storage=float32."
+        )
+    index = FaissStore.load(index_path)
+    return base_index(index).reconstruct_n(0, int(index.ntotal))
+
+
+def _gate_bucket(score: float, *, low: float, high: float) -> str:
+    """ConfidenceGate's primary top-score signal."""
+    if score < low:
+        return "low"
+    return "high" if score >= high else "mid"
+
+
+def _evaluate(
+    label: str,
+    index: faiss.Index,
+    queries: np.ndarray,
+    exact_ids: np.ndarray,
+    exact_top: np.ndarray,
+    *,
+    k: int,
+    side: Optional[np.ndarray],
+    rescore_factor: int,
+    thresholds: Dict[str, float],
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    fetch_k = k * rescore_factor if side is not None else k
+    scores, ids = index.search(queries, fetch_k)
+    if side is not None:
+        for row in range(queries.shape[0]):
+            cand = ids[row][ids[row] >= 0]
+            exact = np.asarray(side[cand], dtype=np.float32) @ queries[row]
+            order = np.argsort(-exact, kind="stable")[:k]
+            ids[row, :k], scores[row, :k] = -1, -np.inf
+            ids[row, :order.size], scores[row, :order.size] = cand[order], exact[order]
+    ids, scores = ids[:, :k], scores[:, :k]
+    search_ms = (time.perf_counter() - t0) * 1000 / queries.shape[0]
+
+    recall = np.mean([len(set(a.tolist()) & set(b.tolist())) / k for a, b in zip(ids, exact_ids)])
+    drift = np.abs(scores[:, 0] - exact_top)
+    changed = sum(
+        _gate_bucket(float(a), **thresholds) != _gate_bucket(float(b), **thresholds)
+        for a, b in zip(scores[:, 0], exact_top)
+    )
+    return {
+        "variant": label,
+        "index_bytes": len(faiss.serialize_index(index)),
+        "side_file_bytes": int(side.nbytes) if side is not None else 0,
+        f"recall@{k}": round(float(recall), 4),
+        "top1_same": round(float(np.mean(ids[:, 0] == exact_ids[:, 0])), 4),
+        "top_score_drift_mean": float(drift.mean()),
+        "top_score_drift_p95": float(np.percentile(drift, 95)),
+        "top_score_drift_max": float(drift.max()),
+        "gate_bucket_changes": int(changed),
+        "avg_search_ms": round(search_ms, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare float32 / float16 / SQ8 vector storage, with and without exact rescoring: "
+            "index size, recall vs exact search and how far top_score (ConfidenceGate's input) drifts."
+        )
+    )
+    parser.add_argument("--eval-file", type=str, default="eval/manual.jsonl", help="JSONL with a `query` field.")
+    parser.add_argument("--k", type=int, default=10, help="Hits compared per query.")
+    parser.add_argument("--rescore-factor", type=int, default=0, help="Override index.rescore_factor.")
+    parser.add_argument("--out", type=str, default="", help="Optional path to write the JSON report.")
+    args = parser.parse_args()
+
+    cfg, config_path = load_app_config(repo_root)
+    corpus = _load_corpus_vectors(cfg)
+    texts = [str(r["query"]) for r in iter_jsonl(repo_root / args.eval_file) if r.get("query")]
+    queries = Embedder(config_path).encode(texts, show_progress_bar=False)
+    k = min(args.k, corpus.shape[0])
+    rescore_factor = args.rescore_factor or int(cfg.index.rescore_factor)
+    thresholds = {"low": float(cfg.confidence.threshold_low), "high": float(cfg.confidence.threshold_high)}
+    index_type = cfg.index.type if cfg.index.type != "ivfpq" else "flat"
+    print(f"[INFO] corpus={corpus.shape} queries={len(texts)} index.type={index_type} k={k}")
+
+    exact_index = faiss.IndexFlatIP(corpus.shape[1])
+    exact_index.add(corpus)
+    exact_scores, exact_ids = exact_index.search(queries, k)
+    exact_top = exact_scores[:, 0]
+
+    sides = {"float32": corpus, "float16": corpus.astype(np.float16)}
+    rows: List[Dict[str, Any]] = []
+    for storage in ("float32", "float16", "sq8"):
+        index_cfg = cfg.index.model_copy(update={"type": index_type, "storage": storage})
+        store = FaissStore(corpus.shape[1], index_cfg=index_cfg)
+        store.add(corpus)
+        index = configure_search(store.index, index_cfg)
+        for rescore in ("none", "float16", "float32"):
+            if storage == "float32" and rescore != "none":
+                continue
+            rows.append(
+                _evaluate(
+                    f"{storage}" + (f" + rescore {rescore} x{rescore_factor}" if rescore != "none" else ""),
+                    index,
+                    queries,
+                    exact_ids,
+                    exact_top,
+                    k=k,
+                    side=sides.get(rescore),
+                    rescore_factor=rescore_factor,
+                    thresholds=thresholds,
+                )
+            )
+
+    print(
+        f"{'variant':<32} {'index_MB':>9} {'side_MB':>8} {'recall':>7} {'top1':>6} "
+        f"{'drift_mean':>11} {'drift_max':>10} {'gate_chg':>9} {'ms/q':>7}"
+    )
+    for r in rows:
+        print(
+            f"{r['variant']:<32} {r['index_bytes'] / 1e6:>9.2f} {r['side_file_bytes'] / 1e6:>8.2f} "
+            f"{r[f'recall@{k}']:>7.4f} {r['top1_same']:>6.3f} {r['top_score_drift_mean']:>11.2e} "
+            f"{r['top_score_drift_max']:>10.2e} {r['gate_bucket_changes']:>9d} {r['avg_search_ms']:>7.3f}"
+        )
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"k": k, "n_queries": len(texts), "thresholds": thresholds, "results": rows}
+        out_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"[OK] Wrote {out_path}")
+
+
+if __name__ == "__main__":
+    main()
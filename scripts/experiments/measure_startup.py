@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Ensure repo root is on sys.path when this file is executed directly.
+repo_root = Path(__file__).resolve().parents[2]
+if str(repo_root) not in sys.path:
+    sys.path.insert(0, str(repo_root))
+
+MODES = ("isolated", "shared")
+
+
+def _rss_mb() -> float:
+    """Current resident set size (Linux /proc), falling back to peak RSS elsewhere."""
+    try:
+        for line in Path("/proc/self/status").read_text(encoding="utf-8").splitlines():
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _child(mode: str, root: Path) -> Dict[str, Any]:
+    """
+    One cold process: build the pipeline's retrieval components, then a
+    second Retriever and reranker (a debug script or eval run next to the
+    API). `isolated` turns the resource registry off, i.e. the old behaviour.
+    """
+    stages: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
+
+    def mark(stage: str) -> None:
+        stages.append({"stage": stage, "t_s": round(time.perf_counter() - t0, 3), "rss_mb": _rss_mb()})
+
+    mark("start")
+    from src.utils.registry import registry
+
+    registry.enabled = mode == "shared"
+    from src.rag.confidence import ConfidenceGate
+    from src.retrieval.cross_encoder_reranker import CrossEncoderReranker
+    from src.retrieval.retriever import Retriever
+
+    mark("imports")
+    retriever = Retriever(root)
+    mark("retriever")
+    reranker = CrossEncoderReranker(root)
+    gate = ConfidenceGate(root)
+    mark("reranker+gate")
+    retriever.retrieve("how do I open a sqlite3 connection", top_k=5)
+    mark("first query")
+    second = Retriever(root)
+    second_reranker = CrossEncoderReranker(root)
+    mark("second retriever+reranker")
+    second.retrieve("how do I open a sqlite3 connection", top_k=5)
+    mark("second first query")
+    del reranker, gate, second_reranker
+    return {"mode": mode, "stages": stages, "registry": registry.stats()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Measure cold-start time and resident memory of the retrieval components with the "
+            "process-wide resource registry off (isolated, previous behaviour) and on (shared)."
+        )
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per mode.")
+    parser.add_argument(
+        "--root",
+        type=str,
+        default=str(repo_root),
+        help="Directory with config.yaml and the built index (default: this repo).",
+    )
+    parser.add_argument("--out", type=str, default="", help="Optional path to write the JSON report.")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.child, Path(args.root).resolve())))
+        return
+
+    runs: Dict[str, List[Dict[str, Any]]] = {mode: [] for mode in MODES}
+    for i in range(args.repeat):
+        for mode in MODES:
+            proc = subprocess.run(
+                [sys.executable, str(Path(__file__).resolve()), "--child", mode, "--root", args.root],
+                cwd=str(repo_root),
+                capture_output=True,
+                text=True,
+                env={**os.environ, "TOKENIZERS_PARALLELISM": "false"},
+                check=False,
+            )
+            if proc.returncode != 0:
+                raise SystemExit(f"[ERROR] {mode} run {i} failed:\n{proc.stderr[-2000:]}")
+            runs[mode].append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    # Median per stage across processes.
+    summary: Dict[str, List[Dict[str, Any]]] = {}
+    for mode, results in runs.items():
+        rows = []
+        for j, stage in enumerate(r["stage"] for r in results[0]["stages"]):
+            ts = sorted(r["stages"][j]["t_s"] for r in results)
+            rss = sorted(r["stages"][j]["rss_mb"] for r in results)
+            rows.append({"stage": stage, "t_s": ts[len(ts) // 2], "rss_mb": rss[len(rss) // 2]})
+        summary[mode] = rows
+
+    print(f"{'stage':<28} " + " ".join(f"{m + ' s':>12} {m + ' MB':>13}" for m in MODES))
+    for j, row in enumerate(summary[MODES[0]]):
+        cells = " ".join(f"{summary[m][j]['t_s']:>12.3f} {summary[m][j]['rss_mb']:>13.1f}" for m in MODES)
+        print(f"{row['stage']:<28} {cells}")
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"repeat": args.repeat, "root": args.root, "summary": summary, "runs": runs}
+        out_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"[OK] Wrote {out_path}")
+
+
+if __name__ == "__main__":
+    main()
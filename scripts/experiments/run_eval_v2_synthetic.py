@@ -314,6 +314,13 @@ def main() -> None:
 
     write_jsonl(out_results, rows, append=False)
 
+    # Persist query embeddings so re-runs over the same dataset skip encoding.
+    embedder = getattr(pipeline.retriever, "embedder", None)
+    if embedder is not None and hasattr(embedder, "save_query_cache"):
+        n_cached = embedder.save_query_cache()
+        if n_cached:
+            print(f"[OK] Saved {n_cached} query embeddings to {embedder.query_cache_path}")
+
     total = len(rows)
     correct = sum(1 for r in rows if r.get("expected_type") == r.get("predicted_type"))
     pred_counts = Counter(r.get("predicted_type", "unknown") for r in rows)
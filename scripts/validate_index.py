@@ -3,7 +3,13 @@ from __future__ import annotations
 from pathlib import Path
 import yaml
 import faiss
+import numpy as np
 
+from src.config import IndexConfig
+from src.retrieval.bm25_index import BM25Index, bm25_artifact_dir
+from src.retrieval.dedup import count_aliases
+from src.retrieval.faiss_store import base_index, rescore_vectors_path
+from src.retrieval.snapshots import resolve_index_paths
 from src.utils.jsonl import iter_jsonl
 
 
@@ -14,8 +20,9 @@ def main() -> None:
         cfg = yaml.safe_load(f)
 
     chunks_path = repo_root / "data" / "processed" / "chunks.jsonl"
-    index_path = repo_root / cfg["index"]["index_path"]
-    meta_path = repo_root / cfg["index"]["meta_path"]
+    index_path, meta_path, snapshot_id = resolve_index_paths(repo_root, IndexConfig(**cfg["index"]))
+    if snapshot_id is not None:
+        print(f"[INFO] validating index snapshot {snapshot_id}")
 
     assert chunks_path.exists(), f"Missing: {chunks_path}"
     assert index_path.exists(), f"Missing: {index_path}"
@@ -31,17 +38,54 @@ def main() -> None:
 
     # Count meta + validate vector_id sequence
     n_meta = 0
+    n_aliases = 0
     expected_vid = 0
     for rec in iter_jsonl(meta_path):
         assert rec["vector_id"] == expected_vid, f"vector_id mismatch: got {rec['vector_id']} expected {expected_vid}"
         expected_vid += 1
         n_meta += 1
+        n_aliases += count_aliases([rec])
 
-    assert n_chunks == n_meta, f"chunks ({n_chunks}) != meta ({n_meta})"
+    # Near-duplicate chunks dropped at build time are listed as meta aliases.
+    assert n_chunks == n_meta + n_aliases, f"chunks ({n_chunks}) != meta ({n_meta}) + aliases ({n_aliases})"
     assert n_vec == n_meta, f"faiss vectors ({n_vec}) != meta ({n_meta})"
     assert dim > 0, "FAISS dimension must be > 0"
+    assert index.is_trained, "FAISS index is not trained"
 
-    print(f"[OK] index validated: chunks={n_chunks}, vectors={n_vec}, dim={dim}")
+    bm25_dir = bm25_artifact_dir(index_path)
+    assert bm25_dir.exists(), f"Missing: {bm25_dir}"
+    bm25 = BM25Index.load(bm25_dir, mmap_mode=True)
+    assert len(bm25) == n_meta, f"bm25 docs ({len(bm25)}) != meta ({n_meta})"
+
+    vectors_path = rescore_vectors_path(index_path)
+    if vectors_path.exists():
+        vectors = np.load(vectors_path, mmap_mode="r")
+        assert vectors.shape == (n_vec, dim), f"rescore vectors {vectors.shape} != ({n_vec}, {dim})"
+        print(f"[INFO] rescore side file: {vectors.dtype} {vectors_path.stat().st_size}B")
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        pq = getattr(faiss.downcast_index(ivf), "pq", None)
+        if pq is not None:
+            expected_code_size = (int(pq.M) * int(pq.nbits) + 7) // 8
+            assert ivf.code_size == expected_code_size, (
+                f"IVF-PQ code_size ({ivf.code_size}) != ceil(m*nbits/8) ({expected_code_size})"
+            )
+        codes_bytes = int(ivf.code_size) * n_vec
+        raw_bytes = 4 * dim * n_vec
+        print(
+            f"[INFO] IVF nlist={ivf.nlist} nprobe={ivf.nprobe} code_size={ivf.code_size}B/vector "
+            f"codes={codes_bytes}B (float32 would be {raw_bytes}B)"
+        )
+
+    index_kind = type(faiss.downcast_index(index)).__name__
+    if isinstance(faiss.downcast_index(index), faiss.IndexIDMap):
+        ids = faiss.vector_to_array(faiss.downcast_index(index).id_map)
+        assert (ids == np.arange(n_vec)).all(), "FAISS ids are not 0..N-1 in meta vector_id order"
+        index_kind = f"{index_kind}({type(base_index(index)).__name__})"
+    print(
+        f"[OK] index validated: chunks={n_chunks}, vectors={n_vec}, aliases={n_aliases}, dim={dim}, type={index_kind}"
+    )
 
 
 if __name__ == "__main__":
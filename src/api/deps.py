@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+from typing import Iterator
+
 from fastapi import HTTPException, Request
 
 from src.rag.pipeline import RAGPipeline
 
 
-def get_pipeline(request: Request) -> RAGPipeline:
+def get_pipeline(request: Request) -> Iterator[RAGPipeline]:
     pipeline = getattr(request.app.state, "pipeline", None)
     if pipeline is None:
         startup_errors = getattr(request.app.state, "startup_errors", [])
@@ -13,4 +15,10 @@ def get_pipeline(request: Request) -> RAGPipeline:
         if startup_errors:
             detail = f"{detail}. startup_errors={startup_errors}"
         raise HTTPException(status_code=503, detail=detail)
-    return pipeline
+    swapper = getattr(request.app.state, "snapshot_swapper", None)
+    if swapper is None:
+        yield pipeline
+        return
+    # Leased, so a snapshot swap does not close the index under this request.
+    with swapper.lease() as leased:
+        yield leased
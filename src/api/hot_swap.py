@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from src.retrieval.snapshots import current_snapshot_id
+
+
+class SnapshotSwapper:
+    """
+    Follow the published index snapshot (snapshots/CURRENT) in a running API.
+
+    A new snapshot is loaded on a background thread while the old pipeline
+    keeps serving; the swap itself is a single assignment to
+    `app_state.pipeline`. Requests take the pipeline through `lease()`, so
+    the replaced pipeline's retriever is closed only once the last request
+    still using it has finished.
+
+    A snapshot that fails to load is not retried until CURRENT moves on
+    (or the API restarts).
+    """
+
+    def __init__(
+        self,
+        app_state: Any,
+        snapshot_root: Path,
+        factory: Callable[[str], Any],
+        *,
+        poll_s: float = 0.0,
+    ):
+        self.app_state = app_state
+        self.snapshot_root = snapshot_root
+        self.factory = factory
+        self.poll_s = float(poll_s)
+
+        self._lock = threading.Lock()
+        # id(pipeline) -> in-flight requests; retired pipelines wait here for zero.
+        self._leases_lock = threading.Lock()
+        self._leases: Dict[int, int] = {}
+        self._retired: Dict[int, Any] = {}
+        self._loading: Optional[str] = None
+        self._loader: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+        self.swaps = 0
+        self.last_swap: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self.failed_snapshot_id: Optional[str] = None
+
+    @property
+    def active_snapshot_id(self) -> Optional[str]:
+        pipeline = getattr(self.app_state, "pipeline", None)
+        return getattr(getattr(pipeline, "retriever", None), "snapshot_id", None)
+
+    def check(self) -> Optional[str]:
+        """
+        Start loading CURRENT if it is not the active snapshot; returns the id
+        being loaded. The last snapshot that failed to load is skipped.
+        """
+        target = current_snapshot_id(self.snapshot_root)
+        with self._lock:
+            if target is None or target == self.active_snapshot_id or self._loading is not None:
+                return None
+            if target == self.failed_snapshot_id:
+                return None
+            self._loading = target
+            self._loader = threading.Thread(
+                target=self._load, args=(target,), name=f"snapshot-load-{target}", daemon=True
+            )
+            self._loader.start()
+            return target
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until an in-flight load (if any) has finished."""
+        loader = self._loader
+        if loader is not None:
+            loader.join(timeout)
+
+    def _load(self, snapshot_id: str) -> None:
+        t0 = time.perf_counter()
+        try:
+            pipeline = self.factory(snapshot_id)
+        except Exception as e:
+            self.last_error = f"snapshot {snapshot_id} load failed: {e}"
+            self.failed_snapshot_id = snapshot_id
+        else:
+            previous = self.active_snapshot_id
+            with self._leases_lock:
+                old = getattr(self.app_state, "pipeline", None)
+                self.app_state.pipeline = pipeline
+                idle = old is not None and not self._leases.get(id(old))
+                if old is not None and not idle:
+                    self._retired[id(old)] = old
+            if idle:
+                self._close(old)
+            self.swaps += 1
+            self.last_error = None
+            self.failed_snapshot_id = None
+            self.last_swap = {
+                "from": previous,
+                "to": snapshot_id,
+                "at": datetime.now(timezone.utc).isoformat(),
+                "load_ms": round((time.perf_counter() - t0) * 1000, 1),
+            }
+        finally:
+            with self._lock:
+                self._loading = None
+
+    @contextmanager
+    def lease(self) -> Iterator[Any]:
+        """Hold the live pipeline for one request; a swap closes it only after every lease ends."""
+        with self._leases_lock:
+            pipeline = getattr(self.app_state, "pipeline", None)
+            key = id(pipeline)
+            self._leases[key] = self._leases.get(key, 0) + 1
+        try:
+            yield pipeline
+        finally:
+            with self._leases_lock:
+                left = self._leases.pop(key) - 1
+                if left:
+                    self._leases[key] = left
+                retired = None if left else self._retired.pop(key, None)
+            if retired is not None:
+                self._close(retired)
+
+    def in_flight(self) -> int:
+        with self._leases_lock:
+            return sum(self._leases.values())
+
+    @staticmethod
+    def _close(pipeline: Any) -> None:
+        close = getattr(getattr(pipeline, "retriever", None), "close", None)
+        if close is not None:
+            close()
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            try:
+                self.check()
+            except OSError as e:
+                self.last_error = f"snapshot poll failed: {e}"
+
+    def start(self) -> None:
+        """Poll CURRENT every `poll_s` seconds (no-op when polling is disabled)."""
+        if self.poll_s <= 0 or self._poller is not None:
+            return
+        self._stop.clear()
+        self._poller = threading.Thread(target=self._poll, name="snapshot-poll", daemon=True)
+        self._poller.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join(timeout=1.0)
+            self._poller = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "active": self.active_snapshot_id,
+            "current": current_snapshot_id(self.snapshot_root),
+            "loading": self._loading,
+            "poll_s": self.poll_s,
+            "in_flight": self.in_flight(),
+            "retiring": len(self._retired),
+            "swaps": self.swaps,
+            "last_swap": self.last_swap,
+            "last_error": self.last_error,
+            "failed": self.failed_snapshot_id,
+        }
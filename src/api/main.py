@@ -10,24 +10,36 @@ from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 
-from src.api.schemas import QueryRequest, QueryResponse
+from src.api.schemas import BatchQueryRequest, BatchQueryResponse, QueryRequest, QueryResponse
 from src.config import load_app_config
 from src.api.deps import get_pipeline
+from src.api.hot_swap import SnapshotSwapper
 from src.monitoring.stats import compute_stats_from_query_log, default_stats_summary
+from src.retrieval.meta_store import meta_columns_dir, meta_offsets_path
 from src.rag.pipeline import RAGPipeline
+from src.retrieval.retriever import Retriever
+from src.retrieval.snapshots import resolve_index_paths, snapshots_root
 from src.utils.query_logger import QueryLogger
+from src.utils.registry import registry
 
 
 def _validate_runtime_dependencies(repo_root: Path, cfg: Any) -> List[str]:
     errors: List[str] = []
 
-    index_path = repo_root / cfg.index.index_path
-    meta_path = repo_root / cfg.index.meta_path
+    try:
+        index_path, meta_path, _ = resolve_index_paths(repo_root, cfg.index)
+    except FileNotFoundError as e:
+        return [str(e)]
 
     if not index_path.exists():
         errors.append(f"index file not found: {index_path}")
     if not meta_path.exists():
         errors.append(f"meta file not found: {meta_path}")
+    elif cfg.index.meta_format == "columnar":
+        if not (meta_columns_dir(meta_path) / "strings.json").exists():
+            errors.append(f"columnar meta not found: {meta_columns_dir(meta_path)}")
+    elif bool(cfg.index.mmap) and not meta_offsets_path(meta_path).exists():
+        errors.append(f"meta offsets file not found (required by index.mmap): {meta_offsets_path(meta_path)}")
 
     if bool(cfg.generation.enabled) and not os.getenv("OPENAI_API_KEY"):
         errors.append("OPENAI_API_KEY is required when generation is enabled")
@@ -50,6 +62,7 @@ def create_app() -> FastAPI:
         repo_root = Path(__file__).resolve().parents[2]
         load_dotenv(repo_root / ".env")
         app.state.startup_errors = []
+        app.state.snapshot_swapper = None
 
         try:
             cfg, _ = load_app_config(repo_root)
@@ -75,11 +88,36 @@ def create_app() -> FastAPI:
         except Exception as e:
             app.state.pipeline = None
             app.state.startup_errors = [f"pipeline init failed: {e}"]
+            return
+
+        if cfg.index.snapshots:
+
+            def load_snapshot(snapshot_id: str) -> RAGPipeline:
+                # Reuse the loaded embedder (and its query cache); only the index changes.
+                current = app.state.pipeline
+                retriever = Retriever(repo_root, embedder=current.retriever.embedder, snapshot_id=snapshot_id)
+                return current.with_retriever(retriever)
+
+            swapper = SnapshotSwapper(
+                app.state,
+                snapshots_root(repo_root / cfg.index.index_path),
+                load_snapshot,
+                poll_s=cfg.index.snapshot_poll_s,
+            )
+            swapper.start()
+            app.state.snapshot_swapper = swapper
+
+    @app.on_event("shutdown")
+    def _shutdown() -> None:
+        swapper = getattr(app.state, "snapshot_swapper", None)
+        if swapper is not None:
+            swapper.stop()
 
     @app.get("/health", response_model=dict)
     def health() -> dict:
         pipeline = getattr(app.state, "pipeline", None)
         pipeline_loaded = pipeline is not None
+        swapper = getattr(app.state, "snapshot_swapper", None)
 
         dependencies = {
             "retriever_loaded": bool(getattr(pipeline, "retriever", None)) if pipeline_loaded else False,
@@ -94,6 +132,8 @@ def create_app() -> FastAPI:
             "pipeline_loaded": pipeline_loaded,
             "dependencies": dependencies,
             "startup_errors": getattr(app.state, "startup_errors", []),
+            "snapshot_id": getattr(getattr(pipeline, "retriever", None), "snapshot_id", None),
+            "snapshots": swapper.status() if swapper is not None else {"enabled": False},
         }
 
     @app.get("/stats", response_model=dict)
@@ -106,14 +146,41 @@ def create_app() -> FastAPI:
             else default_stats_summary()
         )
 
+        pipeline = getattr(app.state, "pipeline", None)
+        embedder = getattr(getattr(pipeline, "retriever", None), "embedder", None)
+        query_cache = getattr(embedder, "query_cache", None)
+
         return {
             "service": "enterprise-knowledge-assistant",
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "log_path": str(log_path),
             "logging_enabled": logging_enabled,
+            "query_embedding_cache": query_cache.stats() if query_cache is not None else {"enabled": False},
+            "shared_resources": registry.stats(),
             **summary,
         }
 
+    def _log_query(query: str, out: Any, *, request_id: str) -> None:
+        query_logger = getattr(app.state, "query_logger", None)
+        if query_logger is None:
+            return
+        try:
+            sources = out.get("sources", []) if isinstance(out, dict) else []
+            query_logger.log(
+                {
+                    "query": query,
+                    "type": out.get("type") if isinstance(out, dict) else None,
+                    "confidence": out.get("confidence") if isinstance(out, dict) else None,
+                    "meta": out.get("meta") if isinstance(out, dict) else {},
+                    "sources": sources if isinstance(sources, list) else [],
+                    "num_sources": len(sources) if isinstance(sources, list) else 0,
+                },
+                request_id=request_id,
+            )
+        except Exception:
+            # Logging failures should not fail API queries.
+            pass
+
     @app.post("/query", response_model=QueryResponse)
     def query_endpoint(
         payload: QueryRequest,
@@ -128,24 +195,7 @@ def create_app() -> FastAPI:
         try:
             out = pipeline.run(payload.query, request_id=request_id)
 
-            query_logger = getattr(app.state, "query_logger", None)
-            if query_logger is not None:
-                try:
-                    sources = out.get("sources", []) if isinstance(out, dict) else []
-                    query_logger.log(
-                        {
-                            "query": payload.query,
-                            "type": out.get("type") if isinstance(out, dict) else None,
-                            "confidence": out.get("confidence") if isinstance(out, dict) else None,
-                            "meta": out.get("meta") if isinstance(out, dict) else {},
-                            "sources": sources if isinstance(sources, list) else [],
-                            "num_sources": len(sources) if isinstance(sources, list) else 0,
-                        },
-                        request_id=request_id,
-                    )
-                except Exception:
-                    # Logging failures should not fail API queries.
-                    pass
+            _log_query(payload.query, out, request_id=request_id)
 
             return JSONResponse(content=out, headers={"X-Request-ID": request_id})
         except RuntimeError as e:
@@ -153,6 +203,26 @@ def create_app() -> FastAPI:
         except Exception as e:
             raise HTTPException(status_code=500, detail="Internal server error") from e
 
+    @app.post("/query/batch", response_model=BatchQueryResponse)
+    def query_batch_endpoint(
+        payload: BatchQueryRequest,
+        pipeline: RAGPipeline = Depends(get_pipeline),
+        x_request_id: str | None = Header(default=None),
+    ):
+        request_id = x_request_id or str(uuid.uuid4())
+        request_ids = [f"{request_id}-{i}" for i in range(len(payload.queries))]
+
+        try:
+            results = pipeline.run_many(payload.queries, request_ids=request_ids)
+            for query, out, rid in zip(payload.queries, results, request_ids):
+                _log_query(query, out, request_id=rid)
+
+            return JSONResponse(content={"results": results}, headers={"X-Request-ID": request_id})
+        except RuntimeError as e:
+            raise HTTPException(status_code=502, detail="Upstream generation provider error") from e
+        except Exception as e:
+            raise HTTPException(status_code=500, detail="Internal server error") from e
+
     return app
 
 
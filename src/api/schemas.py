@@ -17,6 +17,20 @@ class QueryRequest(BaseModel):
         return v
 
 
+class BatchQueryRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=64)
+
+    @field_validator("queries")
+    @classmethod
+    def validate_queries(cls, v: List[str]) -> List[str]:
+        for q in v:
+            if not q.strip():
+                raise ValueError("queries must not contain empty or whitespace entries")
+            if len(q) > 2000:
+                raise ValueError("each query must be at most 2000 characters")
+        return v
+
+
 class SourceItem(BaseModel):
     chunk_id: str
     doc_id: Optional[str] = None
@@ -43,7 +57,16 @@ class ResponseMeta(BaseModel):
     latency_ms_total: float = 0.0
     latency_ms_retrieval: float = 0.0
     latency_ms_generation: float = 0.0
+    retrieval_batch_size: int = 1
+    latency_ms_dense: Optional[float] = None
+    latency_ms_bm25: Optional[float] = None
+    bm25_deadline_missed: bool = False
+    bm25_skipped: bool = False
+    module_filter: List[str] = Field(default_factory=list)
+    context_expansion: str = "none"
+    context_k: int = 0
     request_id: Optional[str] = None
+    error: Optional[str] = None
 
 
 class QueryResponse(BaseModel):
@@ -53,3 +76,7 @@ class QueryResponse(BaseModel):
     sources: List[SourceItem] = Field(default_factory=list)
     citations: List[CitationItem] = Field(default_factory=list)
     meta: ResponseMeta
+
+
+class BatchQueryResponse(BaseModel):
+    results: List[QueryResponse] = Field(default_factory=list)
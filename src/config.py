@@ -6,6 +6,8 @@ from typing import Literal, Optional, Tuple
 from pydantic import BaseModel
 import yaml
 
+from src.utils.registry import registry, stat_key
+
 
 # ================================
 # Section Models
@@ -20,11 +22,38 @@ class EmbeddingsConfig(BaseModel):
     model_name: str
     normalize: bool = True
     batch_size: int = 64
+    query_cache_size: int = 0
+    query_cache_path: str = ""
+    backend: Literal["torch", "onnx"] = "torch"
+    onnx_dir: str = "models/onnx"
+    onnx_quantize: bool = True
+    onnx_threads: int = 0
+    encode_workers: int = 0
+    cache_dir: str = ""
 
 
 class IndexConfig(BaseModel):
     index_path: str
     meta_path: str
+    type: Literal["flat", "hnsw", "ivfpq"] = "flat"
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64
+    ivf_nlist: int = 256
+    ivf_nprobe: int = 16
+    pq_m: int = 48
+    pq_nbits: int = 8
+    mmap: bool = False
+    meta_format: Literal["jsonl", "columnar"] = "jsonl"
+    shards: int = 0
+    storage: Literal["float32", "float16", "sq8"] = "float32"
+    rescore: Literal["none", "float32", "float16"] = "none"
+    rescore_factor: int = 4
+    dedup_threshold: float = 0.0
+    stream_batch_size: int = 0
+    snapshots: bool = False
+    snapshot_keep: int = 3
+    snapshot_poll_s: float = 0.0
 
 
 class RetrievalConfig(BaseModel):
@@ -33,6 +62,14 @@ class RetrievalConfig(BaseModel):
     hybrid_rrf_k: int = 60
     hybrid_dense_weight: float = 1.0
     hybrid_bm25_weight: float = 1.0
+    parallel_hybrid: bool = False
+    bm25_deadline_ms: float = 0.0
+    bm25_workers: int = 2
+    module_filter: bool = False
+    symbol_definitions: bool = False
+    symbol_index_rerank: bool = False
+    context_expansion: Literal["none", "adjacent", "merged"] = "none"
+    context_window: int = 1
 
 
 class RerankerConfig(BaseModel):
@@ -97,5 +134,6 @@ def load_app_config(
     Returns both parsed config and resolved config path.
     """
     resolved = config_path or (repo_root / "config.yaml")
-    return load_config(resolved), resolved
+    # Parsed once per process (per file version) and shared by every component.
+    return registry.get("config", stat_key(resolved), lambda: load_config(resolved)), resolved
 
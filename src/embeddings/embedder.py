@@ -1,33 +1,106 @@
 from __future__ import annotations
 
-from typing import List
+from typing import Any, List
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import yaml
 from pathlib import Path
 
+from src.config import load_app_config
+
+from src.embeddings.onnx_backend import (
+    MODEL_FILENAME,
+    QUANTIZED_FILENAME,
+    OnnxEncoder,
+    embedding_model_id,
+    export_onnx,
+    onnx_model_dir,
+)
+from src.embeddings.query_cache import QueryEmbeddingCache, normalize_query_text
+from src.utils.registry import registry
+
 
 class Embedder:
     def __init__(self, config_path: Path):
-        with config_path.open("r", encoding="utf-8") as f:
-            self.config = yaml.safe_load(f)
+        cfg, _ = load_app_config(config_path.parent, config_path)
+        emb = cfg.embeddings
+
+        model_name = emb.model_name
+        self.model_name = model_name
+        self.normalize = emb.normalize
+        self.batch_size = emb.batch_size
+        self.backend = emb.backend
+        onnx_quantize = bool(emb.onnx_quantize)
+        # Backend-qualified model id: int8 vectors must not be served from an fp32 cache.
+        self.model_id = embedding_model_id(model_name, self.backend, onnx_quantize)
+
+        # Optional LRU cache for query embeddings (0 disables it).
+        cache_size = int(emb.query_cache_size or 0)
+        cache_path = emb.query_cache_path or ""
+        self.query_cache = QueryEmbeddingCache(cache_size) if cache_size > 0 else None
+        self.query_cache_path = (config_path.parent / cache_path) if cache_path else None
+        if self.query_cache is not None and self.query_cache_path is not None and self.query_cache_path.exists():
+            self.query_cache.load(self.query_cache_path)
+
+        # Model weights are shared process-wide: a second Embedder (another
+        # Retriever, a script next to the API) reuses the loaded model.
+        if self.backend == "onnx":
+            model_dir = onnx_model_dir(config_path.parent / emb.onnx_dir, model_name)
+            threads = int(emb.onnx_threads or 0)
+
+            def load_onnx() -> OnnxEncoder:
+                if not (model_dir / (QUANTIZED_FILENAME if onnx_quantize else MODEL_FILENAME)).exists():
+                    export_onnx(model_name, model_dir, quantize=onnx_quantize)
+                return OnnxEncoder(model_dir, quantized=onnx_quantize, threads=threads)
 
-        model_name = self.config["embeddings"]["model_name"]
-        self.normalize = self.config["embeddings"].get("normalize", True)
-        self.batch_size = self.config["embeddings"].get("batch_size", 64)
+            self.model = registry.get("onnx_encoder", (str(model_dir.resolve()), onnx_quantize, threads), load_onnx)
+        else:
 
-        self.model = SentenceTransformer(model_name)
+            def load_torch() -> Any:
+                from sentence_transformers import SentenceTransformer
 
-    def encode(self, texts: List[str]) -> np.ndarray:
-        embeddings = self.model.encode(
-            texts,
-            batch_size=self.batch_size,
-            convert_to_numpy=True,
-            show_progress_bar=True,
-        )
+                return SentenceTransformer(model_name)
+
+            self.model = registry.get("sentence_transformer", model_name, load_torch)
+
+    def encode(self, texts: List[str], *, show_progress_bar: bool = True) -> np.ndarray:
+        if isinstance(self.model, OnnxEncoder):
+            embeddings = self.model.encode(texts, batch_size=self.batch_size)
+        else:
+            embeddings = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=show_progress_bar,
+            )
 
         if self.normalize:
             norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
             embeddings = embeddings / np.clip(norms, a_min=1e-12, a_max=None)
 
         return embeddings.astype("float32")
+
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Encode search queries through the query cache (when enabled).
+        Only cache misses reach the model, in a single batch.
+        """
+        if self.query_cache is None:
+            return self.encode(queries, show_progress_bar=False)
+
+        keys = [(self.model_id, normalize_query_text(q)) for q in queries]
+        cached = [self.query_cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, vec in zip(keys, cached) if vec is None))
+        fresh = {}
+        if missing:
+            vecs = self.encode([text for _, text in missing], show_progress_bar=False)
+            for key, vec in zip(missing, vecs):
+                self.query_cache.put(key, vec)
+                fresh[key] = vec
+
+        rows = [vec if vec is not None else fresh[key] for key, vec in zip(keys, cached)]
+        return np.stack(rows).astype("float32") if rows else np.zeros((0, 0), dtype="float32")
+
+    def save_query_cache(self) -> int:
+        """Persist the query cache to `embeddings.query_cache_path`. Returns entries written."""
+        if self.query_cache is None or self.query_cache_path is None:
+            return 0
+        return self.query_cache.save(self.query_cache_path)
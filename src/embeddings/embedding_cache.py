@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+KEY_BYTES = 32
+# Segments are merged into one once there are more than this many.
+MAX_SEGMENTS = 16
+# Misses are written out as a new segment every this many rows, so a cold
+# streaming build does not hold every new vector in memory.
+FLUSH_ROWS = 16384
+# A compaction lock older than this is left over from a crashed build.
+STALE_LOCK_S = 600.0
+
+
+def embedding_key(model_id: str, normalize: bool, text: str) -> bytes:
+    """sha256 over (model, normalize flag, exact chunk text)."""
+    h = hashlib.sha256()
+    for part in (model_id, "1" if normalize else "0", text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.digest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, append-only store of text embeddings for one model.
+
+    Layout: `<root>/<model slug>/seg-*.keys.npy` ((n, 32) uint8 sha256 keys)
+    next to `seg-*.vectors.npy` ((n, dim) float32, memory-mapped on read).
+    A segment is visible once its keys file exists; the vectors file is
+    written first, both via rename, so concurrent builds never see a half
+    segment. Compaction runs under a lock file, and a segment that another
+    build compacted away mid-load is skipped (its rows are then misses).
+    """
+
+    def __init__(self, root: Path, *, model_id: str, normalize: bool):
+        self.model_id = model_id
+        self.normalize = bool(normalize)
+        self.dir = root / re.sub(r"[^A-Za-z0-9_.@-]+", "__", model_id)
+        self._index: Dict[bytes, Tuple[int, int]] = {}
+        self._segments: List[np.ndarray] = []
+        self._segment_names: List[str] = []
+        self._pending_keys: List[bytes] = []
+        self._pending_vecs: List[np.ndarray] = []
+        self._pending_index: Dict[bytes, int] = {}
+        self.dim: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.written = 0
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        self._index.clear()
+        self._segments.clear()
+        self._segment_names.clear()
+        if not self.dir.exists():
+            return
+        for keys_path in sorted(self.dir.glob("seg-*.keys.npy")):
+            name = keys_path.name[: -len(".keys.npy")]
+            try:
+                vectors = np.load(self.dir / f"{name}.vectors.npy", mmap_mode="r")
+                keys = np.load(keys_path)
+            except FileNotFoundError:
+                continue  # merged into a newer segment by another build's compact()
+            self._add_segment(name, keys, vectors)
+
+    def _add_segment(self, name: str, keys: np.ndarray, vectors: np.ndarray) -> None:
+        if keys.shape != (vectors.shape[0], KEY_BYTES):
+            raise ValueError(f"Embedding cache segment {name}: keys {keys.shape} vs vectors {vectors.shape}")
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif int(vectors.shape[1]) != self.dim:
+            raise ValueError(f"Embedding cache segment {name} has dim {vectors.shape[1]}, expected {self.dim}")
+        seg = len(self._segments)
+        self._segments.append(vectors)
+        self._segment_names.append(name)
+        raw = keys.tobytes()
+        for row in range(keys.shape[0]):
+            self._index.setdefault(raw[row * KEY_BYTES : (row + 1) * KEY_BYTES], (seg, row))
+
+    def _segment_name(self) -> str:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        return f"seg-{time.time_ns():020d}-{os.getpid()}"
+
+    def _publish(self, name: str, suffix: str, arr: Optional[np.ndarray] = None) -> None:
+        """Rename `.<name>.<suffix>.npy` into place, saving `arr` there first if given."""
+        tmp = self.dir / f".{name}.{suffix}.npy"
+        if arr is not None:
+            np.save(tmp, arr)
+        os.replace(tmp, self.dir / f"{name}.{suffix}.npy")
+
+    def _write_segment(self, keys: np.ndarray, vectors: np.ndarray) -> str:
+        name = self._segment_name()
+        self._publish(name, "vectors", vectors)
+        self._publish(name, "keys", keys)
+        return name
+
+    def flush(self) -> int:
+        """Write pending misses as a new segment (merging segments when there are many). Returns rows written."""
+        if not self._pending_keys:
+            return 0
+        keys = np.frombuffer(b"".join(self._pending_keys), dtype=np.uint8).reshape(-1, KEY_BYTES)
+        vectors = np.stack(self._pending_vecs).astype(np.float32)
+        name = self._write_segment(keys, vectors)
+        # Only the new segment is indexed; existing ones are not re-read.
+        self._add_segment(name, keys, np.load(self.dir / f"{name}.vectors.npy", mmap_mode="r"))
+        n = len(self._pending_keys)
+        self.written += n
+        self._pending_keys, self._pending_vecs, self._pending_index = [], [], {}
+        if len(self._segments) > MAX_SEGMENTS:
+            self.compact()
+        return n
+
+    def _lock_compaction(self) -> bool:
+        lock = self.dir / ".compact.lock"
+        try:
+            if time.time() - lock.stat().st_mtime > STALE_LOCK_S:
+                lock.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+
+    def compact(self) -> None:
+        """
+        Merge this instance's segments into one (first occurrence of a key
+        wins). Vectors are copied segment by segment into a memory-mapped
+        file, so the cache is never held in RAM. Skipped while another build
+        holds the compaction lock.
+        """
+        if len(self._segments) <= 1 or not self._lock_compaction():
+            return
+        try:
+            locs = np.array(list(self._index.values()), dtype=np.int64).reshape(-1, 2)
+            order = np.lexsort((locs[:, 1], locs[:, 0]))
+            keys = np.frombuffer(b"".join(self._index), dtype=np.uint8).reshape(-1, KEY_BYTES)[order]
+            segs, rows = locs[order, 0], locs[order, 1]
+            # Output rows are grouped by segment: segment s fills [bounds[s], bounds[s + 1]).
+            bounds = np.searchsorted(segs, np.arange(len(self._segments) + 1))
+
+            name = self._segment_name()
+            out = np.lib.format.open_memmap(
+                self.dir / f".{name}.vectors.npy", mode="w+", dtype=np.float32, shape=(len(rows), self.dim or 0)
+            )
+            for seg, vecs in enumerate(self._segments):
+                for start in range(bounds[seg], bounds[seg + 1], FLUSH_ROWS):
+                    end = min(start + FLUSH_ROWS, bounds[seg + 1])
+                    out[start:end] = vecs[rows[start:end]]
+            out.flush()
+            del out
+            self._publish(name, "vectors")
+            self._publish(name, "keys", keys)
+
+            for old_name in self._segment_names:
+                (self.dir / f"{old_name}.keys.npy").unlink(missing_ok=True)
+                (self.dir / f"{old_name}.vectors.npy").unlink(missing_ok=True)
+        finally:
+            (self.dir / ".compact.lock").unlink(missing_ok=True)
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._index) + len(self._pending_keys)
+
+    def key(self, text: str) -> bytes:
+        return embedding_key(self.model_id, self.normalize, text)
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        out: List[Optional[np.ndarray]] = []
+        for key in keys:
+            loc = self._index.get(key)
+            if loc is not None:
+                out.append(np.asarray(self._segments[loc[0]][loc[1]], dtype=np.float32))
+                continue
+            pending = self._pending_index.get(key)
+            out.append(self._pending_vecs[pending] if pending is not None else None)
+        return out
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif int(vectors.shape[1]) != self.dim:
+            raise ValueError(f"Embedding dim {vectors.shape[1]} != cache dim {self.dim} in {self.dir}")
+        for key, vec in zip(keys, vectors):
+            if key in self._index or key in self._pending_index:
+                continue
+            self._pending_index[key] = len(self._pending_keys)
+            self._pending_keys.append(key)
+            self._pending_vecs.append(np.asarray(vec, dtype=np.float32))
+        if len(self._pending_keys) >= FLUSH_ROWS:
+            self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": str(self.dir),
+            "entries": len(self),
+            "segments": len(self._segments),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "written": self.written,
+        }
+
+
+class CachedEmbedder:
+    """
+    `Embedder.encode` drop-in that serves previously embedded texts from an
+    EmbeddingCache and sends only unseen texts (once each) to `inner`.
+    Call `close()` to write the remaining misses to disk.
+    """
+
+    def __init__(self, inner: Any, cache: EmbeddingCache):
+        self.inner = inner
+        self.cache = cache
+
+    def encode(self, texts: List[str], *, show_progress_bar: bool = True) -> np.ndarray:
+        keys = [self.cache.key(t) for t in texts]
+        rows = self.cache.get_many(keys)
+        missing: Dict[bytes, str] = {}
+        for key, text, row in zip(keys, texts, rows):
+            if row is None:
+                missing.setdefault(key, text)
+        # A repeat of an unseen text within the call is encoded once: one miss.
+        self.cache.hits += len(texts) - len(missing)
+        self.cache.misses += len(missing)
+
+        if missing:
+            fresh = self.inner.encode(list(missing.values()), show_progress_bar=show_progress_bar)
+            self.cache.put_many(list(missing), fresh)
+            by_key = dict(zip(missing, fresh))
+            rows = [row if row is not None else by_key[key] for key, row in zip(keys, rows)]
+        if not rows:
+            return np.zeros((0, self.cache.dim or 0), dtype=np.float32)
+        return np.stack(rows).astype(np.float32)
+
+    def close(self) -> None:
+        self.cache.flush()
+        close = getattr(self.inner, "close", None)
+        if close is not None:
+            close()
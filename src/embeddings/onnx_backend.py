@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+
+MODEL_FILENAME = "model.onnx"
+QUANTIZED_FILENAME = "model.int8.onnx"
+EXPORT_INFO_FILENAME = "export.json"
+_INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def backend_label(backend: str, quantize: bool) -> str:
+    """Short id of the encoder numerics ("torch", "onnx", "onnx-int8"); vectors differ across labels."""
+    if backend != "onnx":
+        return "torch"
+    return "onnx-int8" if quantize else "onnx"
+
+
+def embedding_model_id(model_name: str, backend: str, quantize: bool) -> str:
+    """Model name qualified by the encoder numerics, for caches that must not mix them."""
+    label = backend_label(backend, quantize)
+    return model_name if label == "torch" else f"{model_name}@{label}"
+
+
+def onnx_model_dir(root: Path, model_name: str) -> Path:
+    """models/onnx + sentence-transformers/all-MiniLM-L6-v2 -> models/onnx/sentence-transformers__all-MiniLM-L6-v2."""
+    return root / re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError("embeddings.backend=onnx requires onnxruntime (pip install onnxruntime)") from e
+    return onnxruntime
+
+
+def export_onnx(model_name: str, out_dir: Path, *, quantize: bool = True, opset: int = 17) -> Path:
+    """
+    Export a mean-pooling SentenceTransformer to ONNX with pooling inside the
+    graph (output `sentence_embedding`, unnormalized), plus its tokenizer.
+    With `quantize`, also write a dynamically quantized int8 copy (MatMul
+    weights int8, activations quantized per batch at run time).
+    Returns the model file the encoder should load.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st = SentenceTransformer(model_name, device="cpu")
+    pooling = st[1]
+    if not getattr(pooling, "pooling_mode_mean_tokens", False):
+        raise ValueError(f"ONNX export supports mean-pooling models only: {model_name}")
+    transformer = st[0].auto_model.eval()
+
+    class _MeanPooled(torch.nn.Module):
+        def __init__(self, model: Any):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            hidden = self.model(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            )[0]
+            mask = attention_mask.unsqueeze(-1).to(hidden.dtype)
+            return (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    model_path = out_dir / MODEL_FILENAME
+    dummy = st.tokenizer(["an example sentence"], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            _MeanPooled(transformer),
+            tuple(dummy[name] for name in _INPUT_NAMES),
+            str(model_path),
+            input_names=list(_INPUT_NAMES),
+            output_names=["sentence_embedding"],
+            dynamic_axes={
+                **{name: {0: "batch", 1: "seq"} for name in _INPUT_NAMES},
+                "sentence_embedding": {0: "batch"},
+            },
+            opset_version=opset,
+        )
+    st.tokenizer.save_pretrained(str(out_dir))
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(model_path), str(out_dir / QUANTIZED_FILENAME), weight_type=QuantType.QInt8)
+
+    info = {"model_name": model_name, "max_seq_length": int(st.max_seq_length), "opset": opset, "quantized": quantize}
+    (out_dir / EXPORT_INFO_FILENAME).write_text(json.dumps(info, indent=2), encoding="utf-8")
+    return out_dir / (QUANTIZED_FILENAME if quantize else MODEL_FILENAME)
+
+
+class OnnxEncoder:
+    """
+    Sentence encoder on onnxruntime for a model written by `export_onnx`.
+    Batches are formed from length-sorted texts so padding stays short;
+    rows are returned in input order.
+    """
+
+    def __init__(
+        self,
+        model_dir: Path,
+        *,
+        quantized: bool = True,
+        threads: int = 0,
+        session: Any | None = None,
+        tokenizer: Any | None = None,
+        max_seq_length: Optional[int] = None,
+    ):
+        self.model_dir = model_dir
+        info_path = model_dir / EXPORT_INFO_FILENAME
+        info = json.loads(info_path.read_text(encoding="utf-8")) if info_path.exists() else {}
+        self.max_seq_length = int(max_seq_length or info.get("max_seq_length") or 256)
+
+        self._tokenizer = tokenizer
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+
+            self._tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+
+        self._session = session
+        if self._session is None:
+            ort = _import_onnxruntime()
+            options = ort.SessionOptions()
+            if threads > 0:
+                options.intra_op_num_threads = int(threads)
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            model_path = model_dir / (QUANTIZED_FILENAME if quantized else MODEL_FILENAME)
+            if not model_path.exists():
+                raise FileNotFoundError(f"ONNX model not found: {model_path} (run export_onnx)")
+            self._session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+    def encode(self, texts: List[str], *, batch_size: int = 64) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        rows: List[Optional[np.ndarray]] = [None] * len(texts)
+        for start in range(0, len(order), max(1, batch_size)):
+            batch = order[start : start + batch_size]
+            enc = self._tokenizer(
+                [texts[i] for i in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {
+                name: np.asarray(enc[name], dtype=np.int64)
+                for name in _INPUT_NAMES
+                if name in self._input_names and name in enc
+            }
+            if "token_type_ids" in self._input_names and "token_type_ids" not in feeds:
+                feeds["token_type_ids"] = np.zeros_like(feeds["input_ids"])
+            (out,) = self._session.run(["sentence_embedding"], feeds)
+            for i, vec in zip(batch, out):
+                rows[i] = vec
+        return np.stack(rows).astype("float32")
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.embeddings.embedder import Embedder
+
+
+def shard_ranges(n: int, *, workers: int, min_size: int) -> List[Tuple[int, int]]:
+    """
+    Contiguous [start, end) ranges over n texts. About four per worker so a
+    slow shard (long chunks) does not leave the other workers idle at the
+    end, but never smaller than one encode batch.
+    """
+    if n <= 0:
+        return []
+    size = max(int(min_size), math.ceil(n / (max(1, workers) * 4)))
+    return [(start, min(start + size, n)) for start in range(0, n, size)]
+
+
+# ----------------------------------------------------------------------
+# Encode worker (runs in its own process; state is set by the initializer)
+# ----------------------------------------------------------------------
+
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(factory: Callable[[], Any], threads: int) -> None:
+    # Each worker gets its share of the cores; torch defaults to all of them.
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _WORKER["embedder"] = factory()
+
+
+def _encode_shard(texts: List[str]) -> np.ndarray:
+    return _WORKER["embedder"].encode(texts, show_progress_bar=False)
+
+
+class EmbedderFactory:
+    """Picklable zero-arg factory: builds the configured Embedder inside a worker."""
+
+    def __init__(self, config_path: Path):
+        self.config_path = str(config_path)
+
+    def __call__(self) -> Any:
+        return Embedder(Path(self.config_path))
+
+
+def _worker_threads(workers: int) -> int:
+    return max(1, (os.cpu_count() or workers) // workers)
+
+
+def _start_pool(factory: Callable[[], Any], workers: int, threads: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(factory, threads),
+    )
+
+
+def _map_shards(
+    pool: ProcessPoolExecutor,
+    texts: List[str],
+    ranges: List[Tuple[int, int]],
+    log: Callable[[str], None],
+) -> np.ndarray:
+    parts: List[np.ndarray] = []
+    for (start, end), part in zip(ranges, pool.map(_encode_shard, [texts[s:e] for s, e in ranges])):
+        if part.shape[0] != end - start:
+            raise ValueError(f"Encode worker returned {part.shape[0]} rows for texts[{start}:{end}]")
+        parts.append(part)
+        log(f"[INFO] Encoded {end}/{len(texts)} texts")
+    return np.concatenate(parts).astype("float32")
+
+
+def encode_parallel(
+    texts: List[str],
+    *,
+    factory: Callable[[], Any],
+    workers: int,
+    batch_size: int = 64,
+    threads_per_worker: Optional[int] = None,
+    log: Callable[[str], None] = print,
+) -> np.ndarray:
+    """
+    Encode texts across `workers` spawned processes, each holding its own
+    encoder built by `factory`. Shards are contiguous and collected in
+    submission order, so row i of the result is the vector of texts[i].
+    """
+    ranges = shard_ranges(len(texts), workers=workers, min_size=batch_size)
+    if not ranges:
+        return np.zeros((0, 0), dtype="float32")
+    workers = max(1, min(int(workers), len(ranges)))
+    with _start_pool(factory, workers, threads_per_worker or _worker_threads(workers)) as pool:
+        return _map_shards(pool, texts, ranges, log)
+
+
+class ParallelEmbedder:
+    """
+    `Embedder.encode` drop-in for builds: inputs are sharded over worker
+    processes. Until the pool has been started, inputs smaller than
+    `min_pool_texts` (default: one batch per worker, e.g. an incremental
+    build's changed docs) are encoded in-process instead of paying the
+    worker start-up cost. Once the pool exists every call uses it, split so
+    each worker gets a share, and the in-process model is dropped. The pool
+    (and the model each worker loaded) is kept across calls until `close()`,
+    so a streaming build pays the start-up once.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        *,
+        workers: int,
+        batch_size: int = 64,
+        min_pool_texts: Optional[int] = None,
+    ):
+        self.factory = factory
+        self.workers = int(workers)
+        self.batch_size = int(batch_size)
+        self.min_pool_texts = self.batch_size * self.workers if min_pool_texts is None else int(min_pool_texts)
+        self._local: Any | None = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def encode(self, texts: List[str], *, show_progress_bar: bool = True) -> np.ndarray:
+        if self._pool is None and len(texts) < self.min_pool_texts:
+            if self._local is None:
+                self._local = self.factory()
+            return self._local.encode(texts, show_progress_bar=show_progress_bar)
+        if self._pool is None:
+            self._pool = _start_pool(self.factory, self.workers, _worker_threads(self.workers))
+            self._local = None
+        # Inputs below a batch per worker are still spread over every worker.
+        min_size = max(1, min(self.batch_size, math.ceil(len(texts) / max(1, self.workers))))
+        ranges = shard_ranges(len(texts), workers=self.workers, min_size=min_size)
+        if not ranges:
+            return np.zeros((0, 0), dtype="float32")
+        log = print if show_progress_bar else (lambda _: None)
+        return _map_shards(self._pool, texts, ranges, log)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
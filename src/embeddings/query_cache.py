@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+CacheKey = Tuple[str, str]
+
+
+def normalize_query_text(text: str) -> str:
+    """Collapse whitespace so trivially different spellings share a cache entry."""
+    return " ".join((text or "").split())
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings keyed by (model_name, normalized text).
+    Thread-safe: the API serves queries from a thread pool.
+    """
+
+    def __init__(self, max_size: int):
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive, got {max_size}")
+        self.max_size = int(max_size)
+        self._entries: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._entries.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vec
+
+    def put(self, key: CacheKey, vec: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = np.asarray(vec, dtype=np.float32)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def save(self, path: Path) -> int:
+        """Write entries (oldest first, so LRU order survives a reload). Returns the count."""
+        with self._lock:
+            keys = list(self._entries)
+            vecs = list(self._entries.values())
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        dim = vecs[0].shape[0] if vecs else 0
+        with path.open("wb") as f:
+            np.savez(
+                f,
+                models=np.asarray([m for m, _ in keys], dtype=np.str_),
+                texts=np.asarray([t for _, t in keys], dtype=np.str_),
+                vectors=np.stack(vecs) if vecs else np.zeros((0, dim), dtype=np.float32),
+            )
+        return len(keys)
+
+    def load(self, path: Path) -> int:
+        """Merge entries from `path` into the cache. Returns the count loaded."""
+        with np.load(path) as data:
+            models, texts, vectors = data["models"], data["texts"], data["vectors"]
+        for model, text, vec in zip(models, texts, vectors):
+            self.put((str(model), str(text)), vec)
+        return int(len(texts))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 import re
 import time
 import uuid
@@ -225,6 +226,22 @@ class RAGPipeline:
         self.gate = ConfidenceGate(repo_root)
         self.generator = Generator(repo_root)
 
+    def with_retriever(self, retriever: Retriever) -> "RAGPipeline":
+        """Shallow copy sharing the reranker/gate/generator, reading from another index."""
+        pipeline = copy.copy(self)
+        pipeline.retriever = retriever
+        return pipeline
+
+    def _retrieval_k(self) -> int | None:
+        return self.reranker.candidate_k if self.reranker.enabled else None
+
+    def _module_filter(self, query: str) -> List[str]:
+        """Modules named by the query ("in pathlib", "json module") that exist in the index."""
+        if not bool(self.cfg.retrieval.module_filter):
+            return []
+        hints = self.gate._extract_module_hints(query)
+        return sorted(hints & self.retriever.known_modules()) if hints else []
+
     def run(self, query: str, request_id: str | None = None) -> Dict[str, Any]:
         request_id = request_id or str(uuid.uuid4())
 
@@ -232,41 +249,142 @@ class RAGPipeline:
 
         intent = classify_query_intent(query)
         if should_refuse_upstream(intent):
-            t1 = time.perf_counter()
-            return {
-                "type": "refuse",
-                "answer": "I do not have enough information in the Python standard library documentation to answer that.",
-                "confidence": 0.0,
-                "sources": [],
-                "citations": [],
-                "meta": {
-                    "top_score": 0.0,
-                    "second_score": 0.0,
-                    "score_margin": 0.0,
-                    "gate_decision": "refuse",
-                    "gate_rationale": "Step-3 upstream intent route refused query before retrieval.",
-                    "gate_tie_breaker_fired": False,
-                    "intent_label": intent.label,
-                    "intent_confidence": float(intent.confidence),
-                    "intent_rationale": intent.rationale,
-                    "intent_signals": intent.signals,
-                    "intent_routed_refuse": True,
-                    "postgen_refusal_override_triggered": False,
-                    "postgen_refusal_override_blocked": False,
-                    "postgen_refusal_override_block_reasons": [],
-                    "postgen_refusal_override_rescue_code": "",
-                    "retrieved_k": 0,
-                    "latency_ms_total": (t1 - t0) * 1000,
-                    "latency_ms_retrieval": 0.0,
-                    "latency_ms_generation": 0.0,
-                    "request_id": request_id,
-                },
-            }
+            return self._upstream_refusal(intent, request_id=request_id, t0=t0)
 
         # --- Retrieval ---
         t_retrieval_start = time.perf_counter()
-        retrieval_k = self.reranker.candidate_k if self.reranker.enabled else None
-        hits = self.retriever.retrieve(query, top_k=retrieval_k)
+        module_filter = self._module_filter(query)
+        retrieval_trace: Dict[str, Any] = {"module_filter": module_filter}
+        hits = self.retriever.retrieve(
+            query,
+            top_k=self._retrieval_k(),
+            trace=retrieval_trace,
+            modules=module_filter,
+        )
+        return self._complete(
+            query,
+            hits,
+            intent=intent,
+            request_id=request_id,
+            t0=t0,
+            t_retrieval_start=t_retrieval_start,
+            retrieval_trace=retrieval_trace,
+        )
+
+    def run_many(
+        self,
+        queries: List[str],
+        request_ids: List[str | None] | None = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run a batch of queries, sharing one batched retrieval call
+        (`Retriever.retrieve_many`). Each query is then reranked, gated and
+        generated on its own. The batched retrieval time is split evenly
+        across the retrieved queries in `latency_ms_retrieval` (see
+        `retrieval_batch_size`); `latency_ms_total` runs from the query's own
+        intent classification, so it includes waiting on the shared retrieval
+        and on earlier queries' generation. A generation provider error
+        (RuntimeError) refuses only that query, with `meta.error` set.
+        """
+        request_ids = list(request_ids or [None] * len(queries))
+        request_ids = [rid or str(uuid.uuid4()) for rid in request_ids]
+        results: List[Dict[str, Any] | None] = [None] * len(queries)
+
+        pending: List[int] = []
+        intents = []
+        starts: List[float] = []
+        for i, query in enumerate(queries):
+            t0 = time.perf_counter()
+            starts.append(t0)
+            intent = classify_query_intent(query)
+            intents.append(intent)
+            if should_refuse_upstream(intent):
+                results[i] = self._upstream_refusal(intent, request_id=request_ids[i], t0=t0)
+            else:
+                pending.append(i)
+
+        t_batch_start = time.perf_counter()
+        module_filters = [self._module_filter(queries[i]) for i in pending]
+        retrieval_trace: Dict[str, Any] = {}
+        batch_hits = self.retriever.retrieve_many(
+            [queries[i] for i in pending],
+            top_k=self._retrieval_k(),
+            trace=retrieval_trace,
+            modules=module_filters,
+        )
+        share_s = (time.perf_counter() - t_batch_start) / max(1, len(pending))
+
+        for i, hits, module_filter in zip(pending, batch_hits, module_filters):
+            # Retrieval = this query's share of the batched call plus its own
+            # rerank; the total is measured from its own classification.
+            t_retrieval_start = time.perf_counter() - share_s
+            try:
+                results[i] = self._complete(
+                    queries[i],
+                    hits,
+                    intent=intents[i],
+                    request_id=request_ids[i],
+                    t0=starts[i],
+                    t_retrieval_start=t_retrieval_start,
+                    retrieval_batch_size=len(pending),
+                    retrieval_trace={**retrieval_trace, "module_filter": module_filter},
+                )
+            except RuntimeError:
+                results[i] = self._upstream_refusal(intents[i], request_id=request_ids[i], t0=starts[i])
+                results[i]["meta"].update(
+                    {
+                        "gate_rationale": "Generation provider error; refused this batch item.",
+                        "intent_routed_refuse": False,
+                        "retrieval_batch_size": len(pending),
+                        "error": "Upstream generation provider error",
+                    }
+                )
+        return [r for r in results if r is not None]
+
+    def _upstream_refusal(self, intent: Any, *, request_id: str, t0: float) -> Dict[str, Any]:
+        t1 = time.perf_counter()
+        return {
+            "type": "refuse",
+            "answer": "I do not have enough information in the Python standard library documentation to answer that.",
+            "confidence": 0.0,
+            "sources": [],
+            "citations": [],
+            "meta": {
+                "top_score": 0.0,
+                "second_score": 0.0,
+                "score_margin": 0.0,
+                "gate_decision": "refuse",
+                "gate_rationale": "Step-3 upstream intent route refused query before retrieval.",
+                "gate_tie_breaker_fired": False,
+                "intent_label": intent.label,
+                "intent_confidence": float(intent.confidence),
+                "intent_rationale": intent.rationale,
+                "intent_signals": intent.signals,
+                "intent_routed_refuse": True,
+                "postgen_refusal_override_triggered": False,
+                "postgen_refusal_override_blocked": False,
+                "postgen_refusal_override_block_reasons": [],
+                "postgen_refusal_override_rescue_code": "",
+                "retrieved_k": 0,
+                "latency_ms_total": (t1 - t0) * 1000,
+                "latency_ms_retrieval": 0.0,
+                "latency_ms_generation": 0.0,
+                "request_id": request_id,
+            },
+        }
+
+    def _complete(
+        self,
+        query: str,
+        hits: List[Any],
+        *,
+        intent: Any,
+        request_id: str,
+        t0: float,
+        t_retrieval_start: float,
+        retrieval_batch_size: int = 1,
+        retrieval_trace: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
         reranker_applied = self.reranker.should_rerank(hits)
         if reranker_applied:
             hits = self.reranker.rerank(query, hits, top_k=int(self.cfg.retrieval.top_k))
@@ -278,6 +396,7 @@ class RAGPipeline:
 
         sources: List[Dict[str, Any]] = []
         citations: List[Dict[str, Any]] = []
+        context_chunks: List[Any] = []
         answer_text = ""
         result_type = decision.decision
 
@@ -298,15 +417,23 @@ class RAGPipeline:
 
         # --- If answer ---
         else:
+            # Neighbouring chunks widen the generator's context after the gate
+            # has judged the hits themselves; citations number these chunks.
+            context_chunks = self.retriever.expand_context(
+                decision.used_chunks,
+                mode=str(self.cfg.retrieval.context_expansion),
+                window=int(self.cfg.retrieval.context_window),
+            )
+
             t_gen_start = time.perf_counter()
-            answer_text = self.generator.generate(query, decision.used_chunks)
+            answer_text = self.generator.generate(query, context_chunks)
             t_gen_end = time.perf_counter()
 
             source_mapping: List[Dict[str, Any]] = []
             citation_ids: List[int] = []
             parsed_citations: List[Dict[str, Any]] = []
             try:
-                _, source_mapping = format_retrieved_chunks(decision.used_chunks)
+                _, source_mapping = format_retrieved_chunks(context_chunks)
                 citation_ids = _extract_citation_ids(answer_text)
                 parsed_citations = _build_citations_from_ids(citation_ids, source_mapping)
             except Exception:
@@ -327,7 +454,7 @@ class RAGPipeline:
                     answer_text=answer_text,
                     gate_decision=decision.decision,
                     mismatch_subtype=mismatch_subtype,
-                    used_chunks=decision.used_chunks,
+                    used_chunks=context_chunks,
                     citation_ids=citation_ids,
                     gate=self.gate,
                 )
@@ -335,7 +462,7 @@ class RAGPipeline:
                 if override_blocked:
                     result_type = "answer"
                     citations = parsed_citations
-                    for h in decision.used_chunks:
+                    for h in context_chunks:
                         sources.append(
                             {
                                 "chunk_id": h.chunk_id,
@@ -353,7 +480,7 @@ class RAGPipeline:
                 result_type = "answer"
                 citations = parsed_citations
 
-                for h in decision.used_chunks:
+                for h in context_chunks:
                     sources.append(
                         {
                             "chunk_id": h.chunk_id,
@@ -407,11 +534,17 @@ class RAGPipeline:
                     else ""
                 ),
                 "retrieved_k": len(hits),
+                "context_expansion": str(self.cfg.retrieval.context_expansion),
+                "context_k": len(context_chunks),
                 "reranker_enabled": bool(self.reranker.enabled),
                 "reranker_strategy": str(self.reranker.strategy),
                 "reranker_applied": bool(reranker_applied),
                 "latency_ms_total": (t1 - t0) * 1000,
                 "latency_ms_retrieval": (t_retrieval_end - t_retrieval_start) * 1000,
+                "retrieval_batch_size": int(retrieval_batch_size),
+                # Per-leg timings (latency_ms_dense / latency_ms_bm25) and
+                # bm25_deadline_missed from the retriever.
+                **(retrieval_trace or {}),
                 "latency_ms_generation": (
                     (t_gen_end - t_gen_start) * 1000
                     if decision.decision == "answer"
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Okapi BM25 parameters (same defaults as rank_bm25.BM25Okapi).
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_EPSILON = 0.25
+
+
+_ARRAYS = ("vocab", "indptr", "postings_doc", "postings_tf", "doc_len", "idf")
+
+
+def tokenize_for_bm25(text: str) -> List[str]:
+    return re.findall(r"[a-zA-Z_][\w\.]*", (text or "").lower())
+
+
+def bm25_artifact_dir(index_path: Path) -> Path:
+    """faiss.index -> bm25/ (serialized BM25Index written next to the FAISS index)."""
+    return index_path.parent / "bm25"
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a CSR inverted index (term -> postings of doc id + tf).
+
+    Scoring only touches the postings of the query terms and selects the
+    top-k with argpartition, so a query costs O(postings) instead of O(N).
+    Scores are numerically identical to rank_bm25.BM25Okapi.get_scores,
+    including its epsilon floor for negative idf values.
+    """
+
+    def __init__(
+        self,
+        *,
+        vocab: np.ndarray,
+        indptr: np.ndarray,
+        postings_doc: np.ndarray,
+        postings_tf: np.ndarray,
+        doc_len: np.ndarray,
+        idf: np.ndarray,
+        avgdl: float,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+        doc_ids: Optional[np.ndarray] = None,
+    ):
+        self.vocab = vocab  # sorted, so term lookup is a binary search
+        self.indptr = indptr
+        self.postings_doc = postings_doc
+        self.postings_tf = postings_tf
+        self.doc_len = doc_len
+        self.idf = idf
+        self.avgdl = float(avgdl)
+        self.k1 = float(k1)
+        self.b = float(b)
+        # Shard of a larger corpus: global doc id of each local row (ascending).
+        self.doc_ids = doc_ids
+
+    @classmethod
+    def build(
+        cls,
+        tokenized_docs: Iterable[List[str]],
+        *,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+        epsilon: float = BM25_EPSILON,
+    ) -> "BM25Index":
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_len: List[int] = []
+        total_tokens = 0
+
+        for doc_id, tokens in enumerate(tokenized_docs):
+            doc_len.append(len(tokens))
+            total_tokens += len(tokens)
+            freqs: Dict[str, int] = {}
+            for tok in tokens:
+                freqs[tok] = freqs.get(tok, 0) + 1
+            for tok, tf in freqs.items():
+                postings.setdefault(tok, []).append((doc_id, tf))
+
+        n_docs = len(doc_len)
+        avgdl = total_tokens / n_docs if n_docs else 0.0
+
+        # idf in first-occurrence order, mirroring BM25Okapi._calc_idf so the
+        # average (and therefore the epsilon floor) is bit-for-bit the same.
+        idf_by_term: Dict[str, float] = {}
+        idf_sum = 0.0
+        negative: List[str] = []
+        for term, plist in postings.items():
+            df = len(plist)
+            value = math.log(n_docs - df + 0.5) - math.log(df + 0.5)
+            idf_by_term[term] = value
+            idf_sum += value
+            if value < 0:
+                negative.append(term)
+        if idf_by_term:
+            eps = epsilon * (idf_sum / len(idf_by_term))
+            for term in negative:
+                idf_by_term[term] = eps
+
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            indptr[i + 1] = indptr[i] + len(postings[term])
+        postings_doc = np.empty(int(indptr[-1]), dtype=np.int32)
+        postings_tf = np.empty(int(indptr[-1]), dtype=np.int32)
+        for i, term in enumerate(terms):
+            plist = postings[term]
+            postings_doc[indptr[i]:indptr[i + 1]] = [d for d, _ in plist]
+            postings_tf[indptr[i]:indptr[i + 1]] = [tf for _, tf in plist]
+
+        return cls(
+            vocab=np.asarray(terms, dtype=np.str_),
+            indptr=indptr,
+            postings_doc=postings_doc,
+            postings_tf=postings_tf,
+            doc_len=np.asarray(doc_len, dtype=np.int32),
+            idf=np.asarray([idf_by_term[t] for t in terms], dtype=np.float64),
+            avgdl=avgdl,
+            k1=k1,
+            b=b,
+        )
+
+    def subset(self, doc_ids: np.ndarray) -> "BM25Index":
+        """
+        Restrict the index to `doc_ids` (e.g. one shard's documents) while
+        keeping the corpus-wide idf and avgdl, so every document scores exactly
+        as it does in the full index. `search` on the subset returns global ids.
+        """
+        if self.doc_ids is not None:
+            raise ValueError("subset() needs the full index, not a shard")
+        doc_ids = np.unique(np.asarray(doc_ids, dtype=np.int64))
+        local = np.full(len(self), -1, dtype=np.int64)
+        local[doc_ids] = np.arange(doc_ids.size)
+
+        posting_local = local[self.postings_doc]
+        keep = posting_local >= 0
+        term_of_posting = np.repeat(np.arange(self.vocab.shape[0]), np.diff(self.indptr))
+        counts = np.bincount(term_of_posting[keep], minlength=self.vocab.shape[0])
+        terms = counts > 0
+        indptr = np.zeros(int(terms.sum()) + 1, dtype=np.int64)
+        np.cumsum(counts[terms], out=indptr[1:])
+
+        return BM25Index(
+            vocab=self.vocab[terms],
+            indptr=indptr,
+            postings_doc=posting_local[keep].astype(np.int32),
+            postings_tf=np.asarray(self.postings_tf[keep]),
+            doc_len=np.asarray(self.doc_len[doc_ids]),
+            idf=np.asarray(self.idf[terms]),
+            avgdl=self.avgdl,
+            k1=self.k1,
+            b=self.b,
+            doc_ids=doc_ids,
+        )
+
+    def __len__(self) -> int:
+        return int(self.doc_len.shape[0])
+
+    def save(self, out_dir: Path) -> None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(out_dir / f"{name}.npy", getattr(self, name))
+        doc_ids_path = out_dir / "doc_ids.npy"
+        if self.doc_ids is not None:
+            np.save(doc_ids_path, self.doc_ids)
+        else:
+            doc_ids_path.unlink(missing_ok=True)
+        params = {"n_docs": len(self), "avgdl": self.avgdl, "k1": self.k1, "b": self.b}
+        (out_dir / "params.json").write_text(json.dumps(params, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, in_dir: Path, *, mmap_mode: bool = False) -> "BM25Index":
+        """Load a saved index without re-tokenizing the corpus."""
+        params_path = in_dir / "params.json"
+        if not params_path.exists():
+            raise FileNotFoundError(f"BM25 artifact not found: {in_dir}")
+        params = json.loads(params_path.read_text(encoding="utf-8"))
+        load_mode = "r" if mmap_mode else None
+        arrays = {name: np.load(in_dir / f"{name}.npy", mmap_mode=load_mode) for name in _ARRAYS}
+        doc_ids_path = in_dir / "doc_ids.npy"
+        if doc_ids_path.exists():
+            arrays["doc_ids"] = np.load(doc_ids_path, mmap_mode=load_mode)
+        index = cls(**arrays, avgdl=params["avgdl"], k1=params["k1"], b=params["b"])
+        if len(index) != int(params["n_docs"]):
+            raise ValueError(f"BM25 artifact is inconsistent: doc_len has {len(index)} rows, params say {params['n_docs']}")
+        return index
+
+    def _term_id(self, token: str) -> int:
+        pos = int(np.searchsorted(self.vocab, token))
+        if pos < self.vocab.shape[0] and self.vocab[pos] == token:
+            return pos
+        return -1
+
+    def _term_scores(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = int(self.indptr[term_id]), int(self.indptr[term_id + 1])
+        docs = self.postings_doc[start:end]
+        tf = self.postings_tf[start:end].astype(np.float64)
+        dl = self.doc_len[docs]
+        # Same operation order as BM25Okapi.get_scores for identical floats.
+        contrib = self.idf[term_id] * (
+            tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * dl / self.avgdl))
+        )
+        return docs, contrib
+
+    def score_postings(self, tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (doc_ids, scores) for every document that matches a query token."""
+        parts = [self._term_scores(t) for t in (self._term_id(tok) for tok in tokens) if t >= 0]
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        all_docs = np.concatenate([docs for docs, _ in parts])
+        all_contrib = np.concatenate([contrib for _, contrib in parts])
+        doc_ids, inverse = np.unique(all_docs, return_inverse=True)
+        scores = np.zeros(doc_ids.shape[0], dtype=np.float64)
+        # np.add.at accumulates in query-token order, like repeated `score +=`.
+        np.add.at(scores, inverse, all_contrib)
+        return doc_ids.astype(np.int64), scores
+
+    def get_scores(self, tokens: List[str]) -> np.ndarray:
+        """Dense score vector over all documents (BM25Okapi.get_scores equivalent)."""
+        out = np.zeros(len(self), dtype=np.float64)
+        doc_ids, scores = self.score_postings(tokens)
+        out[doc_ids] = scores
+        return out
+
+    def search(
+        self,
+        tokens: List[str],
+        k: int,
+        *,
+        allowed: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k documents with a positive score, ordered by score desc then doc id.
+        Documents that match no query term are never returned. `allowed` (unique
+        doc ids) restricts the candidates, e.g. to one module's chunks. Shards
+        from `subset` take and return global doc ids.
+        """
+        doc_ids, scores = self.score_postings(tokens)
+        if self.doc_ids is not None:
+            # Ascending local rows map to ascending global ids: order is kept.
+            doc_ids = np.asarray(self.doc_ids[doc_ids], dtype=np.int64)
+        positive = scores > 0.0
+        if allowed is not None:
+            positive &= np.isin(doc_ids, allowed, assume_unique=True)
+        doc_ids, scores = doc_ids[positive], scores[positive]
+        if k <= 0 or doc_ids.size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        if doc_ids.size > k:
+            # Keep everything tied with the k-th score so the id tie-break below
+            # is exact, not whatever argpartition happened to pick.
+            kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+            keep = scores >= kth
+            doc_ids, scores = doc_ids[keep], scores[keep]
+        order = np.lexsort((doc_ids, -scores))[:k]
+        return doc_ids[order], scores[order].astype(np.float32)
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, List, Sequence
+from typing import Any, List, Optional, Sequence
 
 import numpy as np
 
 from src.config import load_app_config
 from src.retrieval.retriever import RetrievedChunk
+from src.utils.registry import registry
 
 
 class CrossEncoderReranker:
@@ -16,10 +17,17 @@ class CrossEncoderReranker:
     continue to operate on the same scale.
     """
 
-    def __init__(self, repo_root: Path, *, model: Any | None = None):
-        cfg, _ = load_app_config(repo_root)
+    def __init__(
+        self,
+        repo_root: Path,
+        *,
+        model: Any | None = None,
+        config_path: Optional[Path] = None,
+        enabled: Optional[bool] = None,
+    ):
+        cfg, _ = load_app_config(repo_root, config_path)
 
-        self.enabled = bool(cfg.reranker.enabled)
+        self.enabled = bool(cfg.reranker.enabled if enabled is None else enabled)
         self.model_name = str(cfg.reranker.model_name)
         self.candidate_k = max(1, int(cfg.reranker.candidate_k))
         self.max_length = max(32, int(cfg.reranker.max_length))
@@ -28,9 +36,12 @@ class CrossEncoderReranker:
 
         self._model = model
         if self.enabled and self._model is None:
-            from sentence_transformers import CrossEncoder
+            def load() -> Any:
+                from sentence_transformers import CrossEncoder
 
-            self._model = CrossEncoder(self.model_name, max_length=self.max_length)
+                return CrossEncoder(self.model_name, max_length=self.max_length)
+
+            self._model = registry.get("cross_encoder", (self.model_name, self.max_length), load)
 
     @staticmethod
     def _pair_text(hit: RetrievedChunk) -> str:
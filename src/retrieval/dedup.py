@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+import faiss
+import numpy as np
+
+# Rows per FAISS range_search call (bounds the result buffers).
+_RANGE_SEARCH_BATCH = 4096
+
+
+def near_duplicate_canonicals(vectors: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Greedy near-duplicate grouping by embedding cosine (vectors are normalized).
+
+    Rows are visited in order; a row whose cosine with an earlier *kept* row
+    exceeds `threshold` becomes an alias of the most similar such row,
+    otherwise it is kept. Returns (canonical, similarity): canonical[i] == i
+    for kept rows, and aliases always point at a kept row (no chains).
+    """
+    n = int(vectors.shape[0])
+    canonical = np.arange(n, dtype=np.int64)
+    similarity = np.ones(n, dtype=np.float32)
+    if n == 0:
+        return canonical, similarity
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    for start in range(0, n, _RANGE_SEARCH_BATCH):
+        lims, sims, ids = index.range_search(vectors[start:start + _RANGE_SEARCH_BATCH], float(threshold))
+        for row in range(int(lims.shape[0]) - 1):
+            i = start + row
+            nb = ids[lims[row]:lims[row + 1]]
+            nb_sims = sims[lims[row]:lims[row + 1]]
+            earlier_kept = (nb < i) & (canonical[nb] == nb)
+            if earlier_kept.any():
+                best = int(np.argmax(np.where(earlier_kept, nb_sims, -np.inf)))
+                canonical[i] = nb[best]
+                similarity[i] = nb_sims[best]
+    return canonical, similarity
+
+
+def dedup_chunks(
+    chunks: List[Dict[str, Any]],
+    vectors: np.ndarray,
+    threshold: float,
+) -> Tuple[List[Dict[str, Any]], np.ndarray, int]:
+    """
+    Drop near-duplicate chunks before indexing. Each kept chunk lists the
+    chunks merged into it under meta["aliases"] (chunk_id, doc_id, module,
+    similarity), so citations can still point at every source.
+    Returns (kept_chunks, kept_vectors, n_aliases).
+    """
+    canonical, similarity = near_duplicate_canonicals(vectors, threshold)
+    aliases: Dict[int, List[Dict[str, Any]]] = {}
+    for i in np.flatnonzero(canonical != np.arange(len(chunks))):
+        c = chunks[i]
+        aliases.setdefault(int(canonical[i]), []).append(
+            {
+                "chunk_id": c["chunk_id"],
+                "doc_id": c["doc_id"],
+                "module": c["module"],
+                "similarity": round(float(similarity[i]), 4),
+            }
+        )
+
+    kept_rows = np.flatnonzero(canonical == np.arange(len(chunks)))
+    kept: List[Dict[str, Any]] = []
+    for i in kept_rows:
+        c = chunks[i]
+        if int(i) in aliases:
+            c = {**c, "meta": {**(c.get("meta") or {}), "aliases": aliases[int(i)]}}
+        kept.append(c)
+    return kept, vectors[kept_rows], len(chunks) - len(kept)
+
+
+def count_aliases(records: Any) -> int:
+    """Chunks folded into meta records by dedup (chunks.jsonl rows == meta rows + aliases)."""
+    return sum(len((rec.get("meta") or {}).get("aliases") or ()) for rec in records)
@@ -1,22 +1,214 @@
 from __future__ import annotations
 
+from typing import Optional
+import math
+
 import faiss
 import numpy as np
 from pathlib import Path
 
+from src.config import IndexConfig
+
+
+# index.storage -> FAISS scalar quantizer for flat/HNSW vector storage.
+_SQ_TYPES = {
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+def rescore_vectors_path(index_path: Path) -> Path:
+    """faiss.index -> vectors.npy (full-precision side file for exact rescoring)."""
+    return index_path.parent / "vectors.npy"
+
+
+def make_index(dim: int, index_cfg: Optional[IndexConfig] = None) -> faiss.Index:
+    """
+    Build an empty FAISS index for `index_cfg.type`.
+    All index types use inner product (cosine on normalized vectors).
+    Flat and HNSW store float32 vectors, or float16 / 8-bit scalar-quantized
+    codes per `index_cfg.storage` (2x / 4x smaller, approximate scores).
+    """
+    index_type = index_cfg.type if index_cfg is not None else "flat"
+    storage = index_cfg.storage if index_cfg is not None else "float32"
+    qtype = _SQ_TYPES.get(storage)
+
+    if index_type == "flat":
+        if qtype is not None:
+            return faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexFlatIP(dim)
+
+    if index_type == "hnsw":
+        if qtype is not None:
+            index = faiss.IndexHNSWSQ(dim, qtype, int(index_cfg.hnsw_m), faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWFlat(dim, int(index_cfg.hnsw_m), faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = int(index_cfg.hnsw_ef_construction)
+        index.hnsw.efSearch = int(index_cfg.hnsw_ef_search)
+        return index
+
+    if index_type == "ivfpq":
+        if qtype is not None:
+            raise ValueError(f"index.storage={storage} applies to flat/hnsw; ivfpq already stores PQ codes")
+        if dim % int(index_cfg.pq_m) != 0:
+            raise ValueError(f"index.pq_m={index_cfg.pq_m} must divide embedding dim {dim}")
+        factory = f"IVF{int(index_cfg.ivf_nlist)},PQ{int(index_cfg.pq_m)}x{int(index_cfg.pq_nbits)}"
+        index = faiss.index_factory(dim, factory, faiss.METRIC_INNER_PRODUCT)
+        faiss.extract_index_ivf(index).nprobe = int(index_cfg.ivf_nprobe)
+        return index
+
+    raise ValueError(f"Unsupported index type: {index_type}")
+
+
+def base_index(index: faiss.Index) -> faiss.Index:
+    """Unwrap an IndexIDMap/IndexIDMap2 to the index that actually stores the vectors."""
+    inner = faiss.downcast_index(index)
+    if isinstance(inner, faiss.IndexIDMap):
+        inner = faiss.downcast_index(inner.index)
+    return inner
+
+
+def supports_incremental_update(index: faiss.Index) -> bool:
+    """
+    True for an IndexIDMap2 over a flat index. IDMap.remove_ids assumes the
+    inner index compacts its storage, which IVF lists do not, and HNSW does
+    not support removal at all.
+    """
+    return isinstance(faiss.downcast_index(index), faiss.IndexIDMap2) and isinstance(
+        base_index(index), faiss.IndexFlat
+    )
+
+
+def compact_ids(index: faiss.IndexIDMap2) -> None:
+    """
+    Renumber ids to 0..ntotal-1 in storage order. After `remove_ids` this
+    keeps FAISS ids equal to meta.jsonl vector ids (rows stay in their order).
+    """
+    faiss.copy_array_to_vector(np.arange(index.ntotal, dtype=np.int64), index.id_map)
+    index.construct_rev_map()
+
+
+def min_training_points(index: faiss.Index) -> int:
+    """Smallest training set FAISS accepts for `index` (0 if no training is needed)."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None:
+        return 0
+    needed = int(ivf.nlist)
+    pq = getattr(faiss.downcast_index(ivf), "pq", None)
+    if pq is not None:
+        needed = max(needed, 1 << int(pq.nbits))
+    return needed
+
+
+def configure_search(index: faiss.Index, index_cfg: IndexConfig) -> faiss.Index:
+    """Apply query-time knobs (HNSW efSearch, IVF nprobe) to a loaded index."""
+    inner = base_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = int(index_cfg.hnsw_ef_search)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = int(index_cfg.ivf_nprobe)
+    return index
+
+
+def id_selector(ids: np.ndarray) -> faiss.IDSelector:
+    """Selector over sorted vector ids: a range when they are contiguous, else a batch."""
+    if ids.size and int(ids[-1]) - int(ids[0]) + 1 == ids.size:
+        return faiss.IDSelectorRange(int(ids[0]), int(ids[-1]) + 1)
+    return faiss.IDSelectorBatch(np.ascontiguousarray(ids, dtype=np.int64))
+
+
+def filtered_search_params(
+    index: faiss.Index,
+    index_cfg: IndexConfig,
+    selector: faiss.IDSelector,
+    *,
+    n_allowed: int,
+    k: int,
+) -> faiss.SearchParameters:
+    """
+    SearchParameters restricting `index.search` to `selector`, carrying the
+    same efSearch/nprobe knobs as `configure_search` (params override them).
+    The caller must keep `selector` alive for the duration of the search.
+    """
+    inner = base_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        # Filtered HNSW still walks the whole graph and only collects allowed
+        # nodes, so widen the beam by the selectivity or small subsets are missed.
+        ef = max(int(index_cfg.hnsw_ef_search), math.ceil(2 * k * index.ntotal / max(1, n_allowed)))
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=min(ef, max(k, int(index.ntotal))))
+    if faiss.try_extract_index_ivf(index) is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=int(index_cfg.ivf_nprobe))
+    return faiss.SearchParameters(sel=selector)
+
+
+def recall_at_k(
+    approx_index: faiss.Index,
+    exact_index: faiss.Index,
+    queries: np.ndarray,
+    k: int,
+) -> float:
+    """
+    Fraction of the exact top-k neighbours that the approximate index also
+    returns in its top-k, averaged over `queries`.
+    """
+    if queries.shape[0] == 0 or k <= 0:
+        return 0.0
+    k = min(k, int(exact_index.ntotal))
+    _, exact_ids = exact_index.search(queries, k)
+    _, approx_ids = approx_index.search(queries, k)
+
+    found = 0
+    total = 0
+    for exact_row, approx_row in zip(exact_ids, approx_ids):
+        expected = {int(i) for i in exact_row if i >= 0}
+        found += len(expected.intersection(int(i) for i in approx_row if i >= 0))
+        total += len(expected)
+    return found / total if total else 0.0
+
 
 class FaissStore:
-    def __init__(self, dim: int):
+    def __init__(self, dim: int, *, index_cfg: Optional[IndexConfig] = None, id_map: bool = False):
         # Inner product index (works as cosine if normalized)
-        self.index = faiss.IndexFlatIP(dim)
+        self.index = make_index(dim, index_cfg)
+        # IndexIDMap2 keeps explicit ids (= meta vector_id) so vectors can
+        # later be removed and added per document.
+        self.id_map = bool(id_map)
+        if self.id_map:
+            self.index = faiss.IndexIDMap2(self.index)
+
+    def train(self, vectors: np.ndarray):
+        if self.index.is_trained:
+            return
+        needed = min_training_points(self.index)
+        if vectors.shape[0] < needed:
+            raise ValueError(
+                f"Index needs at least {needed} training vectors, got {vectors.shape[0]}. "
+                "Lower index.ivf_nlist / index.pq_nbits or use index.type=flat."
+            )
+        self.index.train(vectors)
 
-    def add(self, vectors: np.ndarray):
-        self.index.add(vectors)
+    def add(self, vectors: np.ndarray, ids: Optional[np.ndarray] = None):
+        # IVF-PQ learns centroids and codebooks from the first batch it sees.
+        self.train(vectors)
+        if self.id_map:
+            if ids is None:
+                start = int(self.index.ntotal)
+                ids = np.arange(start, start + vectors.shape[0], dtype=np.int64)
+            self.index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+        elif ids is not None:
+            raise ValueError("Explicit vector ids need FaissStore(..., id_map=True)")
+        else:
+            self.index.add(vectors)
 
     def save(self, path: Path):
         path.parent.mkdir(parents=True, exist_ok=True)
         faiss.write_index(self.index, str(path))
 
     @staticmethod
-    def load(path: Path):
+    def load(path: Path, *, mmap: bool = False):
+        if mmap:
+            # Read-only mapping: pages come from the shared OS page cache, so
+            # several API workers do not each hold a private copy of the index.
+            return faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
         return faiss.read_index(str(path))
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.config import AppConfig
+from src.embeddings.onnx_backend import backend_label
+
+MANIFEST_VERSION = 1
+
+
+def index_manifest_path(index_path: Path) -> Path:
+    """faiss.index -> manifest.json (what the index was built from)."""
+    return index_path.parent / "manifest.json"
+
+
+def build_settings(cfg: AppConfig) -> Dict[str, Any]:
+    """Settings that change every vector when they change; any difference forces a full rebuild."""
+    index_settings = cfg.index.model_dump(
+        exclude={
+            "index_path",
+            "meta_path",
+            "mmap",
+            "meta_format",
+            "shards",
+            "rescore",
+            "rescore_factor",
+            "snapshots",
+            "snapshot_keep",
+            "snapshot_poll_s",
+            "stream_batch_size",
+        }
+    )
+    return {
+        "embedding_model": cfg.embeddings.model_name,
+        "embedding_backend": backend_label(cfg.embeddings.backend, cfg.embeddings.onnx_quantize),
+        "normalize": bool(cfg.embeddings.normalize),
+        "index": index_settings,
+    }
+
+
+def doc_fingerprints(chunks: Iterable[Dict[str, Any]], doc_shas: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+    """
+    Per-document fingerprint: the docs.jsonl sha256 plus a hash of the doc's
+    chunks (text and offsets, in order), so re-chunking an unchanged .rst file
+    is still detected as a change.
+    """
+    hashers: Dict[str, Any] = {}
+    for c in chunks:
+        doc_id = str(c["doc_id"])
+        h = hashers.setdefault(doc_id, hashlib.sha256())
+        h.update(f"{c['start_char']}:{c['end_char']}:".encode("utf-8"))
+        h.update(str(c["text"]).encode("utf-8"))
+        h.update(b"\0")
+    return {
+        doc_id: {"sha256": doc_shas.get(doc_id, ""), "chunks_sha256": h.hexdigest()}
+        for doc_id, h in hashers.items()
+    }
+
+
+def write_manifest(path: Path, *, settings: Dict[str, Any], docs: Dict[str, Dict[str, str]], n_vectors: int) -> None:
+    payload = {
+        "version": MANIFEST_VERSION,
+        "settings": settings,
+        "n_vectors": int(n_vectors),
+        "docs": docs,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def load_manifest(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    if payload.get("version") != MANIFEST_VERSION:
+        return None
+    return payload
+
+
+def diff_docs(
+    old_docs: Dict[str, Dict[str, str]],
+    new_docs: Dict[str, Dict[str, str]],
+) -> Tuple[Set[str], Set[str], Set[str]]:
+    """Return (changed, removed, added) document ids."""
+    changed = {d for d in new_docs.keys() & old_docs.keys() if new_docs[d] != old_docs[d]}
+    removed = set(old_docs) - set(new_docs)
+    added = set(new_docs) - set(old_docs)
+    return changed, removed, added
+
+
+def plan_reorder(
+    old_doc_ids: Iterable[str],
+    new_chunks: List[Dict[str, Any]],
+    stale_docs: Set[str],
+) -> Tuple[List[int], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Map an incremental update onto vector ids.
+
+    `old_doc_ids` is meta.jsonl's doc_id column in vector_id order. Returns
+    (removed_vector_ids, kept_chunks, fresh_chunks): kept chunks are the
+    current chunks of unchanged docs in their old vector order (ids
+    0..len-1 after compaction), fresh chunks are those of changed/added docs
+    and get the ids after that.
+    """
+    by_doc: Dict[str, List[Dict[str, Any]]] = {}
+    for c in new_chunks:
+        by_doc.setdefault(str(c["doc_id"]), []).append(c)
+
+    removed: List[int] = []
+    kept: List[Dict[str, Any]] = []
+    cursor: Dict[str, int] = {}
+    for vid, doc_id in enumerate(old_doc_ids):
+        if doc_id in stale_docs or doc_id not in by_doc:
+            removed.append(vid)
+            continue
+        i = cursor.get(doc_id, 0)
+        kept.append(by_doc[doc_id][i])
+        cursor[doc_id] = i + 1
+
+    fresh = [c for c in new_chunks if str(c["doc_id"]) in stale_docs]
+    return removed, kept, fresh
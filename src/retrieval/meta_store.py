@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import json
+import mmap
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from src.utils.jsonl import iter_jsonl
+
+
+def meta_offsets_path(meta_path: Path) -> Path:
+    """meta.jsonl -> meta.offsets.npy (byte offset of every row, plus end-of-file)."""
+    return meta_path.with_suffix(".offsets.npy")
+
+
+def write_meta_offsets(meta_path: Path) -> Path:
+    """
+    Scan meta.jsonl once and write an int64 array of line start offsets.
+    Row i lives at bytes [offsets[i], offsets[i + 1]).
+    """
+    offsets: List[int] = [0]
+    pos = 0
+    with meta_path.open("rb") as f:
+        for line in f:
+            pos += len(line)
+            if line.strip():
+                offsets.append(pos)
+            else:
+                # Blank lines are skipped by iter_jsonl; fold them into the next row.
+                offsets[-1] = pos
+
+    out_path = meta_offsets_path(meta_path)
+    np.save(out_path, np.asarray(offsets, dtype=np.int64))
+    return out_path
+
+
+class FaissMetaStore:
+    """
+    Loads meta.jsonl into a list so that meta[vector_id] is O(1).
+    Assumes meta.jsonl is written in vector_id order (0..N-1).
+    """
+
+    def __init__(self, meta_path: Path):
+        self.meta: List[Dict[str, Any]] = []
+        for rec in iter_jsonl(meta_path):
+            self.meta.append(rec)
+
+    def __len__(self) -> int:
+        return len(self.meta)
+
+    def get(self, vector_id: int) -> Dict[str, Any]:
+        return self.meta[vector_id]
+
+    def text(self, vector_id: int) -> str:
+        return str(self.meta[vector_id].get("text", ""))
+
+    def module(self, vector_id: int) -> str:
+        return str(self.meta[vector_id].get("module", ""))
+
+    def heading(self, vector_id: int) -> Optional[str]:
+        return (self.meta[vector_id].get("meta") or {}).get("heading")
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        yield from self.meta
+
+
+class MmapMetaStore:
+    """
+    Memory-maps meta.jsonl and its offsets file instead of parsing every row.
+    Startup cost is constant, rows are decoded on access, and the page cache
+    is shared by every worker process that maps the same files.
+    """
+
+    def __init__(self, meta_path: Path):
+        offsets_path = meta_offsets_path(meta_path)
+        if not offsets_path.exists():
+            raise FileNotFoundError(f"Meta offsets file not found: {offsets_path}")
+
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        self._file = meta_path.open("rb")
+        size = meta_path.stat().st_size
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+        if int(self.offsets[-1]) != size:
+            raise ValueError(
+                f"Meta offsets are stale: {offsets_path} ends at {int(self.offsets[-1])} "
+                f"but {meta_path} has {size} bytes"
+            )
+
+    def __len__(self) -> int:
+        return int(self.offsets.shape[0]) - 1
+
+    def get(self, vector_id: int) -> Dict[str, Any]:
+        if vector_id < 0:
+            raise IndexError(vector_id)
+        start = int(self.offsets[vector_id])
+        end = int(self.offsets[vector_id + 1])
+        return json.loads(self._buf[start:end])
+
+    def text(self, vector_id: int) -> str:
+        return str(self.get(vector_id).get("text", ""))
+
+    def module(self, vector_id: int) -> str:
+        return str(self.get(vector_id).get("module", ""))
+
+    def heading(self, vector_id: int) -> Optional[str]:
+        return (self.get(vector_id).get("meta") or {}).get("heading")
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.get(i)
+
+
+# Columnar layout: packed UTF-8 strings (offsets + blob) for per-row text,
+# int32 codes into small string tables for repeated values.
+_PACKED_COLUMNS = ("chunk_id", "text", "meta_extra")
+_INTERNED_COLUMNS = ("module", "doc_id", "source_path", "heading")
+_INT_COLUMNS = {"start_char": np.int64, "end_char": np.int64, "chunk_index": np.int32}
+_META_KEYS = ("source_path", "heading")
+
+# Interned code for a `meta` key that is absent (as opposed to present but null).
+_CODE_NONE = -1
+_CODE_ABSENT = -2
+
+
+def meta_columns_dir(meta_path: Path) -> Path:
+    """meta.jsonl -> meta_columns/ (directory holding the columnar metadata store)."""
+    return meta_path.parent / f"{meta_path.stem}_columns"
+
+
+def write_columnar_meta(out_dir: Path, records: Iterable[Dict[str, Any]]) -> int:
+    """
+    Write meta records (same shape as meta.jsonl rows, in vector_id order) as
+    columnar files under `out_dir`. Returns the number of rows written.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    packed_offsets: Dict[str, List[int]] = {name: [0] for name in _PACKED_COLUMNS}
+    packed_files = {name: (out_dir / f"{name}.bin").open("wb") for name in _PACKED_COLUMNS}
+    tables: Dict[str, Dict[str, int]] = {name: {} for name in _INTERNED_COLUMNS}
+    codes: Dict[str, List[int]] = {name: [] for name in _INTERNED_COLUMNS}
+    ints: Dict[str, List[int]] = {name: [] for name in _INT_COLUMNS}
+
+    def intern(column: str, value: Any) -> int:
+        if value is None:
+            return _CODE_NONE
+        table = tables[column]
+        value = str(value)
+        if value not in table:
+            table[value] = len(table)
+        return table[value]
+
+    n = 0
+    try:
+        for rec in records:
+            if int(rec["vector_id"]) != n:
+                raise ValueError(f"vector_id mismatch: got {rec['vector_id']} expected {n}")
+
+            rec_meta = dict(rec.get("meta") or {})
+            extra = {k: v for k, v in rec_meta.items() if k not in _META_KEYS}
+            packed_values = {
+                "chunk_id": rec["chunk_id"],
+                "text": rec["text"],
+                "meta_extra": json.dumps(extra, ensure_ascii=False) if extra else "",
+            }
+            for name, value in packed_values.items():
+                data = str(value).encode("utf-8")
+                packed_files[name].write(data)
+                packed_offsets[name].append(packed_offsets[name][-1] + len(data))
+
+            codes["module"].append(intern("module", rec["module"]))
+            codes["doc_id"].append(intern("doc_id", rec["doc_id"]))
+            for key in _META_KEYS:
+                codes[key].append(intern(key, rec_meta[key]) if key in rec_meta else _CODE_ABSENT)
+            for name in _INT_COLUMNS:
+                ints[name].append(int(rec[name]))
+            n += 1
+    finally:
+        for f in packed_files.values():
+            f.close()
+
+    for name, offsets in packed_offsets.items():
+        np.save(out_dir / f"{name}_offsets.npy", np.asarray(offsets, dtype=np.int64))
+    for name, values in codes.items():
+        np.save(out_dir / f"{name}.npy", np.asarray(values, dtype=np.int32))
+    for name, dtype in _INT_COLUMNS.items():
+        np.save(out_dir / f"{name}.npy", np.asarray(ints[name], dtype=dtype))
+
+    string_tables = {name: list(table) for name, table in tables.items()}
+    (out_dir / "strings.json").write_text(json.dumps(string_tables, ensure_ascii=False), encoding="utf-8")
+    return n
+
+
+class _PackedStrings:
+    def __init__(self, blob_path: Path, offsets_path: Path, *, mmap_mode: bool):
+        self.offsets = np.load(offsets_path, mmap_mode="r" if mmap_mode else None)
+        size = blob_path.stat().st_size
+        if mmap_mode and size:
+            self._file = blob_path.open("rb")
+            self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._blob = blob_path.read_bytes()
+
+    def __getitem__(self, i: int) -> str:
+        return self._blob[int(self.offsets[i]):int(self.offsets[i + 1])].decode("utf-8")
+
+
+class ColumnarMetaStore:
+    """
+    Column-oriented chunk metadata: packed UTF-8 text/chunk ids plus interned
+    module/doc_id/source_path/heading codes. Rows are materialized on access,
+    so memory is a few bytes per row plus the raw text. With `mmap_mode=True`
+    every column is memory-mapped instead of read into the process.
+    """
+
+    def __init__(self, columns_dir: Path, *, mmap_mode: bool = False):
+        if not (columns_dir / "strings.json").exists():
+            raise FileNotFoundError(f"Columnar meta not found: {columns_dir}")
+
+        self._packed = {
+            name: _PackedStrings(
+                columns_dir / f"{name}.bin",
+                columns_dir / f"{name}_offsets.npy",
+                mmap_mode=mmap_mode,
+            )
+            for name in _PACKED_COLUMNS
+        }
+        load_mode = "r" if mmap_mode else None
+        self._codes = {
+            name: np.load(columns_dir / f"{name}.npy", mmap_mode=load_mode)
+            for name in _INTERNED_COLUMNS
+        }
+        self._ints = {
+            name: np.load(columns_dir / f"{name}.npy", mmap_mode=load_mode)
+            for name in _INT_COLUMNS
+        }
+        self.strings: Dict[str, List[str]] = json.loads(
+            (columns_dir / "strings.json").read_text(encoding="utf-8")
+        )
+
+    def __len__(self) -> int:
+        return int(self._ints["chunk_index"].shape[0])
+
+    def _string(self, column: str, vector_id: int) -> Optional[str]:
+        code = int(self._codes[column][vector_id])
+        return None if code < 0 else self.strings[column][code]
+
+    def text(self, vector_id: int) -> str:
+        return self._packed["text"][vector_id]
+
+    def module(self, vector_id: int) -> str:
+        return self._string("module", vector_id) or ""
+
+    def heading(self, vector_id: int) -> Optional[str]:
+        return self._string("heading", vector_id)
+
+    def get(self, vector_id: int) -> Dict[str, Any]:
+        if vector_id < 0:
+            raise IndexError(vector_id)
+
+        rec_meta: Dict[str, Any] = {}
+        for key in _META_KEYS:
+            if int(self._codes[key][vector_id]) != _CODE_ABSENT:
+                rec_meta[key] = self._string(key, vector_id)
+        extra = self._packed["meta_extra"][vector_id]
+        if extra:
+            rec_meta.update(json.loads(extra))
+
+        return {
+            "vector_id": int(vector_id),
+            "chunk_id": self._packed["chunk_id"][vector_id],
+            "doc_id": self._string("doc_id", vector_id),
+            "module": self._string("module", vector_id),
+            "text": self._packed["text"][vector_id],
+            "meta": rec_meta,
+            "start_char": int(self._ints["start_char"][vector_id]),
+            "end_char": int(self._ints["end_char"][vector_id]),
+            "chunk_index": int(self._ints["chunk_index"][vector_id]),
+        }
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.get(i)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Column order of the neighbour table; -1 marks the first/last chunk of a doc.
+PREV, NEXT = 0, 1
+
+
+def neighbours_path(index_path: Path) -> Path:
+    """faiss.index -> neighbours.npy ((N, 2) prev/next vector ids within the same doc)."""
+    return index_path.parent / "neighbours.npy"
+
+
+def build_neighbour_table(records: Iterable[Dict[str, Any]]) -> np.ndarray:
+    """
+    (N, 2) int64 table indexed by vector_id: the previous and next chunk of
+    the same doc by chunk_index, or -1. Chunks dropped by dedup are skipped
+    over, so check offsets before treating neighbours as contiguous text.
+    """
+    by_doc: Dict[str, List[Tuple[int, int]]] = {}
+    n = 0
+    for rec in records:
+        vid = int(rec["vector_id"])
+        by_doc.setdefault(str(rec["doc_id"]), []).append((int(rec["chunk_index"]), vid))
+        n = max(n, vid + 1)
+
+    table = np.full((n, 2), -1, dtype=np.int64)
+    for chunks in by_doc.values():
+        chunks.sort()
+        for (_, a), (_, b) in zip(chunks, chunks[1:]):
+            table[a, NEXT] = b
+            table[b, PREV] = a
+    return table
@@ -1,16 +1,47 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Collection, Dict, FrozenSet, List, Optional, Tuple
 import re
+import threading
+import time
 
 import numpy as np
 import faiss
 
 from src.config import load_app_config
 from src.embeddings.embedder import Embedder
-from src.utils.jsonl import iter_jsonl
+from src.retrieval.bm25_index import BM25Index, bm25_artifact_dir, tokenize_for_bm25
+from src.retrieval.faiss_store import (
+    FaissStore,
+    configure_search,
+    filtered_search_params,
+    id_selector,
+    rescore_vectors_path,
+)
+from src.retrieval.meta_store import (
+    ColumnarMetaStore,
+    FaissMetaStore,
+    MmapMetaStore,
+    meta_columns_dir,
+)
+from src.retrieval.neighbours import NEXT, PREV, build_neighbour_table, neighbours_path
+from src.retrieval.shards import ShardedSearcher, shards_dir
+from src.retrieval.snapshots import resolve_index_paths
+from src.retrieval.symbol_index import SymbolIndex, symbol_index_path
+from src.utils.registry import registry, stat_key
+
+
+_EMPTY_IDS = np.zeros(0, dtype=np.int64)
+_EMPTY_SCORES = np.zeros(0, dtype=np.float32)
+
+
+def _timed(fn: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - t0) * 1000
 
 
 @dataclass(frozen=True)
@@ -29,71 +60,136 @@ class RetrievedChunk:
     vector_id: int
 
 
-class FaissMetaStore:
-    """
-    Loads meta.jsonl into a list so that meta[vector_id] is O(1).
-    Assumes meta.jsonl is written in vector_id order (0..N-1).
-    """
-
-    def __init__(self, meta_path: Path):
-        self.meta: List[Dict[str, Any]] = []
-        for rec in iter_jsonl(meta_path):
-            self.meta.append(rec)
-
-    def __len__(self) -> int:
-        return len(self.meta)
-
-    def get(self, vector_id: int) -> Dict[str, Any]:
-        return self.meta[vector_id]
-
-
 class Retriever:
-    def __init__(self, repo_root: Path, *, config_path: Optional[Path] = None):
+    def __init__(
+        self,
+        repo_root: Path,
+        *,
+        config_path: Optional[Path] = None,
+        embedder: Any | None = None,
+        mode: Optional[str] = None,
+        snapshot_id: Optional[str] = None,
+    ):
         self.repo_root = repo_root
         self.cfg, self.config_path = load_app_config(repo_root, config_path)
 
-        index_path = repo_root / self.cfg.index.index_path
-        meta_path = repo_root / self.cfg.index.meta_path
+        # With index.snapshots every artifact is read from one immutable
+        # snapshot dir (the current one unless `snapshot_id` pins another).
+        index_path, meta_path, self.snapshot_id = resolve_index_paths(repo_root, self.cfg.index, snapshot_id)
 
         if not index_path.exists():
             raise FileNotFoundError(f"FAISS index not found: {index_path}")
         if not meta_path.exists():
             raise FileNotFoundError(f"Meta file not found: {meta_path}")
 
-        # Load FAISS index
-        self.index = faiss.read_index(str(index_path))
+        # `mode` overrides retrieval.mode (benchmarks compare modes on one build).
+        self.mode = str(mode or self.cfg.retrieval.mode).strip().lower()
+        if self.mode not in {"dense", "bm25", "hybrid"}:
+            raise ValueError(f"Unsupported retrieval mode: {self.mode}")
+
+        # Load FAISS index and apply query-time knobs (e.g. HNSW efSearch).
+        # With index.shards > 1 the index and BM25 postings live in shard
+        # worker processes; this process only keeps meta for hydration.
+        self.mmap = bool(self.cfg.index.mmap)
+        self._shards: Optional[ShardedSearcher] = None
+        self.index: Optional[faiss.Index] = None
+        if int(self.cfg.index.shards) > 1:
+            self._shards = ShardedSearcher(
+                shards_dir(index_path),
+                self.cfg.index,
+                mmap=self.mmap,
+                dense=self.mode in {"dense", "hybrid"},
+                bm25=self.mode in {"bm25", "hybrid"},
+            )
+            if self._shards.n_shards != int(self.cfg.index.shards):
+                self._shards.close()
+                raise ValueError(
+                    f"Shard layout has {self._shards.n_shards} shards, config says index.shards={self.cfg.index.shards}"
+                )
+            self.ntotal, self.dim = self._shards.ntotal, self._shards.dim
+        else:
+            # Shared with any other Retriever on the same index file and
+            # search settings; freed when the last one lets go of it.
+            search_key = (self.mmap, int(self.cfg.index.hnsw_ef_search), int(self.cfg.index.ivf_nprobe))
+            self.index = registry.get(
+                "faiss_index",
+                (stat_key(index_path), search_key),
+                lambda: configure_search(FaissStore.load(index_path, mmap=self.mmap), self.cfg.index),
+                pinned=False,
+            )
+            self.ntotal, self.dim = int(self.index.ntotal), int(self.index.d)
 
         # Load meta aligned to vector ids
-        self.meta_store = FaissMetaStore(meta_path)
+        if self.cfg.index.meta_format == "columnar":
+            self.meta_store = ColumnarMetaStore(meta_columns_dir(meta_path), mmap_mode=self.mmap)
+        elif self.mmap:
+            self.meta_store = MmapMetaStore(meta_path)
+        else:
+            self.meta_store = FaissMetaStore(meta_path)
 
         # Basic alignment check (fast)
-        if self.index.ntotal != len(self.meta_store):
+        if self.ntotal != len(self.meta_store):
             raise ValueError(
-                f"Index/meta mismatch: index.ntotal={self.index.ntotal} meta_rows={len(self.meta_store)}"
+                f"Index/meta mismatch: index.ntotal={self.ntotal} meta_rows={len(self.meta_store)}"
             )
 
-        self.mode = str(self.cfg.retrieval.mode).strip().lower()
-        if self.mode not in {"dense", "bm25", "hybrid"}:
-            raise ValueError(f"Unsupported retrieval mode: {self.mode}")
-
         # Embedder is only required for dense/hybrid retrieval.
-        self.embedder = Embedder(self.config_path) if self.mode in {"dense", "hybrid"} else None
+        self.embedder = embedder
+        if self.embedder is None and self.mode in {"dense", "hybrid"}:
+            self.embedder = registry.get("embedder", stat_key(self.config_path), lambda: Embedder(self.config_path))
 
         # BM25 is required for bm25/hybrid retrieval.
-        self._bm25 = None
-        if self.mode in {"bm25", "hybrid"}:
-            try:
-                from rank_bm25 import BM25Okapi  # type: ignore
-            except Exception as e:  # pragma: no cover
-                raise ImportError(
-                    "rank-bm25 is required for retrieval.mode=bm25|hybrid. Install dependencies from requirements.txt."
-                ) from e
-
-            tokenized_corpus = [
-                self._tokenize_for_bm25(str(rec.get("text", "")))
-                for rec in self.meta_store.meta
-            ]
-            self._bm25 = BM25Okapi(tokenized_corpus)
+        self._bm25: Optional[BM25Index] = None
+        if self.mode in {"bm25", "hybrid"} and self._shards is None:
+            bm25_dir = bm25_artifact_dir(index_path)
+            if bm25_dir.exists():
+                self._bm25 = registry.get(
+                    "bm25",
+                    (stat_key(bm25_dir), self.mmap),
+                    lambda: BM25Index.load(bm25_dir, mmap_mode=self.mmap),
+                    pinned=False,
+                )
+            else:
+                # Older index builds without a BM25 artifact: rebuild in-process.
+                self._bm25 = BM25Index.build(
+                    self._tokenize_for_bm25(str(rec.get("text", "")))
+                    for rec in self.meta_store.iter_records()
+                )
+            if len(self._bm25) != len(self.meta_store):
+                raise ValueError(
+                    f"BM25/meta mismatch: bm25_docs={len(self._bm25)} meta_rows={len(self.meta_store)}"
+                )
+
+        # Reduced-precision storage (index.storage) can be rescored exactly:
+        # the dense leg fetches rescore_factor x more candidates and re-ranks
+        # them against the memory-mapped full-precision side file.
+        self._rescore_vectors: Optional[np.ndarray] = None
+        self.rescore_factor = max(1, int(self.cfg.index.rescore_factor))
+        if self.cfg.index.rescore != "none" and self.mode in {"dense", "hybrid"}:
+            vectors_path = rescore_vectors_path(index_path)
+            if not vectors_path.exists():
+                raise FileNotFoundError(f"Rescore vectors not found: {vectors_path} (rerun build_index.py)")
+            self._rescore_vectors = np.load(vectors_path, mmap_mode="r")
+            if self._rescore_vectors.shape != (self.ntotal, self.dim):
+                raise ValueError(
+                    f"Rescore vectors shape {self._rescore_vectors.shape} != ({self.ntotal}, {self.dim})"
+                )
+
+        # Symbol -> vector id maps from the build; rebuilt from meta on first
+        # use for older index builds.
+        self._symbol_index_path = symbol_index_path(index_path)
+        self._symbols: Optional[SymbolIndex] = None
+        self.symbol_definitions = bool(self.cfg.retrieval.symbol_definitions)
+        self.symbol_index_rerank = bool(self.cfg.retrieval.symbol_index_rerank)
+
+        # Prev/next chunk table for context expansion; built from meta on
+        # first use for older index builds.
+        self._neighbours_path = neighbours_path(index_path)
+        self._neighbours: Optional[np.ndarray] = None
+
+        # Module filters: per-module vector ids, built lazily from meta.
+        self._module_ids: Optional[Dict[str, np.ndarray]] = None
+        self._scope_filters: Dict[FrozenSet[str], Tuple[np.ndarray, faiss.IDSelector]] = {}
 
         # Retrieval parameters from config.
         self.top_k = int(self.cfg.retrieval.top_k)
@@ -101,6 +197,24 @@ class Retriever:
         self.hybrid_dense_weight = float(self.cfg.retrieval.hybrid_dense_weight)
         self.hybrid_bm25_weight = float(self.cfg.retrieval.hybrid_bm25_weight)
 
+        # Hybrid legs can overlap: FAISS and torch release the GIL while the
+        # BM25 leg scores postings on a pool thread.
+        self.parallel_hybrid = bool(self.cfg.retrieval.parallel_hybrid) and self.mode == "hybrid"
+        self.bm25_deadline_ms = float(self.cfg.retrieval.bm25_deadline_ms)
+        # One BM25 leg per in-flight request, so a few threads are enough.
+        self.bm25_workers = max(1, int(self.cfg.retrieval.bm25_workers))
+        self._executor: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(max_workers=self.bm25_workers, thread_name_prefix="bm25-leg")
+            if self.parallel_hybrid
+            else None
+        )
+        # BM25 legs that missed their deadline keep scoring on the pool; once
+        # they occupy every worker, new requests skip the leg (dense-only)
+        # instead of queueing behind them.
+        self._bm25_overdue: set = set()
+        self._bm25_overdue_lock = threading.Lock()
+        self.bm25_overdue_total = 0
+
     @staticmethod
     def _extract_symbol_mentions(query: str) -> List[str]:
         q = (query or "").lower()
@@ -108,83 +222,211 @@ class Retriever:
 
     @staticmethod
     def _tokenize_for_bm25(text: str) -> List[str]:
-        return re.findall(r"[a-zA-Z_][\w\.]*", (text or "").lower())
+        return tokenize_for_bm25(text)
+
+    def _symbol_index(self) -> SymbolIndex:
+        if self._symbols is None:
+            if self._symbol_index_path.exists():
+                self._symbols = SymbolIndex.load(self._symbol_index_path)
+            else:
+                self._symbols = SymbolIndex.build(self.meta_store.iter_records())
+        return self._symbols
+
+    def _neighbour_table(self) -> np.ndarray:
+        if self._neighbours is None:
+            if self._neighbours_path.exists():
+                self._neighbours = np.load(self._neighbours_path, mmap_mode="r" if self.mmap else None)
+            else:
+                self._neighbours = build_neighbour_table(self.meta_store.iter_records())
+        return self._neighbours
+
+    def expand_context(
+        self,
+        hits: List[RetrievedChunk],
+        *,
+        mode: str = "adjacent",
+        window: int = 1,
+    ) -> List[RetrievedChunk]:
+        """
+        Add up to `window` chunks on each side of every hit from the neighbour
+        table (no search involved).
+
+        adjacent: neighbours become extra chunks next to their hit, carrying
+        the hit's score and `meta["context_for"]` = the hit's chunk_id.
+        merged: each hit is replaced by one chunk spanning its contiguous
+        neighbours (overlap removed by offsets), listed in
+        `meta["merged_chunk_ids"]`; hits already inside an earlier span are dropped.
+        """
+        if mode == "none" or window <= 0 or not hits:
+            return list(hits)
+        if mode not in {"adjacent", "merged"}:
+            raise ValueError(f"Unsupported context expansion: {mode}")
+        table = self._neighbour_table()
+
+        def walk(vid: int, direction: int) -> List[int]:
+            out: List[int] = []
+            cur = vid
+            for _ in range(window):
+                cur = int(table[cur, direction])
+                if cur < 0:
+                    break
+                out.append(cur)
+            return out
+
+        if mode == "adjacent":
+            hit_ids = {h.vector_id for h in hits}
+            seen: set[int] = set()
+            expanded: List[RetrievedChunk] = []
+            for hit in hits:
+                for vid in [*reversed(walk(hit.vector_id, PREV)), hit.vector_id, *walk(hit.vector_id, NEXT)]:
+                    if vid in seen or (vid != hit.vector_id and vid in hit_ids):
+                        continue
+                    seen.add(vid)
+                    if vid == hit.vector_id:
+                        expanded.append(hit)
+                        continue
+                    chunk = self._to_retrieved_chunk(score=hit.score, vector_id=vid)
+                    expanded.append(replace(chunk, meta={**chunk.meta, "context_for": hit.chunk_id}))
+            return expanded
+
+        covered: set[int] = set()
+        merged: List[RetrievedChunk] = []
+        for hit in hits:
+            if hit.vector_id in covered:
+                continue
+            span = [hit]
+            for vid in walk(hit.vector_id, PREV):
+                prev = self._to_retrieved_chunk(score=hit.score, vector_id=vid)
+                if vid in covered or prev.end_char < span[0].start_char:
+                    break
+                span.insert(0, prev)
+            for vid in walk(hit.vector_id, NEXT):
+                nxt = self._to_retrieved_chunk(score=hit.score, vector_id=vid)
+                if vid in covered or nxt.start_char > span[-1].end_char:
+                    break
+                span.append(nxt)
+            covered.update(c.vector_id for c in span)
+            if len(span) == 1:
+                merged.append(hit)
+                continue
 
-    @staticmethod
-    def _symbol_rerank(results: List[RetrievedChunk], query: str) -> List[RetrievedChunk]:
-        symbols = Retriever._extract_symbol_mentions(query)
-        if not symbols:
-            return results
+            # Consecutive chunks overlap in the source doc; keep each character once.
+            text, end = span[0].text, span[0].end_char
+            for chunk in span[1:]:
+                text += chunk.text[max(0, end - chunk.start_char):]
+                end = max(end, chunk.end_char)
+            merged.append(
+                replace(
+                    hit,
+                    text=text,
+                    start_char=span[0].start_char,
+                    end_char=end,
+                    meta={**hit.meta, "merged_chunk_ids": [c.chunk_id for c in span]},
+                )
+            )
+        return merged
+
+    def _symbol_rerank_ids(self, ids: np.ndarray, scores: np.ndarray, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Re-order candidates by score plus a bonus per `module.symbol` the
+        query names: +0.08 when the chunk mentions the symbol, +0.03 when the
+        chunk's module is the symbol's prefix.
+
+        By default a mention is a substring of the chunk's text or heading.
+        With `retrieval.symbol_index_rerank` mentions come from the symbol
+        index instead (no text scan): whole dotted pairs only ("ajson.dumps"
+        does not mention "json.dumps"), and a chunk also mentions the
+        module-qualified names it defines (a "json" chunk with
+        ".. function:: dumps" mentions "json.dumps").
+        """
+        symbols = self._extract_symbol_mentions(query)
+        if not symbols or ids.size == 0:
+            return ids, scores
+
+        if self.symbol_index_rerank:
+            symbol_index = self._symbol_index()
+
+            def mentions(sym: str, vid: int) -> bool:
+                return symbol_index.mentioned_in(sym, vid)
 
-        def bonus(hit: RetrievedChunk) -> float:
-            text = (hit.text or "").lower()
-            heading = (hit.heading or "").lower()
-            module = (hit.module or "").lower()
+        else:
 
-            b = 0.0
-            for sym in symbols:
-                mod_prefix = sym.split(".", 1)[0]
-                if sym in text or sym in heading:
-                    b += 0.08
-                if module == mod_prefix:
-                    b += 0.03
-            return b
+            def mentions(sym: str, vid: int) -> bool:
+                return sym in self.meta_store.text(vid).lower() or sym in (self.meta_store.heading(vid) or "").lower()
 
-        return sorted(results, key=lambda h: float(h.score) + bonus(h), reverse=True)
+        adjusted = []
+        for vid, score in zip(ids, scores):
+            module = self.meta_store.module(int(vid)).lower()
+            bonus = 0.0
+            for sym in symbols:
+                if mentions(sym, int(vid)):
+                    bonus += 0.08
+                if module == sym.split(".", 1)[0]:
+                    bonus += 0.03
+            adjusted.append(float(score) + bonus)
+        order = sorted(range(len(adjusted)), key=lambda i: adjusted[i], reverse=True)
+        return ids[order], scores[order]
+
+    def _pinned_definitions(self, query: str, scope: Optional[FrozenSet[str]]) -> np.ndarray:
+        """Chunks defining a symbol the query names; they become guaranteed candidates."""
+        symbols = self._extract_symbol_mentions(query)
+        if not self.symbol_definitions or not symbols:
+            return _EMPTY_IDS
+        vids = self._symbol_index().definition_ids(symbols)
+        if scope is not None and vids.size:
+            vids = vids[np.isin(vids, self._scope_filter(scope)[0])]
+        return vids
 
     @staticmethod
-    def _clone_with_score(hit: RetrievedChunk, score: float) -> RetrievedChunk:
-        return RetrievedChunk(
-            chunk_id=hit.chunk_id,
-            doc_id=hit.doc_id,
-            module=hit.module,
-            score=float(score),
-            text=hit.text,
-            source_path=hit.source_path,
-            heading=hit.heading,
-            meta=hit.meta,
-            start_char=hit.start_char,
-            end_char=hit.end_char,
-            chunk_index=hit.chunk_index,
-            vector_id=hit.vector_id,
-        )
+    def _merge_candidates(
+        ids: np.ndarray,
+        scores: np.ndarray,
+        extra_ids: np.ndarray,
+        extra_scores: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Add extra candidates to a leg, keeping score order (existing ids win ties)."""
+        if extra_ids.size == 0:
+            return ids, scores
+        all_ids = np.concatenate([ids, extra_ids.astype(np.int64)])
+        all_scores = np.concatenate([scores, extra_scores.astype(scores.dtype)])
+        order = np.argsort(-all_scores, kind="stable")
+        return all_ids[order], all_scores[order]
 
     @staticmethod
-    def _rrf_fuse(
-        dense_hits: List[RetrievedChunk],
-        bm25_hits: List[RetrievedChunk],
+    def _rrf_fuse_ids(
+        dense_ids: np.ndarray,
+        dense_scores: np.ndarray,
+        bm25_ids: np.ndarray,
+        bm25_scores: np.ndarray,
         *,
         rrf_k: int,
         dense_weight: float,
         bm25_weight: float,
-    ) -> List[RetrievedChunk]:
-        dense_rank = {h.chunk_id: i + 1 for i, h in enumerate(dense_hits)}
-        bm25_rank = {h.chunk_id: i + 1 for i, h in enumerate(bm25_hits)}
-        dense_score = {h.chunk_id: float(h.score) for h in dense_hits}
-
-        by_chunk_id: Dict[str, RetrievedChunk] = {}
-        for h in dense_hits + bm25_hits:
-            if h.chunk_id not in by_chunk_id:
-                by_chunk_id[h.chunk_id] = h
-
-        fused: List[RetrievedChunk] = []
-        for cid, h in by_chunk_id.items():
-            s = 0.0
-            if cid in dense_rank:
-                s += dense_weight * (1.0 / (rrf_k + dense_rank[cid]))
-            if cid in bm25_rank:
-                s += bm25_weight * (1.0 / (rrf_k + bm25_rank[cid]))
-            fused.append(Retriever._clone_with_score(h, s))
-
-        fused = sorted(fused, key=lambda x: float(x.score), reverse=True)
-
-        # Keep hybrid ranking from RRF, but present confidence-facing scores on
-        # the same scale as dense retrieval so gate thresholds remain meaningful.
-        out: List[RetrievedChunk] = []
-        for h in fused:
-            calibrated = dense_score.get(h.chunk_id, 0.0)
-            out.append(Retriever._clone_with_score(h, calibrated))
-        return out
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Weighted reciprocal rank fusion of the two legs over vector ids.
+        Returns ids in fused order (ties: first appearance across dense then
+        BM25) with dense-scale (calibrated) scores, so gate thresholds keep
+        their meaning; BM25-only ids score 0.0. No chunk metadata is read.
+        Each leg must list a vector id at most once.
+        """
+        n_dense = int(dense_ids.shape[0])
+        candidates = np.concatenate([dense_ids, bm25_ids]).astype(np.int64, copy=False)
+        # first_idx is each id's first appearance across dense + bm25: the
+        # tie order.
+        ids, first_idx, inverse = np.unique(candidates, return_index=True, return_inverse=True)
+        dense_pos, bm25_pos = inverse[:n_dense], inverse[n_dense:]
+
+        # Summed as 0.0 + dense term + bm25 term, like the list-based
+        # reference in the tests, so fused scores compare bit-identical.
+        fused = np.zeros(ids.shape[0], dtype=np.float64)
+        fused[dense_pos] += dense_weight * (1.0 / (rrf_k + np.arange(1, n_dense + 1)))
+        fused[bm25_pos] += bm25_weight * (1.0 / (rrf_k + np.arange(1, bm25_pos.shape[0] + 1)))
+
+        calibrated = np.zeros(ids.shape[0], dtype=np.float64)
+        calibrated[dense_pos] = dense_scores
+        order = np.lexsort((first_idx, -fused))
+        return ids[order], calibrated[order]
 
     def _to_retrieved_chunk(self, *, score: float, vector_id: int) -> RetrievedChunk:
         rec = self.meta_store.get(int(vector_id))
@@ -204,74 +446,322 @@ class Retriever:
             vector_id=int(rec["vector_id"]),
         )
 
-    def _dense_search(self, query: str, *, fetch_k: int) -> List[RetrievedChunk]:
-        if self.embedder is None:
-            return []
-
-        q_vec = self.embedder.encode([query])
-        if q_vec.shape[1] != self.index.d:
-            raise ValueError(f"Query dim {q_vec.shape[1]} != index dim {self.index.d}")
+    def _hydrate(self, ids: np.ndarray, scores: np.ndarray) -> List[RetrievedChunk]:
+        return [
+            self._to_retrieved_chunk(score=float(score), vector_id=int(vid))
+            for vid, score in zip(ids, scores)
+        ]
+
+    def _module_index(self) -> Dict[str, np.ndarray]:
+        """Lower-cased module name -> sorted vector ids (built on first use)."""
+        if self._module_ids is None:
+            by_module: Dict[str, List[int]] = {}
+            for vid in range(len(self.meta_store)):
+                by_module.setdefault(self.meta_store.module(vid).lower(), []).append(vid)
+            self._module_ids = {m: np.asarray(ids, dtype=np.int64) for m, ids in by_module.items()}
+        return self._module_ids
+
+    def known_modules(self) -> set[str]:
+        return set(self._module_index())
+
+    def _module_scope(self, modules: Optional[Collection[str]]) -> Optional[FrozenSet[str]]:
+        """Normalize a module filter; unknown modules are dropped, nothing left means unfiltered."""
+        if not modules:
+            return None
+        index = self._module_index()
+        scope = frozenset(m.strip().lower() for m in modules if m.strip().lower() in index)
+        return scope or None
+
+    def _scope_filter(self, scope: FrozenSet[str]) -> Tuple[np.ndarray, faiss.IDSelector]:
+        """Allowed vector ids and a FAISS selector over them, cached per module set."""
+        cached = self._scope_filters.get(scope)
+        if cached is None:
+            index = self._module_index()
+            ids = np.unique(np.concatenate([index[m] for m in scope]))
+            cached = (ids, id_selector(ids))
+            self._scope_filters[scope] = cached
+        return cached
+
+    def _dense_search_many(
+        self,
+        queries: List[str],
+        fetch_ks: List[int],
+        scopes: Optional[List[Optional[FrozenSet[str]]]] = None,
+        pinned: Optional[List[np.ndarray]] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        One embedder batch for all queries, one FAISS search per fetch size and
+        module scope. `pinned` vector ids missing from a query's results are
+        scored with a selector search and merged in. With `index.rescore` the
+        candidates are re-ranked by exact scores from the side file.
+        """
+        if self.embedder is None or not queries:
+            return [(_EMPTY_IDS, _EMPTY_SCORES) for _ in queries]
+        scopes = scopes or [None] * len(queries)
+        pinned = pinned or [_EMPTY_IDS] * len(queries)
+
+        # Prefer the cached query path; injected test embedders only have encode().
+        encode_queries = getattr(self.embedder, "encode_queries", self.embedder.encode)
+        q_vecs = encode_queries(list(queries))
+        if q_vecs.shape[1] != self.dim:
+            raise ValueError(f"Query dim {q_vecs.shape[1]} != index dim {self.dim}")
+
+        search_ks = fetch_ks
+        if self._rescore_vectors is not None:
+            search_ks = [min(fk * self.rescore_factor, self.ntotal) for fk in fetch_ks]
+
+        if self._shards is not None:
+            allowed = [self._scope_filter(scope)[0] if scope is not None else None for scope in scopes]
+            out = self._shards.search_dense(q_vecs, search_ks, allowed, pinned)
+        else:
+            out = self._faiss_search_many(q_vecs, search_ks, scopes, pinned)
 
-        scores, ids = self.index.search(q_vec, fetch_k)
-        scores = scores[0]
-        ids = ids[0]
+        if self._rescore_vectors is not None:
+            out = [
+                self._rescore(q_vecs[row], out[row][0], fetch_k=fetch_ks[row], pinned=pinned[row])
+                for row in range(len(queries))
+            ]
+        return out
 
-        results: List[RetrievedChunk] = []
-        for score, vid in zip(scores, ids):
-            if vid < 0:
+    def _faiss_search_many(
+        self,
+        q_vecs: np.ndarray,
+        fetch_ks: List[int],
+        scopes: List[Optional[FrozenSet[str]]],
+        pinned: List[np.ndarray],
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        # One search per distinct fetch_k (normally k and the widened symbol
+        # fetch): truncating a larger search could reorder tied scores.
+        out: List[Tuple[np.ndarray, np.ndarray]] = [(_EMPTY_IDS, _EMPTY_SCORES)] * len(fetch_ks)
+        groups: Dict[Tuple[int, Optional[FrozenSet[str]]], List[int]] = {}
+        for row, key in enumerate(zip(fetch_ks, scopes)):
+            groups.setdefault(key, []).append(row)
+        for (fetch_k, scope), rows in groups.items():
+            if scope is None:
+                scores, ids = self.index.search(q_vecs[rows], fetch_k)
+            else:
+                # Module-scoped: FAISS only scores vectors the selector admits.
+                allowed, selector = self._scope_filter(scope)
+                params = filtered_search_params(
+                    self.index, self.cfg.index, selector, n_allowed=int(allowed.size), k=fetch_k
+                )
+                scores, ids = self.index.search(q_vecs[rows], fetch_k, params=params)
+            for row, row_ids, row_scores in zip(rows, ids, scores):
+                keep = row_ids >= 0
+                out[row] = (row_ids[keep].astype(np.int64), row_scores[keep])
+
+        for row, pin in enumerate(pinned):
+            missing = np.setdiff1d(pin, out[row][0])
+            if missing.size == 0:
                 continue
-            results.append(self._to_retrieved_chunk(score=float(score), vector_id=int(vid)))
-        return results
+            selector = id_selector(missing)
+            params = filtered_search_params(
+                self.index, self.cfg.index, selector, n_allowed=int(missing.size), k=int(missing.size)
+            )
+            pin_scores, pin_ids = self.index.search(q_vecs[row:row + 1], int(missing.size), params=params)
+            keep = pin_ids[0] >= 0
+            out[row] = self._merge_candidates(*out[row], pin_ids[0][keep], pin_scores[0][keep])
+        return out
 
-    def _bm25_search(self, query: str, *, fetch_k: int) -> List[RetrievedChunk]:
+    def _rescore(
+        self,
+        q_vec: np.ndarray,
+        ids: np.ndarray,
+        *,
+        fetch_k: int,
+        pinned: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact inner products from the side file; keep the top fetch_k plus pinned ids."""
+        if ids.size == 0:
+            return ids, _EMPTY_SCORES
+        exact = np.asarray(self._rescore_vectors[ids], dtype=np.float32) @ q_vec.astype(np.float32)
+        order = np.argsort(-exact, kind="stable")
+        ids, exact = ids[order], exact[order]
+        keep = np.arange(ids.size) < fetch_k
+        if pinned.size:
+            keep |= np.isin(ids, pinned)
+        return ids[keep], exact[keep]
+
+    def _dense_search(self, query: str, *, fetch_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self._dense_search_many([query], [fetch_k])[0]
+
+    def _bm25_search(
+        self,
+        query: str,
+        *,
+        fetch_k: int,
+        scope: Optional[FrozenSet[str]] = None,
+        pinned: np.ndarray = _EMPTY_IDS,
+    ) -> Tuple[np.ndarray, np.ndarray]:
         if self._bm25 is None:
-            return []
+            return _EMPTY_IDS, _EMPTY_SCORES
 
         q_tokens = self._tokenize_for_bm25(query)
         if not q_tokens:
-            return []
-
-        scores = np.asarray(self._bm25.get_scores(q_tokens), dtype=np.float32)
-        if scores.size == 0:
-            return []
-
-        top_idx = np.argsort(scores)[::-1][:fetch_k]
-        results: List[RetrievedChunk] = []
-        for vid in top_idx:
-            score = float(scores[int(vid)])
-            if score <= 0.0 and results:
-                # Keep deterministic useful hits; stop once scores turn non-positive
-                # after at least one candidate has been collected.
-                continue
-            results.append(self._to_retrieved_chunk(score=score, vector_id=int(vid)))
-        return results
-
-    def retrieve(self, query: str, *, top_k: Optional[int] = None) -> List[RetrievedChunk]:
-        k = int(top_k or self.top_k)
-        if k <= 0:
-            return []
-
-        symbol_mentions = self._extract_symbol_mentions(query)
-        fetch_k = k
-        if symbol_mentions:
-            fetch_k = min(max(k * 3, 10), int(self.index.ntotal))
-
-        if self.mode == "dense":
-            results = self._dense_search(query, fetch_k=fetch_k)
-        elif self.mode == "bm25":
-            results = self._bm25_search(query, fetch_k=fetch_k)
-        else:
-            dense_hits = self._dense_search(query, fetch_k=fetch_k)
-            bm25_hits = self._bm25_search(query, fetch_k=fetch_k)
-            results = self._rrf_fuse(
-                dense_hits,
-                bm25_hits,
-                rrf_k=self.hybrid_rrf_k,
-                dense_weight=self.hybrid_dense_weight,
-                bm25_weight=self.hybrid_bm25_weight,
-            )
+            return _EMPTY_IDS, _EMPTY_SCORES
 
-        if symbol_mentions:
-            results = self._symbol_rerank(results, query)
+        # Only the query terms' postings are scored; top-k via argpartition.
+        allowed = self._scope_filter(scope)[0] if scope is not None else None
+        ids, scores = self._bm25.search(q_tokens, fetch_k, allowed=allowed)
 
-        return results[:k]
+        missing = np.setdiff1d(pinned, ids)
+        if missing.size:
+            ids, scores = self._merge_candidates(
+                ids, scores, *self._bm25.search(q_tokens, int(missing.size), allowed=missing)
+            )
+        return ids, scores
+
+    def _bm25_search_many(
+        self,
+        queries: List[str],
+        fetch_ks: List[int],
+        scopes: Optional[List[Optional[FrozenSet[str]]]] = None,
+        pinned: Optional[List[np.ndarray]] = None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        scopes = scopes or [None] * len(queries)
+        pinned = pinned or [_EMPTY_IDS] * len(queries)
+        if self._shards is not None:
+            allowed = [self._scope_filter(scope)[0] if scope is not None else None for scope in scopes]
+            tokens = [self._tokenize_for_bm25(q) for q in queries]
+            return self._shards.search_bm25(tokens, fetch_ks, allowed, pinned)
+        return [
+            self._bm25_search(q, fetch_k=fk, scope=scope, pinned=pin)
+            for q, fk, scope, pin in zip(queries, fetch_ks, scopes, pinned)
+        ]
+
+    def _track_overdue(self, future: Any) -> None:
+        with self._bm25_overdue_lock:
+            self._bm25_overdue.add(future)
+            self.bm25_overdue_total += 1
+
+        def _done(f: Any) -> None:
+            with self._bm25_overdue_lock:
+                self._bm25_overdue.discard(f)
+
+        future.add_done_callback(_done)
+
+    def close(self) -> None:
+        """Shut down the hybrid worker pool and shard workers (no-op for sequential retrieval)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._shards is not None:
+            self._shards.close()
+            self._shards = None
+
+    def _fetch_k(self, query: str, k: int) -> int:
+        if self._extract_symbol_mentions(query):
+            return min(max(k * 3, 10), self.ntotal)
+        return k
+
+    def retrieve(
+        self,
+        query: str,
+        *,
+        top_k: Optional[int] = None,
+        trace: Optional[Dict[str, Any]] = None,
+        modules: Optional[Collection[str]] = None,
+    ) -> List[RetrievedChunk]:
+        return self.retrieve_many(
+            [query],
+            top_k=top_k,
+            trace=trace,
+            modules=[modules] if modules else None,
+        )[0]
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        *,
+        top_k: Optional[int] = None,
+        trace: Optional[Dict[str, Any]] = None,
+        modules: Optional[List[Optional[Collection[str]]]] = None,
+    ) -> List[List[RetrievedChunk]]:
+        """
+        Batched `retrieve`: all queries are embedded in one call and searched
+        with batched FAISS calls; BM25, fusion and symbol rerank then run per
+        query. Results are identical to calling `retrieve` on each query.
+
+        `modules` optionally gives each query a module filter: both legs then
+        only search that module's vectors (unknown module names are ignored).
+        With `retrieval.symbol_definitions`, chunks whose directives define a
+        symbol the query names (`json.dumps`) are always among the candidates.
+
+        If `trace` is given it is filled with per-leg timings
+        (`latency_ms_dense`, `latency_ms_bm25`), `bm25_deadline_missed`,
+        `bm25_skipped` (overdue legs held every BM25 worker) and
+        `bm25_overdue` (overdue legs still running).
+        """
+        k = int(top_k or self.top_k)
+        if k <= 0 or not queries:
+            return [[] for _ in queries]
+
+        fetch_ks = [self._fetch_k(q, k) for q in queries]
+        scopes = [self._module_scope(m) for m in (modules or [None] * len(queries))]
+        pinned = [self._pinned_definitions(q, scope) for q, scope in zip(queries, scopes)]
+        t_start = time.perf_counter()
+        timings: Dict[str, Any] = {}
+        bm25_missed = False
+
+        # In parallel hybrid mode the BM25 leg runs on the pool while this
+        # thread embeds and searches FAISS.
+        bm25_future = None
+        bm25_skipped = False
+        if self._executor is not None:
+            with self._bm25_overdue_lock:
+                bm25_skipped = len(self._bm25_overdue) >= self.bm25_workers
+            if not bm25_skipped:
+                bm25_future = self._executor.submit(
+                    _timed, self._bm25_search_many, queries, fetch_ks, scopes, pinned
+                )
+
+        # Candidates stay as (vector_id, score) arrays; only the final top-k
+        # are materialized as RetrievedChunk objects.
+        if self.mode in {"dense", "hybrid"}:
+            dense, timings["latency_ms_dense"] = _timed(self._dense_search_many, queries, fetch_ks, scopes, pinned)
+        if bm25_future is not None:
+            timeout = None
+            if self.bm25_deadline_ms > 0:
+                elapsed_ms = (time.perf_counter() - t_start) * 1000
+                timeout = max(0.0, self.bm25_deadline_ms - elapsed_ms) / 1000
+            try:
+                bm25, timings["latency_ms_bm25"] = bm25_future.result(timeout=timeout)
+            except FutureTimeout:
+                # Fusing with an empty BM25 leg keeps the dense order and scores.
+                bm25 = [(_EMPTY_IDS, _EMPTY_SCORES) for _ in queries]
+                bm25_missed = True
+                self._track_overdue(bm25_future)
+        elif bm25_skipped:
+            bm25 = [(_EMPTY_IDS, _EMPTY_SCORES) for _ in queries]
+            bm25_missed = True
+        elif self.mode in {"bm25", "hybrid"}:
+            bm25, timings["latency_ms_bm25"] = _timed(self._bm25_search_many, queries, fetch_ks, scopes, pinned)
+
+        if trace is not None:
+            trace.update(timings)
+            trace["parallel_hybrid"] = self.parallel_hybrid
+            trace["bm25_deadline_missed"] = bm25_missed
+            trace["bm25_skipped"] = bm25_skipped
+            with self._bm25_overdue_lock:
+                trace["bm25_overdue"] = len(self._bm25_overdue)
+
+        results: List[List[RetrievedChunk]] = []
+        for i, query in enumerate(queries):
+            if self.mode == "dense":
+                ids, scores = dense[i]
+            elif self.mode == "bm25":
+                ids, scores = bm25[i]
+            else:
+                ids, scores = self._rrf_fuse_ids(
+                    *dense[i],
+                    *bm25[i],
+                    rrf_k=self.hybrid_rrf_k,
+                    dense_weight=self.hybrid_dense_weight,
+                    bm25_weight=self.hybrid_bm25_weight,
+                )
+
+            if self._extract_symbol_mentions(query):
+                ids, scores = self._symbol_rerank_ids(ids, scores, query)
+
+            results.append(self._hydrate(ids[:k], scores[:k]))
+        return results
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import multiprocessing
+import shutil
+
+import numpy as np
+
+from src.config import IndexConfig
+from src.retrieval.bm25_index import BM25Index
+from src.retrieval.faiss_store import FaissStore, configure_search, filtered_search_params, id_selector
+
+SHARD_LAYOUT_VERSION = 1
+
+_EMPTY_IDS = np.zeros(0, dtype=np.int64)
+_EMPTY_SCORES = np.zeros(0, dtype=np.float32)
+
+# Per-query leg result from one shard: (ids, scores, pinned_ids, pinned_scores).
+ShardHits = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def shards_dir(index_path: Path) -> Path:
+    """faiss.index -> shards/ (one faiss.index + bm25/ per shard, plus shards.json)."""
+    return index_path.parent / "shards"
+
+
+def shard_ranges(n: int, n_shards: int) -> List[Tuple[int, int]]:
+    """Split vector ids 0..n-1 into `n_shards` contiguous, near-equal [start, end) ranges."""
+    if n_shards < 1:
+        raise ValueError(f"n_shards must be >= 1, got {n_shards}")
+    bounds = np.linspace(0, n, n_shards + 1).round().astype(np.int64)
+    return [(int(bounds[i]), int(bounds[i + 1])) for i in range(n_shards)]
+
+
+def write_shards(
+    out_dir: Path,
+    vectors: np.ndarray,
+    bm25: BM25Index,
+    *,
+    n_shards: int,
+    index_cfg: IndexConfig,
+) -> List[Tuple[int, int]]:
+    """
+    Partition the corpus into `n_shards` shard directories. Each shard keeps
+    global vector ids (IndexIDMap2) and a BM25 subset with the corpus-wide
+    idf/avgdl, so shard scores equal single-index scores.
+    """
+    if vectors.shape[0] != len(bm25):
+        raise ValueError(f"Vectors/BM25 mismatch: vectors={vectors.shape[0]} bm25_docs={len(bm25)}")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    ranges = shard_ranges(vectors.shape[0], n_shards)
+    entries = []
+    for i, (start, end) in enumerate(ranges):
+        shard = out_dir / f"shard_{i:03d}"
+        ids = np.arange(start, end, dtype=np.int64)
+        store = FaissStore(vectors.shape[1], index_cfg=index_cfg, id_map=True)
+        store.add(vectors[start:end], ids)
+        store.save(shard / "faiss.index")
+        bm25.subset(ids).save(shard / "bm25")
+        entries.append({"dir": shard.name, "start": start, "end": end})
+
+    layout = {
+        "version": SHARD_LAYOUT_VERSION,
+        "n_shards": n_shards,
+        "n_vectors": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]),
+        "shards": entries,
+    }
+    (out_dir / "shards.json").write_text(json.dumps(layout, indent=2), encoding="utf-8")
+    return ranges
+
+
+def load_shard_layout(out_dir: Path) -> Optional[Dict[str, Any]]:
+    path = out_dir / "shards.json"
+    if not path.exists():
+        return None
+    layout = json.loads(path.read_text(encoding="utf-8"))
+    if layout.get("version") != SHARD_LAYOUT_VERSION:
+        return None
+    return layout
+
+
+def merge_shard_hits(parts: Sequence[Tuple[np.ndarray, np.ndarray]], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Global top-k from per-shard top-k lists: score desc, then vector id."""
+    parts = [p for p in parts if p[0].size]
+    if not parts:
+        return _EMPTY_IDS, _EMPTY_SCORES
+    ids = np.concatenate([p[0] for p in parts]).astype(np.int64)
+    scores = np.concatenate([p[1] for p in parts])
+    order = np.lexsort((ids, -scores))[:k]
+    return ids[order], scores[order]
+
+
+# ----------------------------------------------------------------------
+# Shard worker (runs in its own process; state is set by the initializer)
+# ----------------------------------------------------------------------
+
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(shard_path: str, index_cfg: Dict[str, Any], mmap: bool, dense: bool, bm25: bool) -> None:
+    shard = Path(shard_path)
+    cfg = IndexConfig(**index_cfg)
+    _WORKER["cfg"] = cfg
+    _WORKER["index"] = configure_search(FaissStore.load(shard / "faiss.index", mmap=mmap), cfg) if dense else None
+    _WORKER["bm25"] = BM25Index.load(shard / "bm25", mmap_mode=mmap) if bm25 else None
+
+
+def _worker_info() -> Dict[str, int]:
+    index, bm25 = _WORKER["index"], _WORKER["bm25"]
+    return {
+        "ntotal": int(index.ntotal) if index is not None else -1,
+        "dim": int(index.d) if index is not None else -1,
+        "bm25_docs": len(bm25) if bm25 is not None else -1,
+    }
+
+
+def _worker_dense(
+    q_vecs: np.ndarray,
+    fetch_ks: List[int],
+    scope_rows: List[int],
+    allowed_sets: List[np.ndarray],
+    pinned: List[np.ndarray],
+) -> List[ShardHits]:
+    index, cfg = _WORKER["index"], _WORKER["cfg"]
+    selectors = [id_selector(allowed) for allowed in allowed_sets]
+    hits: List[Tuple[np.ndarray, np.ndarray]] = [(_EMPTY_IDS, _EMPTY_SCORES)] * len(fetch_ks)
+
+    groups: Dict[Tuple[int, int], List[int]] = {}
+    for row, key in enumerate(zip(fetch_ks, scope_rows)):
+        groups.setdefault(key, []).append(row)
+    for (fetch_k, scope), rows in groups.items():
+        if scope < 0:
+            scores, ids = index.search(q_vecs[rows], fetch_k)
+        else:
+            params = filtered_search_params(
+                index, cfg, selectors[scope], n_allowed=int(allowed_sets[scope].size), k=fetch_k
+            )
+            scores, ids = index.search(q_vecs[rows], fetch_k, params=params)
+        for row, row_ids, row_scores in zip(rows, ids, scores):
+            keep = row_ids >= 0
+            hits[row] = (row_ids[keep].astype(np.int64), row_scores[keep])
+
+    # Every pinned id held by this shard is scored; the coordinator keeps
+    # those missing from the merged top-k.
+    out: List[ShardHits] = []
+    for row, pin in enumerate(pinned):
+        pin_ids, pin_scores = _EMPTY_IDS, _EMPTY_SCORES
+        if pin.size:
+            params = filtered_search_params(index, cfg, id_selector(pin), n_allowed=int(pin.size), k=int(pin.size))
+            scores, ids = index.search(q_vecs[row:row + 1], int(pin.size), params=params)
+            keep = ids[0] >= 0
+            pin_ids, pin_scores = ids[0][keep].astype(np.int64), scores[0][keep]
+        out.append((*hits[row], pin_ids, pin_scores))
+    return out
+
+
+def _worker_bm25(
+    tokens: List[List[str]],
+    fetch_ks: List[int],
+    scope_rows: List[int],
+    allowed_sets: List[np.ndarray],
+    pinned: List[np.ndarray],
+) -> List[ShardHits]:
+    bm25 = _WORKER["bm25"]
+    out: List[ShardHits] = []
+    for q_tokens, fetch_k, scope, pin in zip(tokens, fetch_ks, scope_rows, pinned):
+        if not q_tokens:
+            out.append((_EMPTY_IDS, _EMPTY_SCORES, _EMPTY_IDS, _EMPTY_SCORES))
+            continue
+        allowed = allowed_sets[scope] if scope >= 0 else None
+        ids, scores = bm25.search(q_tokens, fetch_k, allowed=allowed)
+        pin_hits = bm25.search(q_tokens, int(pin.size), allowed=pin) if pin.size else (_EMPTY_IDS, _EMPTY_SCORES)
+        out.append((ids, scores, *pin_hits))
+    return out
+
+
+# ----------------------------------------------------------------------
+# Coordinator
+# ----------------------------------------------------------------------
+
+class ShardedSearcher:
+    """
+    Scatter-gather over shard worker processes on the local machine.
+
+    Each shard is served by a single-process pool that loads that shard's
+    FAISS index and BM25 postings once; queries go out to every shard over
+    multiprocessing pipes and the coordinator merges the per-shard top-k.
+    Because shards keep global ids and BM25 keeps the corpus-wide statistics,
+    merged hits match a single-index search (exactly for flat indexes).
+    """
+
+    def __init__(
+        self,
+        out_dir: Path,
+        index_cfg: IndexConfig,
+        *,
+        mmap: bool = False,
+        dense: bool = True,
+        bm25: bool = True,
+    ):
+        layout = load_shard_layout(out_dir)
+        if layout is None:
+            raise FileNotFoundError(f"Shard layout not found: {out_dir / 'shards.json'} (rerun build_index.py)")
+        self.layout = layout
+        self.ntotal = int(layout["n_vectors"])
+        self.dim = int(layout["dim"])
+        self._pools: List[ProcessPoolExecutor] = []
+
+        # Fail on missing shard files before any worker process exists.
+        for entry in layout["shards"]:
+            shard = out_dir / entry["dir"]
+            required = ([shard / "faiss.index"] if dense else []) + ([shard / "bm25"] if bm25 else [])
+            for path in required:
+                if not path.exists():
+                    raise FileNotFoundError(f"Shard file not found: {path} (rerun build_index.py)")
+
+        # spawn: the parent may already run torch/FAISS threads, which a
+        # forked child would inherit in an undefined state.
+        ctx = multiprocessing.get_context("spawn")
+        try:
+            for entry in layout["shards"]:
+                self._pools.append(
+                    ProcessPoolExecutor(
+                        max_workers=1,
+                        mp_context=ctx,
+                        initializer=_init_worker,
+                        initargs=(str(out_dir / entry["dir"]), index_cfg.model_dump(), bool(mmap), dense, bm25),
+                    )
+                )
+
+            # Start every worker now and check it against the layout.
+            for entry, info in zip(layout["shards"], self._fan_out(_worker_info)):
+                size = int(entry["end"]) - int(entry["start"])
+                if dense and info["ntotal"] != size:
+                    raise ValueError(f"Shard {entry['dir']}: index.ntotal={info['ntotal']} expected {size}")
+                if bm25 and info["bm25_docs"] != size:
+                    raise ValueError(f"Shard {entry['dir']}: bm25_docs={info['bm25_docs']} expected {size}")
+        except BaseException:
+            # A half-started searcher is never returned, so nobody else
+            # would shut its workers down.
+            self.close(wait=True)
+            raise
+
+    @property
+    def n_shards(self) -> int:
+        return len(self._pools)
+
+    def _fan_out(self, fn: Any, *args: Any) -> List[Any]:
+        futures = [pool.submit(fn, *args) for pool in self._pools]
+        return [f.result() for f in futures]
+
+    @staticmethod
+    def _scope_rows(allowed: List[Optional[np.ndarray]]) -> Tuple[List[int], List[np.ndarray]]:
+        """Send each distinct allowed-id array once; rows refer to it by position."""
+        sets: List[np.ndarray] = []
+        positions: Dict[int, int] = {}
+        rows: List[int] = []
+        for arr in allowed:
+            if arr is None:
+                rows.append(-1)
+                continue
+            if id(arr) not in positions:
+                positions[id(arr)] = len(sets)
+                sets.append(arr)
+            rows.append(positions[id(arr)])
+        return rows, sets
+
+    def _gather(self, per_shard: List[List[ShardHits]], fetch_ks: List[int]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        out = []
+        for row, fetch_k in enumerate(fetch_ks):
+            hits = [shard[row] for shard in per_shard]
+            ids, scores = merge_shard_hits([(h[0], h[1]) for h in hits], fetch_k)
+            pin_ids, pin_scores = merge_shard_hits([(h[2], h[3]) for h in hits], self.ntotal)
+            missing = ~np.isin(pin_ids, ids)
+            if missing.any():
+                all_ids = np.concatenate([ids, pin_ids[missing]])
+                all_scores = np.concatenate([scores, pin_scores[missing].astype(scores.dtype)])
+                order = np.argsort(-all_scores, kind="stable")
+                ids, scores = all_ids[order], all_scores[order]
+            out.append((ids, scores))
+        return out
+
+    def search_dense(
+        self,
+        q_vecs: np.ndarray,
+        fetch_ks: List[int],
+        allowed: List[Optional[np.ndarray]],
+        pinned: List[np.ndarray],
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        scope_rows, allowed_sets = self._scope_rows(allowed)
+        per_shard = self._fan_out(_worker_dense, q_vecs, fetch_ks, scope_rows, allowed_sets, pinned)
+        return self._gather(per_shard, fetch_ks)
+
+    def search_bm25(
+        self,
+        tokens: List[List[str]],
+        fetch_ks: List[int],
+        allowed: List[Optional[np.ndarray]],
+        pinned: List[np.ndarray],
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        scope_rows, allowed_sets = self._scope_rows(allowed)
+        per_shard = self._fan_out(_worker_bm25, tokens, fetch_ks, scope_rows, allowed_sets, pinned)
+        return self._gather(per_shard, fetch_ks)
+
+    def close(self, *, wait: bool = False) -> None:
+        for pool in self._pools:
+            pool.shutdown(wait=wait, cancel_futures=True)
+        self._pools = []
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import IndexConfig
+
+CURRENT_FILENAME = "CURRENT"
+SNAPSHOT_INFO_FILENAME = "snapshot.json"
+_STAGING_PREFIX = ".staging-"
+
+
+def snapshots_root(index_path: Path) -> Path:
+    """indexes/faiss.index -> indexes/snapshots/ (one immutable dir per build + CURRENT)."""
+    return index_path.parent / "snapshots"
+
+
+def new_snapshot_id(now: Optional[datetime] = None) -> str:
+    """Sortable, unique id: UTC build time plus a random suffix."""
+    now = now or datetime.now(timezone.utc)
+    return f"{now.strftime('%Y%m%dT%H%M%SZ')}-{secrets.token_hex(3)}"
+
+
+def current_snapshot_id(root: Path) -> Optional[str]:
+    path = root / CURRENT_FILENAME
+    if not path.exists():
+        return None
+    snapshot_id = path.read_text(encoding="utf-8").strip()
+    return snapshot_id or None
+
+
+def staging_dir(root: Path, snapshot_id: str) -> Path:
+    """Where a build writes before publishing; readers never look here."""
+    return root / f"{_STAGING_PREFIX}{snapshot_id}"
+
+
+def list_snapshots(root: Path) -> List[str]:
+    if not root.exists():
+        return []
+    return sorted(
+        p.name
+        for p in root.iterdir()
+        if p.is_dir() and not p.name.startswith(".") and (p / SNAPSHOT_INFO_FILENAME).exists()
+    )
+
+
+def load_snapshot_info(root: Path, snapshot_id: str) -> Dict[str, Any]:
+    return json.loads((root / snapshot_id / SNAPSHOT_INFO_FILENAME).read_text(encoding="utf-8"))
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def publish_snapshot(root: Path, snapshot_id: str, staging: Path, *, info: Dict[str, Any]) -> Path:
+    """
+    Seal a staged build: write snapshot.json, rename the staging dir to its
+    final name and then point CURRENT at it. Both steps are atomic renames,
+    so readers see either the previous snapshot or the complete new one.
+    """
+    payload = {
+        "snapshot_id": snapshot_id,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        **info,
+        "files": {
+            str(p.relative_to(staging)): p.stat().st_size for p in sorted(staging.rglob("*")) if p.is_file()
+        },
+    }
+    (staging / SNAPSHOT_INFO_FILENAME).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    final = root / snapshot_id
+    os.replace(staging, final)
+    _write_atomic(root / CURRENT_FILENAME, f"{snapshot_id}\n")
+    return final
+
+
+def prune_snapshots(root: Path, keep: int) -> List[str]:
+    """Delete all but the `keep` newest snapshots, never the current one."""
+    current = current_snapshot_id(root)
+    snapshots = list_snapshots(root)
+    survivors = set(snapshots[-max(1, keep):]) | ({current} if current else set())
+    removed = [s for s in snapshots if s not in survivors]
+    for snapshot_id in removed:
+        shutil.rmtree(root / snapshot_id, ignore_errors=True)
+    return removed
+
+
+def resolve_index_paths(
+    repo_root: Path,
+    index_cfg: IndexConfig,
+    snapshot_id: Optional[str] = None,
+) -> Tuple[Path, Path, Optional[str]]:
+    """
+    (index_path, meta_path, snapshot_id) to load. With index.snapshots the
+    configured file names are looked up inside the current (or given)
+    snapshot directory; otherwise the configured paths are used as-is.
+    """
+    index_path = repo_root / index_cfg.index_path
+    meta_path = repo_root / index_cfg.meta_path
+    if not index_cfg.snapshots:
+        return index_path, meta_path, None
+
+    root = snapshots_root(index_path)
+    snapshot_id = snapshot_id or current_snapshot_id(root)
+    if snapshot_id is None:
+        raise FileNotFoundError(f"No index snapshot published under {root} (run build_index.py)")
+    snapshot = root / snapshot_id
+    return snapshot / index_path.name, snapshot / meta_path.name, snapshot_id
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Dotted runs such as "os.path.join" or "pathlib.purepath.parts".
+_DOTTED_RE = re.compile(r"\b[a-z_]\w*(?:\.[a-z_]\w*)+\b")
+
+# Sphinx object directives, e.g. ".. function:: dumps(obj)" or
+# "   .. method:: PurePath.joinpath(*segments)".
+DIRECTIVE_RE = re.compile(
+    r"^([ \t]*)\.\.\s+(?:py:)?(function|class|method|attribute|data|exception|decorator"
+    r"|classmethod|staticmethod|abstractmethod|coroutinefunction|coroutinemethod)::\s+([\w\.]+)",
+    re.MULTILINE,
+)
+
+_CLASS_KINDS = {"class", "exception"}
+_MEMBER_KINDS = {"method", "attribute", "classmethod", "staticmethod", "abstractmethod", "coroutinemethod"}
+
+# Definition chunks injected per query for exact-symbol lookups.
+MAX_SYMBOL_DEFINITIONS = 8
+
+
+def symbol_index_path(index_path: Path) -> Path:
+    """faiss.index -> symbols.json (symbol -> vector id maps written next to the index)."""
+    return index_path.parent / "symbols.json"
+
+
+def _dotted_pairs(dotted: str) -> Iterable[str]:
+    """'os.path.join' -> 'os.path', 'path.join' (the shape query mentions take)."""
+    parts = dotted.split(".")
+    for i in range(len(parts) - 1):
+        yield f"{parts[i]}.{parts[i + 1]}"
+
+
+def extract_chunk_symbols(text: str, heading: Optional[str], module: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Return (mentions, definitions) for one chunk, all lower-cased.
+
+    mentions: every adjacent `a.b` pair of a dotted name in the text/heading,
+    plus those of the module-qualified names the chunk defines.
+    definitions: fully qualified names of the chunk's object directives
+    ("json.dumps", "pathlib.purepath.parts") and their dotted names as written.
+    """
+    module = (module or "").lower()
+    body = (text or "").lower()
+    mentions: Set[str] = set()
+    definitions: Set[str] = set()
+
+    for dotted in _DOTTED_RE.findall(f"{body}\n{(heading or '').lower()}"):
+        mentions.update(_dotted_pairs(dotted))
+
+    # Members nested under a class directive are written unqualified
+    # (".. method:: decode" inside ".. class:: JSONDecoder"), so track the
+    # enclosing class by indentation.
+    enclosing: List[Tuple[int, str]] = []
+    for indent, kind, name in DIRECTIVE_RE.findall(body):
+        name = name.strip(".")
+        if not name:
+            continue
+        depth = len(indent.expandtabs())
+        while enclosing and enclosing[-1][0] >= depth:
+            enclosing.pop()
+        if kind in _MEMBER_KINDS and "." not in name and enclosing:
+            name = f"{enclosing[-1][1]}.{name}"
+        if kind in _CLASS_KINDS:
+            enclosing.append((depth, name))
+
+        qualified = name if not module or name.startswith(f"{module}.") else f"{module}.{name}"
+        definitions.add(qualified)
+        if "." in name:
+            definitions.add(name)
+        mentions.update(_dotted_pairs(qualified))
+
+    return mentions, definitions
+
+
+class SymbolIndex:
+    """
+    Inverted maps from dotted symbols to vector ids: `mentions` backs the
+    symbol rerank bonus, `definitions` the directive chunks for exact-symbol
+    lookups. Both are plain dict hits at query time.
+    """
+
+    def __init__(self, mentions: Dict[str, FrozenSet[int]], definitions: Dict[str, np.ndarray]):
+        self.mentions = mentions
+        self.definitions = definitions
+
+    @classmethod
+    def build(cls, records: Iterable[Dict[str, Any]]) -> "SymbolIndex":
+        """Build from meta records (vector_id, text, module, meta.heading)."""
+        mentions: Dict[str, List[int]] = {}
+        definitions: Dict[str, List[int]] = {}
+        for rec in records:
+            vid = int(rec["vector_id"])
+            heading = (rec.get("meta") or {}).get("heading")
+            rec_mentions, rec_definitions = extract_chunk_symbols(
+                str(rec.get("text", "")), heading, str(rec.get("module", ""))
+            )
+            for sym in rec_mentions:
+                mentions.setdefault(sym, []).append(vid)
+            for sym in rec_definitions:
+                definitions.setdefault(sym, []).append(vid)
+        return cls._from_lists(mentions, definitions)
+
+    @classmethod
+    def _from_lists(cls, mentions: Dict[str, List[int]], definitions: Dict[str, List[int]]) -> "SymbolIndex":
+        return cls(
+            mentions={sym: frozenset(vids) for sym, vids in mentions.items()},
+            definitions={sym: np.asarray(sorted(set(vids)), dtype=np.int64) for sym, vids in definitions.items()},
+        )
+
+    def __len__(self) -> int:
+        return len(self.mentions)
+
+    def save(self, path: Path) -> None:
+        payload = {
+            "mentions": {sym: sorted(vids) for sym, vids in sorted(self.mentions.items())},
+            "definitions": {sym: vids.tolist() for sym, vids in sorted(self.definitions.items())},
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path) -> "SymbolIndex":
+        if not path.exists():
+            raise FileNotFoundError(f"Symbol index not found: {path}")
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        return cls._from_lists(payload["mentions"], payload["definitions"])
+
+    def mentioned_in(self, symbol: str, vector_id: int) -> bool:
+        return vector_id in self.mentions.get(symbol, ())
+
+    def definition_ids(self, symbols: Iterable[str], *, limit: int = MAX_SYMBOL_DEFINITIONS) -> np.ndarray:
+        """Vector ids of chunks defining any of `symbols` (first `limit`, symbol order)."""
+        out: List[int] = []
+        for sym in symbols:
+            for vid in self.definitions.get(sym, ()):
+                if int(vid) not in out:
+                    out.append(int(vid))
+        return np.asarray(out[:limit], dtype=np.int64)
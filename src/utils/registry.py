@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+def stat_key(path: Path) -> Tuple[Any, ...]:
+    """
+    Cache key that changes when a file (or any file directly inside a dir)
+    is rewritten: resolved path plus mtime/size.
+    """
+    path = Path(path)
+    if path.is_dir():
+        files = tuple(
+            (p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in sorted(path.iterdir()) if p.is_file()
+        )
+        return (str(path.resolve()), files)
+    if not path.exists():
+        return (str(path.resolve()), None)
+    st = path.stat()
+    return (str(path.resolve()), st.st_mtime_ns, st.st_size)
+
+
+class ResourceRegistry:
+    """
+    Process-wide cache of expensive, read-only handles (parsed config,
+    models, FAISS/BM25 indexes) keyed by kind + name/path.
+
+    `pinned` entries (models, config) live for the process. Unpinned entries
+    (index handles) are held weakly: they are shared while any component
+    uses them and freed once the last user drops them, so a hot-swapped
+    index snapshot does not stay resident.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = True
+        self._pinned: Dict[Tuple[str, Hashable], Any] = {}
+        self._weak: "weakref.WeakValueDictionary[Tuple[str, Hashable], Any]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, Hashable], threading.Lock] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _count(self, kind: str, field: str, value: float = 1) -> None:
+        row = self._stats.setdefault(kind, {"hits": 0, "loads": 0, "load_s": 0.0})
+        row[field] += value
+
+    def get(self, kind: str, key: Hashable, factory: Callable[[], Any], *, pinned: bool = True) -> Any:
+        """Return the shared instance for (kind, key), creating it once with `factory()`."""
+        if not self.enabled:
+            return factory()
+        full_key = (kind, key)
+        with self._lock:
+            value = self._pinned.get(full_key) if pinned else self._weak.get(full_key)
+            if value is not None:
+                self._count(kind, "hits")
+                return value
+            key_lock = self._key_locks.setdefault(full_key, threading.Lock())
+
+        # Load outside the registry lock so unrelated resources load in
+        # parallel; the per-key lock stops two threads loading the same one.
+        with key_lock:
+            with self._lock:
+                value = self._pinned.get(full_key) if pinned else self._weak.get(full_key)
+            if value is not None:
+                with self._lock:
+                    self._count(kind, "hits")
+                return value
+            t0 = time.perf_counter()
+            value = factory()
+            with self._lock:
+                (self._pinned if pinned else self._weak)[full_key] = value
+                self._count(kind, "loads")
+                self._count(kind, "load_s", time.perf_counter() - t0)
+                self._key_locks.pop(full_key, None)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pinned.clear()
+            self._weak.clear()
+            self._stats.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            live: Dict[str, int] = {}
+            for kind, _ in list(self._pinned) + list(self._weak.keys()):
+                live[kind] = live.get(kind, 0) + 1
+            return {
+                "enabled": self.enabled,
+                "resources": {
+                    kind: {**{k: round(v, 3) for k, v in row.items()}, "live": live.get(kind, 0)}
+                    for kind, row in sorted(self._stats.items())
+                },
+            }
+
+
+# The one registry per process.
+registry = ResourceRegistry()
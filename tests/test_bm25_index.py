@@ -0,0 +1,110 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.chunking.splitter import SplitConfig, split_text_with_offsets
+from src.retrieval.bm25_index import BM25Index, tokenize_for_bm25
+
+
+def _corpus():
+    raw_dir = Path(__file__).resolve().parents[1] / "data" / "raw" / "python_stdlib"
+    docs = []
+    for name in ("pathlib.rst", "itertools.rst", "sqlite3.rst"):
+        text = (raw_dir / name).read_text(encoding="utf-8", errors="replace")
+        docs.extend(c["text"] for c in split_text_with_offsets(text, SplitConfig(800, 150)))
+    return [tokenize_for_bm25(d) for d in docs]
+
+
+QUERIES = [
+    "How do I open a sqlite3 connection?",
+    "itertools.chain chain chain iterables",
+    "pathlib path join the a of",
+    "completely unknown zzzqqq tokens",
+]
+
+
+def test_scores_match_rank_bm25_exactly():
+    rank_bm25 = pytest.importorskip("rank_bm25")
+    corpus = _corpus()
+    reference = rank_bm25.BM25Okapi(corpus)
+    index = BM25Index.build(corpus)
+
+    for q in QUERIES:
+        tokens = tokenize_for_bm25(q)
+        np.testing.assert_array_equal(index.get_scores(tokens), reference.get_scores(tokens))
+
+
+def test_search_returns_top_k_positive_scores_in_order():
+    corpus = _corpus()
+    index = BM25Index.build(corpus)
+    tokens = tokenize_for_bm25("sqlite3 cursor execute")
+
+    ids, scores = index.search(tokens, 10)
+    full = index.get_scores(tokens)
+
+    assert len(ids) == 10
+    assert np.all(np.diff(scores) <= 0)
+    expected = np.lexsort((np.arange(full.size), -full))[:10]
+    assert ids.tolist() == expected.tolist()
+    np.testing.assert_allclose(scores, full[expected].astype(np.float32))
+
+
+def test_search_breaks_ties_by_doc_id_and_skips_unmatched_docs():
+    index = BM25Index.build([["a", "b"], ["c"], ["a", "b"], ["a", "b"], ["d"]])
+
+    ids, _ = index.search(["a"], 2)
+    assert ids.tolist() == [0, 2]
+
+    ids, scores = index.search(["zzz"], 3)
+    assert ids.size == 0 and scores.size == 0
+
+
+def test_search_restricted_to_allowed_docs():
+    index = BM25Index.build([["a", "b"], ["c"], ["a", "b"], ["a", "b"], ["d"]])
+
+    ids, _ = index.search(["a"], 2, allowed=np.array([1, 3, 4]))
+    assert ids.tolist() == [3]
+
+
+def test_subsets_keep_global_scores_and_ids(tmp_path):
+    corpus = _corpus()
+    index = BM25Index.build(corpus)
+    halves = np.array_split(np.arange(len(corpus)), 2)
+    index.subset(halves[1]).save(tmp_path / "shard")
+    shards = [index.subset(halves[0]), BM25Index.load(tmp_path / "shard")]
+
+    for q in QUERIES:
+        tokens = tokenize_for_bm25(q)
+        ids, scores = index.search(tokens, 15)
+        parts = [shard.search(tokens, 15) for shard in shards]
+        merged_ids = np.concatenate([p[0] for p in parts])
+        merged_scores = np.concatenate([p[1] for p in parts])
+        order = np.lexsort((merged_ids, -merged_scores))[:15]
+        assert merged_ids[order].tolist() == ids.tolist()
+        np.testing.assert_array_equal(merged_scores[order], scores)
+
+    allowed = halves[1][:5]
+    ids, _ = shards[1].search(tokenize_for_bm25(QUERIES[0]), 5, allowed=allowed)
+    assert set(ids.tolist()) <= set(allowed.tolist())
+
+
+def test_save_and_load_round_trip(tmp_path):
+    corpus = _corpus()
+    index = BM25Index.build(corpus)
+    index.save(tmp_path / "bm25")
+
+    for mmap_mode in (False, True):
+        loaded = BM25Index.load(tmp_path / "bm25", mmap_mode=mmap_mode)
+        assert len(loaded) == len(corpus)
+        for q in QUERIES:
+            tokens = tokenize_for_bm25(q)
+            a_ids, a_scores = index.search(tokens, 15)
+            b_ids, b_scores = loaded.search(tokens, 15)
+            assert a_ids.tolist() == b_ids.tolist()
+            np.testing.assert_array_equal(a_scores, b_scores)
+
+
+def test_load_requires_artifact(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        BM25Index.load(tmp_path / "missing")
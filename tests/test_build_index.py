@@ -0,0 +1,202 @@
+import hashlib
+import re
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pytest
+
+from scripts import build_index as bi
+from src.config import load_app_config
+from src.retrieval.bm25_index import BM25Index, bm25_artifact_dir
+from src.retrieval.faiss_store import FaissStore, base_index
+from src.retrieval.index_manifest import doc_fingerprints
+from src.retrieval.meta_store import ColumnarMetaStore, MmapMetaStore, meta_columns_dir
+from src.retrieval.neighbours import build_neighbour_table, neighbours_path
+from src.retrieval.symbol_index import SymbolIndex, symbol_index_path
+from src.utils.jsonl import iter_jsonl, write_jsonl
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+_WORDS = "path join sqlite connect cursor chain slice iterator json dump load socket bind thread lock queue heap".split()
+_QUERIES = ["open an sqlite connect cursor", "json dump and load", "thread lock queue", "chain slice iterator"]
+
+
+class _CountingHashEmbedder:
+    """Bag-of-words hashing embedder; counts the texts it encodes."""
+
+    dim = 64
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, show_progress_bar=True):
+        self.encoded += len(texts)
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for tok in re.findall(r"[a-z0-9_]+", text.lower()):
+                out[row, int(hashlib.md5(tok.encode()).hexdigest(), 16) % self.dim] += 1.0
+        return out / np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+
+
+def _chunks(doc_ids, *, per_doc=4, edited=()):
+    chunks = []
+    for d in doc_ids:
+        rng = np.random.default_rng(d)
+        for i in range(per_doc):
+            words = " ".join(rng.choice(_WORDS, size=10))
+            text = f"mod{d}.func{i} {words} doc{d} part{i}" + (" edited" if d in edited else "")
+            chunks.append(
+                {
+                    "chunk_id": f"d{d}#c{i:04d}",
+                    "doc_id": f"d{d}",
+                    "module": f"mod{d}",
+                    "text": text,
+                    "meta": {"heading": f"mod{d} section"},
+                    "start_char": i * 100,
+                    "end_char": i * 100 + len(text),
+                    "chunk_index": i,
+                }
+            )
+    return chunks
+
+
+def _cfg(**index):
+    cfg, _ = load_app_config(REPO_ROOT)
+    return cfg.model_copy(update={"index": cfg.index.model_copy(update={"shards": 0, "snapshots": False, **index})})
+
+
+def _build(cfg, embedder, chunks, out_dir, *, incremental=False, stream_batch_size=0):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    chunks_path = out_dir.parent / f"{out_dir.name}.chunks.jsonl"
+    write_jsonl(chunks_path, chunks)
+    docs = doc_fingerprints(iter_jsonl(chunks_path), {})
+    bi.build_artifacts(
+        cfg,
+        embedder,
+        chunks_path,
+        docs,
+        out_dir / "faiss.index",
+        out_dir / "meta.jsonl",
+        incremental=incremental,
+        stream_batch_size=stream_batch_size,
+        t0=time.perf_counter(),
+    )
+    return out_dir
+
+
+def _assert_artifacts_aligned(out_dir, embedder):
+    """Every artifact agrees with meta.jsonl row for row, and row i is vector i."""
+    index_path, meta_path = out_dir / "faiss.index", out_dir / "meta.jsonl"
+    meta = list(iter_jsonl(meta_path))
+    n = len(meta)
+    assert [r["vector_id"] for r in meta] == list(range(n))
+
+    index = FaissStore.load(index_path)
+    assert int(index.ntotal) == n
+    stored = base_index(index)
+    if isinstance(stored, faiss.IndexFlat):
+        np.testing.assert_allclose(stored.reconstruct_n(0, n), embedder.encode([r["text"] for r in meta]), atol=1e-6)
+
+    mapped = MmapMetaStore(meta_path)
+    columnar = ColumnarMetaStore(meta_columns_dir(meta_path))
+    for vid, rec in enumerate(meta):
+        assert mapped.get(vid) == rec
+        assert columnar.get(vid)["chunk_id"] == rec["chunk_id"]
+        assert columnar.text(vid) == rec["text"]
+
+    assert len(BM25Index.load(bm25_artifact_dir(index_path))) == n
+    symbols, expected_symbols = SymbolIndex.load(symbol_index_path(index_path)), SymbolIndex.build(meta)
+    assert symbols.mentions == expected_symbols.mentions
+    np.testing.assert_array_equal(np.load(neighbours_path(index_path)), build_neighbour_table(meta))
+    return meta
+
+
+def _scores_by_chunk(out_dir, embedder):
+    """chunk_id -> score for every vector, per query (tie-proof comparison across id orders)."""
+    meta = list(iter_jsonl(out_dir / "meta.jsonl"))
+    index = FaissStore.load(out_dir / "faiss.index")
+    scores, ids = index.search(embedder.encode(_QUERIES), len(meta))
+    return [
+        {meta[int(v)]["chunk_id"]: round(float(s), 5) for v, s in zip(row_ids, row_scores) if v >= 0}
+        for row_ids, row_scores in zip(ids, scores)
+    ]
+
+
+def test_incremental_build_matches_a_fresh_full_build(tmp_path):
+    cfg = _cfg()
+    embedder = _CountingHashEmbedder()
+    incremental = _build(cfg, embedder, _chunks(range(6)), tmp_path / "incremental")
+
+    # d2 is edited in place, d4 removed and d6 added: kept vectors move ids.
+    updated = _chunks([0, 1, 2, 3, 5, 6], edited={2})
+    embedder.encoded = 0
+    _build(cfg, embedder, updated, tmp_path / "incremental", incremental=True)
+    assert embedder.encoded == 8  # only d2 and d6
+
+    full = _build(cfg, _CountingHashEmbedder(), updated, tmp_path / "full")
+
+    inc_meta = _assert_artifacts_aligned(incremental, embedder)
+    full_meta = _assert_artifacts_aligned(full, embedder)
+    assert {r["chunk_id"]: r["text"] for r in inc_meta} == {r["chunk_id"]: r["text"] for r in full_meta}
+    # Kept chunks keep their old relative order ahead of the re-embedded ones.
+    assert [r["doc_id"] for r in inc_meta[:16]] == ["d0"] * 4 + ["d1"] * 4 + ["d3"] * 4 + ["d5"] * 4
+    assert _scores_by_chunk(incremental, embedder) == _scores_by_chunk(full, embedder)
+
+
+def test_incremental_build_falls_back_to_a_full_build_when_settings_change(tmp_path, capsys):
+    embedder = _CountingHashEmbedder()
+    chunks = _chunks(range(4))
+    out = _build(_cfg(), embedder, chunks, tmp_path / "out")
+
+    hnsw = _cfg(type="hnsw")
+    embedder.encoded = 0
+    _build(hnsw, embedder, chunks, out, incremental=True)
+    assert "settings changed" in capsys.readouterr().out
+    assert embedder.encoded == len(chunks)
+
+    full = _build(hnsw, _CountingHashEmbedder(), chunks, tmp_path / "full")
+    assert _assert_artifacts_aligned(out, embedder) == _assert_artifacts_aligned(full, embedder)
+    assert _scores_by_chunk(out, embedder) == _scores_by_chunk(full, embedder)
+
+
+_IVFPQ = {"type": "ivfpq", "ivf_nlist": 4, "ivf_nprobe": 4, "pq_m": 8, "pq_nbits": 4}
+
+
+@pytest.mark.parametrize("index", [{}, _IVFPQ], ids=["flat", "ivfpq"])
+def test_stream_build_matches_an_in_memory_build(tmp_path, capsys, index):
+    cfg = _cfg(**index)
+    chunks = _chunks(range(30))  # 120 chunks <= 39 * nlist: IVF trains on the whole corpus either way
+    embedder = _CountingHashEmbedder()
+    streamed = _build(cfg, embedder, chunks, tmp_path / "streamed", stream_batch_size=7)
+    out = capsys.readouterr().out
+    full = _build(cfg, _CountingHashEmbedder(), chunks, tmp_path / "full")
+
+    assert "Streamed 120/120 chunks" in out
+    if index:
+        assert "Training ivfpq on 120 sampled chunks" in out and "recall@" in out
+    assert not bi.stream_spill_path(streamed / "faiss.index").exists()
+    assert _assert_artifacts_aligned(streamed, embedder) == _assert_artifacts_aligned(full, embedder)
+    assert _scores_by_chunk(streamed, embedder) == _scores_by_chunk(full, embedder)
+
+
+def test_stream_build_trains_ivf_on_a_sample_and_spills_vectors_to_a_memmap(tmp_path, capsys):
+    cfg = _cfg(**{**_IVFPQ, "ivf_nlist": 2})
+    out_dir = tmp_path
+    chunks = _chunks(range(30))
+    write_jsonl(out_dir / "chunks.jsonl", chunks)
+    embedder = _CountingHashEmbedder()
+
+    n, vectors = bi.stream_build(
+        cfg, embedder, out_dir / "chunks.jsonl", out_dir / "faiss.index", out_dir / "meta.jsonl", batch_size=16
+    )
+    out = capsys.readouterr().out
+
+    assert n == 120
+    assert "Training ivfpq on 78 sampled chunks" in out  # 39 points per list
+    assert embedder.encoded == 120 + 78
+    assert re.search(r"ivfpq/float32 recall@1 vs flat: [0-9.]+ \(queries=", out)
+    assert isinstance(vectors, np.memmap)
+    np.testing.assert_allclose(vectors, embedder.encode([c["text"] for c in chunks]), atol=1e-6)
+    assert int(FaissStore.load(out_dir / "faiss.index").ntotal) == n
+    assert [r["chunk_id"] for r in iter_jsonl(out_dir / "meta.jsonl")] == [c["chunk_id"] for c in chunks]
@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.retrieval.dedup import count_aliases, dedup_chunks, near_duplicate_canonicals
+
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype("float32")
+
+
+def _chunk(i: int, module: str) -> dict:
+    return {
+        "chunk_id": f"py-stdlib:{module}.rst#c{i:04d}",
+        "doc_id": f"py-stdlib:{module}.rst",
+        "module": module,
+        "text": f"chunk {i}",
+        "meta": {"heading": None},
+    }
+
+
+def test_aliases_point_at_the_most_similar_earlier_kept_row():
+    rng = np.random.default_rng(0)
+    base = _unit(rng.standard_normal((3, 32)))
+    near = _unit(base[0:1] + 0.01 * rng.standard_normal((1, 32)))[0]
+    vectors = np.vstack([base, near[None, :], near[None, :]])
+
+    canonical, similarity = near_duplicate_canonicals(vectors, 0.95)
+
+    assert canonical.tolist() == [0, 1, 2, 0, 0]
+    assert similarity[3] > 0.95 and similarity[0] == 1.0
+
+
+def test_dedup_chunks_records_aliases_in_meta():
+    rng = np.random.default_rng(1)
+    base = _unit(rng.standard_normal((3, 32)))
+    vectors = np.vstack([base, base[1:2]])
+    chunks = [_chunk(0, "json"), _chunk(1, "pickle"), _chunk(2, "csv"), _chunk(3, "marshal")]
+
+    kept, kept_vectors, n_aliases = dedup_chunks(chunks, vectors, 0.97)
+
+    assert n_aliases == 1
+    assert [c["chunk_id"] for c in kept] == [c["chunk_id"] for c in chunks[:3]]
+    np.testing.assert_array_equal(kept_vectors, base)
+    aliases = kept[1]["meta"]["aliases"]
+    assert [(a["chunk_id"], a["module"]) for a in aliases] == [(chunks[3]["chunk_id"], "marshal")]
+    assert "aliases" not in chunks[1]["meta"]  # inputs are not mutated
+    assert count_aliases(kept) + len(kept) == len(chunks)
@@ -0,0 +1,144 @@
+import numpy as np
+
+from src.embeddings import embedding_cache
+from src.embeddings.embedding_cache import CachedEmbedder, EmbeddingCache
+
+
+class _CountingEmbedder:
+    """Row = [len(text), call number]; records every text it was asked to encode."""
+
+    def __init__(self):
+        self.seen = []
+        self.closed = False
+
+    def encode(self, texts, show_progress_bar=True):
+        self.seen.extend(texts)
+        return np.array([[float(len(t)), float(len(self.seen))] for t in texts], dtype="float32")
+
+    def close(self):
+        self.closed = True
+
+
+def _cache(root, model_id="m", normalize=True):
+    return EmbeddingCache(root, model_id=model_id, normalize=normalize)
+
+
+def test_cached_embedder_encodes_only_unseen_text_once(tmp_path):
+    inner = _CountingEmbedder()
+    embedder = CachedEmbedder(inner, _cache(tmp_path))
+
+    first = embedder.encode(["a", "bb", "a"])
+    second = embedder.encode(["bb", "ccc", "a"])
+
+    assert inner.seen == ["a", "bb", "ccc"]
+    np.testing.assert_array_equal(first[0], first[2])
+    np.testing.assert_array_equal(second[0], first[1])
+    np.testing.assert_array_equal(second[2], first[0])
+    stats = embedder.cache.stats()
+    assert (stats["hits"], stats["misses"]) == (3, 3)
+    assert stats["entries"] == 3
+
+
+def test_cache_persists_across_instances_and_separates_model_and_normalize(tmp_path):
+    inner = _CountingEmbedder()
+    embedder = CachedEmbedder(inner, _cache(tmp_path))
+    vectors = embedder.encode(["x", "yy"])
+    embedder.close()
+    assert inner.closed
+
+    reopened = _cache(tmp_path)
+    assert len(reopened) == 2
+    again = CachedEmbedder(_CountingEmbedder(), reopened)
+    np.testing.assert_array_equal(again.encode(["yy", "x"]), vectors[::-1])
+    assert again.inner.seen == []
+    assert isinstance(reopened._segments[0], np.memmap)
+
+    other_model = CachedEmbedder(_CountingEmbedder(), _cache(tmp_path, model_id="m@onnx-int8"))
+    other_model.encode(["x"])
+    unnormalized = CachedEmbedder(_CountingEmbedder(), _cache(tmp_path, normalize=False))
+    unnormalized.encode(["x"])
+    assert other_model.inner.seen == ["x"] and unnormalized.inner.seen == ["x"]
+
+
+def test_segments_are_compacted_without_losing_vectors(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "MAX_SEGMENTS", 2)
+    cache = _cache(tmp_path)
+    embedder = CachedEmbedder(_CountingEmbedder(), cache)
+    expected = {}
+    for i in range(4):
+        text = "t" * (i + 1)
+        expected[text] = embedder.encode([text])[0]
+        cache.flush()
+
+    assert len(list(cache.dir.glob("seg-*.keys.npy"))) <= 2
+    reopened = _cache(tmp_path)
+    assert len(reopened) == 4
+    for text, vec in expected.items():
+        np.testing.assert_array_equal(reopened.get_many([reopened.key(text)])[0], vec)
+
+
+def test_flush_indexes_only_the_new_segment(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    embedder = CachedEmbedder(_CountingEmbedder(), cache)
+    embedder.encode(["a"])
+    cache.flush()
+
+    def no_reload():
+        raise AssertionError("flush re-read every segment")
+
+    monkeypatch.setattr(cache, "_load", no_reload)
+    embedder.encode(["bb"])
+    assert cache.flush() == 1
+    assert len(cache) == 2 and len(cache._segments) == 2
+    assert cache.get_many([cache.key("a"), cache.key("bb")])[1] is not None
+
+
+def test_load_skips_segments_compacted_away_and_compaction_honours_the_lock(tmp_path, monkeypatch):
+    cache = _cache(tmp_path)
+    embedder = CachedEmbedder(_CountingEmbedder(), cache)
+    for text in ("a", "bb", "ccc"):
+        embedder.encode([text])
+        cache.flush()
+
+    # Another build removed a segment between the glob and np.load.
+    name = cache._segment_names[0]
+    (cache.dir / f"{name}.vectors.npy").unlink()
+    reopened = _cache(tmp_path)
+    assert len(reopened) == 2
+    (cache.dir / f"{name}.keys.npy").unlink()  # ... and then its keys
+
+    (reopened.dir / ".compact.lock").touch()
+    reopened.compact()
+    assert len(list(reopened.dir.glob("seg-*.keys.npy"))) == 2  # lock held: untouched
+
+    monkeypatch.setattr(embedding_cache, "STALE_LOCK_S", -1.0)
+    reopened.compact()
+    assert len(list(reopened.dir.glob("seg-*.keys.npy"))) == 1
+    assert not (reopened.dir / ".compact.lock").exists()
+
+
+def test_compaction_waits_for_the_instance_holding_the_lock_and_keeps_the_other_readable(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "FLUSH_ROWS", 2)  # compaction copies in blocks of this many rows
+    writer = _cache(tmp_path)
+    embedder = CachedEmbedder(_CountingEmbedder(), writer)
+    batch = ["e" * n for n in range(5, 10)]
+    expected = dict(zip(batch, embedder.encode(batch)))  # one 5-row segment
+    for text in ("a", "bb", "ccc", "a"):
+        expected[text] = embedder.encode([text])[0]
+        writer.flush()
+    reader = _cache(tmp_path)
+    assert len(reader._segments) == 4
+
+    assert writer._lock_compaction()  # writer is mid-compaction
+    reader.compact()
+    assert len(reader._segments) == 4 and len(list(reader.dir.glob("seg-*.keys.npy"))) == 4
+    (writer.dir / ".compact.lock").unlink()
+
+    writer.compact()
+    assert len(writer._segments) == 1 and isinstance(writer._segments[0], np.memmap)
+    # The reader's maps of the removed segments stay valid until it reloads.
+    for cache in (reader, writer, _cache(tmp_path)):
+        got = cache.get_many([cache.key(t) for t in expected])
+        for vec, text in zip(got, expected):
+            np.testing.assert_array_equal(vec, expected[text])
+    assert len(list(writer.dir.glob("seg-*"))) == 2 and not list(writer.dir.glob(".seg-*"))
@@ -0,0 +1,134 @@
+import faiss
+import numpy as np
+import pytest
+
+from src.config import IndexConfig
+from src.retrieval.faiss_store import (
+    FaissStore,
+    configure_search,
+    filtered_search_params,
+    id_selector,
+    make_index,
+    recall_at_k,
+)
+
+
+def _vectors(n: int = 500, dim: int = 32, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((n, dim)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _index_cfg(**overrides) -> IndexConfig:
+    return IndexConfig(index_path="indexes/faiss.index", meta_path="indexes/meta.jsonl", **overrides)
+
+
+def test_flat_is_default_index_type():
+    store = FaissStore(16)
+    assert store.index.metric_type == 0  # METRIC_INNER_PRODUCT
+    assert type(store.index).__name__ == "IndexFlatIP"
+
+
+def test_hnsw_index_uses_configured_params_and_high_recall(tmp_path):
+    x = _vectors()
+    cfg = _index_cfg(type="hnsw", hnsw_m=16, hnsw_ef_construction=100, hnsw_ef_search=128)
+
+    store = FaissStore(x.shape[1], index_cfg=cfg)
+    store.add(x)
+    store.save(tmp_path / "hnsw.index")
+
+    loaded = configure_search(FaissStore.load(tmp_path / "hnsw.index"), cfg)
+    assert loaded.hnsw.efSearch == 128
+    assert loaded.ntotal == x.shape[0]
+
+    exact = make_index(x.shape[1])
+    exact.add(x)
+    assert recall_at_k(loaded, exact, x[:50], 5) >= 0.9
+
+
+def test_recall_at_k_is_one_for_identical_indexes():
+    x = _vectors(n=100)
+    a = make_index(x.shape[1])
+    a.add(x)
+    b = make_index(x.shape[1])
+    b.add(x)
+
+    assert recall_at_k(a, b, x[:10], 5) == 1.0
+
+
+def test_ivfpq_trains_on_add_and_applies_nprobe(tmp_path):
+    x = _vectors(n=600)
+    cfg = _index_cfg(type="ivfpq", ivf_nlist=8, ivf_nprobe=4, pq_m=8, pq_nbits=6)
+
+    store = FaissStore(x.shape[1], index_cfg=cfg)
+    assert not store.index.is_trained
+    store.add(x)
+    store.save(tmp_path / "ivfpq.index")
+
+    loaded = configure_search(FaissStore.load(tmp_path / "ivfpq.index"), cfg.model_copy(update={"ivf_nprobe": 8}))
+    ivf = faiss.extract_index_ivf(loaded)
+    assert loaded.is_trained
+    assert ivf.nprobe == 8
+    assert ivf.code_size == 6  # 8 sub-quantizers x 6 bits
+
+    exact = make_index(x.shape[1])
+    exact.add(x)
+    assert recall_at_k(loaded, exact, x[:50], 1) >= 0.5
+
+
+def test_ivfpq_rejects_too_few_training_vectors():
+    cfg = _index_cfg(type="ivfpq", ivf_nlist=64, pq_m=8, pq_nbits=8)
+    store = FaissStore(32, index_cfg=cfg)
+
+    with pytest.raises(ValueError, match="training vectors"):
+        store.add(_vectors(n=100))
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivfpq"])
+def test_filtered_search_only_returns_allowed_ids(index_type):
+    x = _vectors(n=2000)
+    cfg = _index_cfg(type=index_type, hnsw_m=16, ivf_nlist=16, ivf_nprobe=16, pq_m=8, pq_nbits=6)
+    store = FaissStore(x.shape[1], index_cfg=cfg)
+    store.add(x)
+    index = configure_search(store.index, cfg)
+
+    # A contiguous block (range selector) and a sparse handful (batch selector);
+    # the sparse case is where unwidened HNSW search comes back empty.
+    for allowed in (np.arange(100, 200), np.array([5, 7, 1500, 1900])):
+        selector = id_selector(allowed)
+        params = filtered_search_params(index, cfg, selector, n_allowed=allowed.size, k=4)
+        _, ids = index.search(x[allowed[:3]], 4, params=params)
+        assert set(ids[ids >= 0].tolist()) <= set(allowed.tolist())
+        assert ids[:, 0].tolist() == allowed[:3].tolist()
+
+
+def test_id_mapped_store_keeps_vector_ids_and_search_knobs(tmp_path):
+    x = _vectors(n=300)
+    cfg = _index_cfg(type="hnsw", hnsw_m=16, hnsw_ef_search=96)
+    store = FaissStore(x.shape[1], index_cfg=cfg, id_map=True)
+    store.add(x[:200])
+    store.add(x[200:])
+    store.save(tmp_path / "idmap.index")
+
+    loaded = configure_search(FaissStore.load(tmp_path / "idmap.index", mmap=True), cfg)
+    assert faiss.downcast_index(loaded.index).hnsw.efSearch == 96
+    _, ids = loaded.search(x[[5, 250]], 1)
+    assert ids[:, 0].tolist() == [5, 250]
+
+
+@pytest.mark.parametrize("storage, ratio", [("float16", 2), ("sq8", 4)])
+def test_reduced_precision_storage_shrinks_flat_index(storage, ratio):
+    x = _vectors(n=1000, dim=64)
+    full = FaissStore(x.shape[1], index_cfg=_index_cfg())
+    full.add(x)
+    small = FaissStore(x.shape[1], index_cfg=_index_cfg(storage=storage))
+    small.add(x)
+
+    full_bytes = len(faiss.serialize_index(full.index))
+    assert len(faiss.serialize_index(small.index)) <= full_bytes / ratio * 1.05
+    assert recall_at_k(small.index, full.index, x[:100], 10) >= 0.9
+
+
+def test_reduced_precision_storage_is_rejected_for_ivfpq():
+    with pytest.raises(ValueError, match="storage"):
+        make_index(64, _index_cfg(type="ivfpq", storage="sq8", pq_m=8))
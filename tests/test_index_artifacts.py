@@ -2,6 +2,7 @@ from pathlib import Path
 import yaml
 import faiss
 
+from src.retrieval.dedup import count_aliases
 from src.utils.jsonl import iter_jsonl
 
 
@@ -25,12 +26,14 @@ def test_index_and_meta_alignment():
     n_vec = index.ntotal
 
     n_meta = 0
+    n_aliases = 0
     expected = 0
     for rec in iter_jsonl(meta_path):
         assert rec["vector_id"] == expected
         expected += 1
         n_meta += 1
+        n_aliases += count_aliases([rec])
 
-    assert n_chunks == n_meta
+    assert n_chunks == n_meta + n_aliases
     assert n_vec == n_meta
     assert index.d > 0
@@ -0,0 +1,57 @@
+import numpy as np
+
+from src.retrieval.faiss_store import FaissStore, compact_ids, supports_incremental_update
+from src.retrieval.index_manifest import diff_docs, doc_fingerprints, plan_reorder
+
+
+def _chunks(doc_id, texts):
+    return [
+        {"doc_id": doc_id, "chunk_id": f"{doc_id}#c{i}", "text": t, "start_char": i * 10, "end_char": i * 10 + len(t)}
+        for i, t in enumerate(texts)
+    ]
+
+
+def test_fingerprints_detect_doc_and_chunking_changes():
+    old = doc_fingerprints(_chunks("a", ["x", "y"]) + _chunks("b", ["z"]), {"a": "sha-a", "b": "sha-b"})
+    new = doc_fingerprints(
+        _chunks("a", ["x", "y"]) + _chunks("b", ["z", "w"]) + _chunks("c", ["q"]),
+        {"a": "sha-a", "b": "sha-b", "c": "sha-c"},
+    )
+    # b has the same sha256 but different chunks (e.g. re-chunked).
+    assert diff_docs(old, new) == ({"b"}, set(), {"c"})
+    assert diff_docs(new, old) == ({"b"}, {"c"}, set())
+
+
+def test_incremental_update_matches_a_fresh_build():
+    rng = np.random.default_rng(0)
+    vec = {}
+
+    def embed(chunks):
+        for c in chunks:
+            vec.setdefault(c["text"], rng.standard_normal(8).astype("float32"))
+        return np.stack([vec[c["text"]] for c in chunks])
+
+    old_chunks = _chunks("a", ["a0", "a1"]) + _chunks("b", ["b0", "b1", "b2"]) + _chunks("c", ["c0"])
+    store = FaissStore(8, id_map=True)
+    store.add(embed(old_chunks))
+    assert supports_incremental_update(store.index)
+
+    # b changes, c is removed, d is added.
+    new_chunks = _chunks("a", ["a0", "a1"]) + _chunks("b", ["b0*", "b1*"]) + _chunks("d", ["d0"])
+    removed, kept, fresh = plan_reorder([c["doc_id"] for c in old_chunks], new_chunks, {"b", "d"})
+    assert removed == [2, 3, 4, 5]
+    assert [c["text"] for c in kept + fresh] == ["a0", "a1", "b0*", "b1*", "d0"]
+
+    index = store.index
+    index.remove_ids(np.asarray(removed, dtype=np.int64))
+    compact_ids(index)
+    index.add_with_ids(embed(fresh), np.arange(index.ntotal, index.ntotal + len(fresh), dtype=np.int64))
+
+    fresh_store = FaissStore(8, id_map=True)
+    fresh_store.add(embed(kept + fresh))
+    queries = embed(kept + fresh)
+    d1, i1 = index.search(queries, 3)
+    d2, i2 = fresh_store.index.search(queries, 3)
+    np.testing.assert_array_equal(i1, i2)
+    np.testing.assert_array_equal(d1, d2)
+    np.testing.assert_array_equal(index.reconstruct(4), vec["d0"])
@@ -0,0 +1,108 @@
+from pathlib import Path
+
+import pytest
+
+from src.retrieval.meta_store import (
+    ColumnarMetaStore,
+    FaissMetaStore,
+    MmapMetaStore,
+    meta_offsets_path,
+    write_columnar_meta,
+    write_meta_offsets,
+)
+from src.utils.jsonl import write_jsonl
+
+
+def _rows(n: int = 5):
+    for i in range(n):
+        yield {
+            "vector_id": i,
+            "chunk_id": f"py-stdlib:mod{i}.rst#c0000",
+            "doc_id": f"py-stdlib:mod{i}.rst",
+            "module": f"mod{i}",
+            "text": f"Docs for mod{i} — unicode ✓ text",
+            "meta": {"source_path": f"data/raw/python_stdlib/mod{i}.rst", "heading": None},
+            "start_char": 0,
+            "end_char": 10,
+            "chunk_index": 0,
+        }
+
+
+def test_mmap_meta_store_matches_list_loader(tmp_path: Path):
+    meta_path = tmp_path / "meta.jsonl"
+    write_jsonl(meta_path, _rows())
+    write_meta_offsets(meta_path)
+
+    eager = FaissMetaStore(meta_path)
+    mapped = MmapMetaStore(meta_path)
+
+    assert len(mapped) == len(eager) == 5
+    for i in range(len(eager)):
+        assert mapped.get(i) == eager.get(i)
+    assert list(mapped.iter_records()) == eager.meta
+
+
+def test_mmap_meta_store_tolerates_blank_lines(tmp_path: Path):
+    meta_path = tmp_path / "meta.jsonl"
+    rows = list(_rows(2))
+    write_jsonl(meta_path, rows)
+    meta_path.write_text(meta_path.read_text(encoding="utf-8").replace("\n", "\n\n", 1), encoding="utf-8")
+    write_meta_offsets(meta_path)
+
+    mapped = MmapMetaStore(meta_path)
+
+    assert len(mapped) == 2
+    assert mapped.get(1) == rows[1]
+
+
+def test_mmap_meta_store_requires_fresh_offsets(tmp_path: Path):
+    meta_path = tmp_path / "meta.jsonl"
+    write_jsonl(meta_path, _rows(2))
+
+    with pytest.raises(FileNotFoundError):
+        MmapMetaStore(meta_path)
+
+    write_meta_offsets(meta_path)
+    write_jsonl(meta_path, _rows(3))
+    assert meta_offsets_path(meta_path).exists()
+    with pytest.raises(ValueError, match="stale"):
+        MmapMetaStore(meta_path)
+
+
+def test_columnar_meta_store_round_trips_rows(tmp_path: Path):
+    rows = list(_rows(4))
+    rows[1]["meta"] = {"source_path": rows[1]["meta"]["source_path"]}  # heading key absent
+    rows[2]["meta"]["aliases"] = ["py-stdlib:other.rst#c0003"]
+    columns_dir = tmp_path / "meta_columns"
+
+    assert write_columnar_meta(columns_dir, rows) == 4
+
+    for mmap_mode in (False, True):
+        store = ColumnarMetaStore(columns_dir, mmap_mode=mmap_mode)
+        assert len(store) == 4
+        for i, row in enumerate(rows):
+            assert store.get(i) == row
+        assert store.text(3) == rows[3]["text"]
+        assert store.module(0) == "mod0"
+
+
+def test_columnar_meta_store_interns_repeated_values(tmp_path: Path):
+    rows = list(_rows(6))
+    for r in rows:
+        r["module"] = "shared"
+        r["doc_id"] = "py-stdlib:shared.rst"
+    write_columnar_meta(tmp_path / "cols", rows)
+
+    store = ColumnarMetaStore(tmp_path / "cols")
+
+    assert store.strings["module"] == ["shared"]
+    assert store.strings["doc_id"] == ["py-stdlib:shared.rst"]
+    assert store.strings["heading"] == []
+
+
+def test_columnar_meta_writer_rejects_out_of_order_rows(tmp_path: Path):
+    rows = list(_rows(3))
+    rows[1]["vector_id"] = 2
+
+    with pytest.raises(ValueError, match="vector_id mismatch"):
+        write_columnar_meta(tmp_path / "cols", rows)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from src.embeddings.onnx_backend import OnnxEncoder, backend_label, onnx_model_dir
+
+
+class _Input:
+    def __init__(self, name):
+        self.name = name
+
+
+class _FakeTokenizer:
+    """Token ids are word lengths; padding to the longest text in the batch."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, *, padding, truncation, max_length, return_tensors):
+        self.batches.append(list(texts))
+        ids = [[len(w) for w in t.split()][:max_length] for t in texts]
+        width = max(len(x) for x in ids)
+        input_ids = np.array([x + [0] * (width - len(x)) for x in ids], dtype=np.int64)
+        return {"input_ids": input_ids, "attention_mask": (input_ids > 0).astype(np.int64)}
+
+
+class _FakeSession:
+    """Embedding = [number of tokens, sum of token ids]; requires every declared input."""
+
+    def get_inputs(self):
+        return [_Input("input_ids"), _Input("attention_mask"), _Input("token_type_ids")]
+
+    def run(self, outputs, feeds):
+        assert outputs == ["sentence_embedding"] and set(feeds) == {"input_ids", "attention_mask", "token_type_ids"}
+        mask = feeds["attention_mask"]
+        return [np.stack([mask.sum(1), (feeds["input_ids"] * mask).sum(1)], axis=1).astype("float32")]
+
+
+def test_encoder_batches_by_length_and_returns_rows_in_input_order(tmp_path):
+    tokenizer = _FakeTokenizer()
+    enc = OnnxEncoder(tmp_path, session=_FakeSession(), tokenizer=tokenizer, max_seq_length=3)
+    texts = ["a bb ccc dddd", "x", "yy zz", "q"]
+
+    out = enc.encode(texts, batch_size=2)
+
+    assert tokenizer.batches == [["x", "q"], ["yy zz", "a bb ccc dddd"]]
+    np.testing.assert_array_equal(out, [[3, 6], [1, 1], [2, 4], [1, 1]])  # truncated to 3 tokens
+    assert out.dtype == np.float32
+
+
+def test_backend_label_and_model_dir(tmp_path):
+    assert backend_label("torch", True) == "torch"
+    assert backend_label("onnx", True) == "onnx-int8"
+    assert backend_label("onnx", False) == "onnx"
+    assert onnx_model_dir(tmp_path, "sentence-transformers/all-MiniLM-L6-v2").name == (
+        "sentence-transformers__all-MiniLM-L6-v2"
+    )
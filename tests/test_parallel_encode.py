@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+
+from src.embeddings.parallel import ParallelEmbedder, encode_parallel, shard_ranges
+
+
+class _PidEmbedder:
+    """Row = [text number, encoding process id]."""
+
+    def encode(self, texts, show_progress_bar=True):
+        return np.array([[float(t.split()[-1]), float(os.getpid())] for t in texts], dtype="float32")
+
+
+class _PidEmbedderFactory:
+    def __call__(self):
+        return _PidEmbedder()
+
+
+def test_shard_ranges_are_contiguous_and_cover_all_rows():
+    ranges = shard_ranges(1000, workers=3, min_size=64)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 1000
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert all(end - start >= 64 for start, end in ranges[:-1])
+    assert shard_ranges(10, workers=4, min_size=64) == [(0, 10)]
+
+
+def test_encode_parallel_returns_rows_in_input_order_from_worker_processes():
+    texts = [f"chunk {i}" for i in range(200)]
+
+    out = encode_parallel(texts, factory=_PidEmbedderFactory(), workers=2, batch_size=16, log=lambda _: None)
+
+    np.testing.assert_array_equal(out[:, 0], np.arange(200))
+    assert os.getpid() not in set(out[:, 1].astype(int).tolist())
+
+
+def test_parallel_embedder_encodes_small_inputs_in_process():
+    embedder = ParallelEmbedder(_PidEmbedderFactory(), workers=4, batch_size=16)
+
+    out = embedder.encode([f"chunk {i}" for i in range(10)])
+
+    np.testing.assert_array_equal(out[:, 0], np.arange(10))
+    assert set(out[:, 1].astype(int).tolist()) == {os.getpid()}
+
+
+def test_parallel_embedder_reuses_its_worker_pool_across_calls():
+    embedder = ParallelEmbedder(_PidEmbedderFactory(), workers=2, batch_size=4)
+    try:
+        first = embedder.encode([f"chunk {i}" for i in range(40)], show_progress_bar=False)
+        pool = embedder._pool
+        second = embedder.encode([f"chunk {i}" for i in range(40, 80)], show_progress_bar=False)
+        assert embedder._pool is pool
+        worker_pids = set(pool._processes)
+    finally:
+        embedder.close()
+
+    assert embedder._pool is None
+    np.testing.assert_array_equal(np.concatenate([first, second])[:, 0], np.arange(80))
+    assert set(np.concatenate([first, second])[:, 1].astype(int).tolist()) <= worker_pids
+
+
+def test_parallel_embedder_keeps_using_its_pool_for_small_inputs():
+    embedder = ParallelEmbedder(_PidEmbedderFactory(), workers=2, batch_size=64, min_pool_texts=0)
+    try:
+        out = embedder.encode([f"chunk {i}" for i in range(10)], show_progress_bar=False)
+        assert embedder._pool is not None and embedder._local is None
+        worker_pids = set(embedder._pool._processes)
+        assert embedder.encode([], show_progress_bar=False).shape[0] == 0
+    finally:
+        embedder.close()
+
+    np.testing.assert_array_equal(out[:, 0], np.arange(10))
+    assert set(out[:, 1].astype(int).tolist()) <= worker_pids
+
+
+def test_parallel_embedder_drops_its_in_process_model_once_the_pool_starts():
+    embedder = ParallelEmbedder(_PidEmbedderFactory(), workers=2, batch_size=4)
+    try:
+        embedder.encode([f"chunk {i}" for i in range(3)], show_progress_bar=False)
+        assert embedder._local is not None and embedder._pool is None
+        embedder.encode([f"chunk {i}" for i in range(40)], show_progress_bar=False)
+        small = embedder.encode([f"chunk {i}" for i in range(3)], show_progress_bar=False)
+        assert embedder._local is None
+        assert os.getpid() not in set(small[:, 1].astype(int).tolist())
+    finally:
+        embedder.close()
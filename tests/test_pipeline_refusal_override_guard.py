@@ -211,3 +211,49 @@ def test_override_guard_no_citation_symbol_fallback_requires_symbol_in_evidence(
 
 
 
+
+
+def test_run_many_refuses_only_the_batch_item_whose_generation_failed() -> None:
+    from types import SimpleNamespace
+
+    from src.rag.pipeline import RAGPipeline
+
+    hit = _chunk("sqlite3", 0.8, "d1", text="sqlite3.connect opens a database connection.")
+
+    class _Retriever:
+        def retrieve_many(self, queries, *, top_k=None, trace=None, modules=None):
+            return [[hit] for _ in queries]
+
+        def known_modules(self):
+            return {"sqlite3"}
+
+        def expand_context(self, chunks, *, mode, window):
+            return list(chunks)
+
+    class _Generator:
+        def generate(self, query, chunks):
+            if "fail" in query:
+                raise RuntimeError("provider down")
+            return "Use sqlite3.connect [1]."
+
+    decision = SimpleNamespace(
+        decision="answer", confidence=0.9, top_score=0.8, second_score=0.0, margin=0.8, rationale="", used_chunks=[hit]
+    )
+    pipeline = RAGPipeline.__new__(RAGPipeline)
+    pipeline.cfg = SimpleNamespace(
+        retrieval=SimpleNamespace(top_k=5, module_filter=False, context_expansion="none", context_window=0)
+    )
+    pipeline.retriever = _Retriever()
+    pipeline.reranker = SimpleNamespace(enabled=False, strategy="off", should_rerank=lambda hits: False)
+    pipeline.gate = SimpleNamespace(decide=lambda hits, query: decision)
+    pipeline.generator = _Generator()
+
+    queries = ["how do I open a sqlite3 connection", "sqlite3 connect fail", "sqlite3 connection object"]
+    results = pipeline.run_many(queries, request_ids=["r-0", "r-1", "r-2"])
+
+    assert [r["type"] for r in results] == ["answer", "refuse", "answer"]
+    assert results[1]["meta"]["error"] == "Upstream generation provider error"
+    assert "error" not in results[0]["meta"]
+    assert all(r["meta"]["retrieval_batch_size"] == 3 for r in results)
+    # Later items waited on earlier generations; their totals include it.
+    assert results[2]["meta"]["latency_ms_total"] >= results[2]["meta"]["latency_ms_retrieval"]
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import numpy as np
+
+from src.embeddings.embedder import Embedder
+from src.embeddings.query_cache import QueryEmbeddingCache, normalize_query_text
+
+
+def _vec(x: float) -> np.ndarray:
+    return np.asarray([x, 1.0 - x], dtype=np.float32)
+
+
+def test_lru_evicts_least_recently_used_and_counts_hits() -> None:
+    cache = QueryEmbeddingCache(2)
+    cache.put(("m", "a"), _vec(0.1))
+    cache.put(("m", "b"), _vec(0.2))
+    assert cache.get(("m", "a")) is not None  # "a" is now most recent
+    cache.put(("m", "c"), _vec(0.3))
+
+    assert cache.get(("m", "b")) is None
+    assert cache.get(("other-model", "a")) is None
+    np.testing.assert_array_equal(cache.get(("m", "a")), _vec(0.1))
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert (stats["hits"], stats["misses"]) == (2, 2)
+
+
+def test_cache_round_trips_through_disk(tmp_path: Path) -> None:
+    cache = QueryEmbeddingCache(4)
+    cache.put(("m", "a"), _vec(0.1))
+    cache.put(("m", "b"), _vec(0.2))
+    path = tmp_path / "cache" / "query_embeddings.npz"
+    assert cache.save(path) == 2
+
+    reloaded = QueryEmbeddingCache(4)
+    assert reloaded.load(path) == 2
+    np.testing.assert_array_equal(reloaded.get(("m", "b")), _vec(0.2))
+
+
+def test_encode_queries_only_encodes_misses() -> None:
+    class FakeModel:
+        calls = []
+
+        def encode(self, texts, **kwargs):
+            FakeModel.calls.append(list(texts))
+            return np.asarray([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+    embedder = Embedder.__new__(Embedder)
+    embedder.model = FakeModel()
+    embedder.model_name = "fake"
+    embedder.model_id = "fake"
+    embedder.normalize = False
+    embedder.batch_size = 8
+    embedder.query_cache = QueryEmbeddingCache(8)
+    embedder.query_cache_path = None
+
+    first = embedder.encode_queries(["open  file", "sqlite3", "open file"])
+    second = embedder.encode_queries(["sqlite3", " open file "])
+
+    assert FakeModel.calls == [["open file", "sqlite3"]]
+    np.testing.assert_array_equal(first[0], first[2])
+    np.testing.assert_array_equal(second, first[[1, 0]])
+    assert normalize_query_text("  a\n b ") == "a b"
@@ -0,0 +1,81 @@
+import gc
+import threading
+import time
+from pathlib import Path
+
+from src.config import load_app_config
+from src.utils.registry import ResourceRegistry, stat_key
+
+
+class _Handle:
+    pass
+
+
+def test_get_shares_pinned_instances_per_key():
+    reg = ResourceRegistry()
+    loads = []
+
+    def factory():
+        loads.append(1)
+        return _Handle()
+
+    a = reg.get("model", "m1", factory)
+    b = reg.get("model", "m1", factory)
+    c = reg.get("model", "m2", factory)
+
+    assert a is b and a is not c and len(loads) == 2
+    assert reg.stats()["resources"]["model"]["hits"] == 1
+    assert reg.stats()["resources"]["model"]["live"] == 2
+
+
+def test_unpinned_entries_are_freed_with_their_last_user():
+    reg = ResourceRegistry()
+    a = reg.get("faiss_index", "v1", _Handle, pinned=False)
+    assert reg.get("faiss_index", "v1", _Handle, pinned=False) is a
+
+    del a
+    gc.collect()
+
+    assert reg.stats()["resources"]["faiss_index"]["live"] == 0
+    reg.get("faiss_index", "v1", _Handle, pinned=False)
+    assert reg.stats()["resources"]["faiss_index"]["loads"] == 2
+
+
+def test_concurrent_first_use_loads_once():
+    reg = ResourceRegistry()
+    loads = []
+
+    def slow():
+        loads.append(1)
+        time.sleep(0.05)
+        return _Handle()
+
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(reg.get("model", "m", slow))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(loads) == 1 and all(h is out[0] for h in out)
+
+
+def test_disabled_registry_always_calls_the_factory():
+    reg = ResourceRegistry()
+    reg.enabled = False
+    assert reg.get("model", "m", _Handle) is not reg.get("model", "m", _Handle)
+
+
+def test_config_is_parsed_once_per_file_version(tmp_path):
+    repo_root = Path(__file__).resolve().parents[1]
+    path = tmp_path / "config.yaml"
+    text = (repo_root / "config.yaml").read_text(encoding="utf-8")
+    path.write_text(text, encoding="utf-8")
+
+    first, _ = load_app_config(tmp_path)
+    assert load_app_config(tmp_path)[0] is first
+
+    key = stat_key(path)
+    path.write_text(text.replace("top_k: 5", "top_k: 12"), encoding="utf-8")
+    assert stat_key(path) != key
+    assert load_app_config(tmp_path)[0].retrieval.top_k == 12
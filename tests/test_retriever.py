@@ -1,7 +1,109 @@
 from pathlib import Path
+from typing import Dict, List
+import dataclasses
+import hashlib
 import math
+import re
+import shutil
+import threading
+import time
 
+import numpy as np
+import pytest
+import yaml
+
+from src.config import IndexConfig
+from src.retrieval.bm25_index import BM25Index, bm25_artifact_dir, tokenize_for_bm25
+from src.retrieval.faiss_store import FaissStore, rescore_vectors_path
+from src.retrieval.meta_store import write_meta_offsets
+from src.retrieval.neighbours import build_neighbour_table
 from src.retrieval.retriever import Retriever, RetrievedChunk
+from src.retrieval.shards import shards_dir, write_shards
+from src.retrieval.snapshots import publish_snapshot, snapshots_root, staging_dir
+from src.utils.jsonl import iter_jsonl, write_jsonl
+
+
+_TINY_DOCS = {
+    "pathlib": [
+        "pathlib.Path.joinpath joins path segments into a new path",
+        "pathlib.Path.exists checks whether a path exists on disk",
+    ],
+    "sqlite3": [
+        "sqlite3.connect opens a connection to an sqlite database file",
+        "sqlite3 cursor objects execute sql statements",
+    ],
+    "itertools": [
+        "itertools.chain links several iterables into one iterator",
+        "itertools.islice slices an iterator lazily",
+    ],
+}
+
+
+class _HashEmbedder:
+    """Bag-of-words hashing embedder so tests run without model downloads."""
+
+    dim = 64
+
+    def encode(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for tok in re.findall(r"[a-z0-9_]+", text.lower()):
+                out[row, int(hashlib.md5(tok.encode()).hexdigest(), 16) % self.dim] += 1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.clip(norms, 1e-12, None)
+
+
+def _tiny_repo(tmp_path: Path, *, retrieval=None, index=None) -> Path:
+    repo_root = Path(__file__).resolve().parents[1]
+    with (repo_root / "config.yaml").open("r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f)
+    cfg["retrieval"].update(retrieval or {})
+    cfg["index"].update(index or {})
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump(cfg), encoding="utf-8")
+
+    rows = []
+    for module, texts in _TINY_DOCS.items():
+        doc_id = f"py-stdlib:{module}.rst"
+        for i, text in enumerate(texts):
+            rows.append(
+                {
+                    "vector_id": len(rows),
+                    "chunk_id": f"{doc_id}#c{i:04d}",
+                    "doc_id": doc_id,
+                    "module": module,
+                    "text": text,
+                    "meta": {"source_path": f"data/raw/python_stdlib/{module}.rst", "heading": None},
+                    "start_char": i * 100,
+                    "end_char": i * 100 + len(text),
+                    "chunk_index": i,
+                }
+            )
+
+    vectors = _HashEmbedder().encode([r["text"] for r in rows])
+    store = FaissStore(vectors.shape[1], index_cfg=IndexConfig(**cfg["index"]))
+    store.add(vectors)
+    store.save(tmp_path / cfg["index"]["index_path"])
+    if cfg["index"].get("rescore", "none") != "none":
+        np.save(rescore_vectors_path(tmp_path / cfg["index"]["index_path"]), vectors.astype(cfg["index"]["rescore"]))
+
+    meta_path = tmp_path / cfg["index"]["meta_path"]
+    write_jsonl(meta_path, rows)
+    write_meta_offsets(meta_path)
+
+    bm25 = BM25Index.build(tokenize_for_bm25(r["text"]) for r in rows)
+    bm25.save(bm25_artifact_dir(tmp_path / cfg["index"]["index_path"]))
+
+    if int(cfg["index"].get("shards", 0)) > 1:
+        index_path = tmp_path / cfg["index"]["index_path"]
+        write_shards(
+            shards_dir(index_path),
+            vectors,
+            bm25,
+            n_shards=int(cfg["index"]["shards"]),
+            index_cfg=IndexConfig(**cfg["index"]),
+        )
+    return tmp_path
 
 
 def _fake_chunk(module: str, text: str, score: float, *, chunk_id: str | None = None) -> RetrievedChunk:
@@ -21,6 +123,35 @@ def _fake_chunk(module: str, text: str, score: float, *, chunk_id: str | None =
     )
 
 
+def _reference_rrf_fuse(
+    dense_hits: List[RetrievedChunk],
+    bm25_hits: List[RetrievedChunk],
+    *,
+    rrf_k: int,
+    dense_weight: float,
+    bm25_weight: float,
+) -> List[RetrievedChunk]:
+    """List-based RRF (the original implementation): the oracle for `Retriever._rrf_fuse_ids`."""
+    dense_rank = {h.chunk_id: i + 1 for i, h in enumerate(dense_hits)}
+    bm25_rank = {h.chunk_id: i + 1 for i, h in enumerate(bm25_hits)}
+    dense_score = {h.chunk_id: float(h.score) for h in dense_hits}
+
+    by_chunk_id: Dict[str, RetrievedChunk] = {}
+    for h in dense_hits + bm25_hits:
+        by_chunk_id.setdefault(h.chunk_id, h)
+
+    fused = []
+    for cid, h in by_chunk_id.items():
+        s = 0.0
+        if cid in dense_rank:
+            s += dense_weight * (1.0 / (rrf_k + dense_rank[cid]))
+        if cid in bm25_rank:
+            s += bm25_weight * (1.0 / (rrf_k + bm25_rank[cid]))
+        fused.append(dataclasses.replace(h, score=float(s)))
+    fused = sorted(fused, key=lambda x: float(x.score), reverse=True)
+    return [dataclasses.replace(h, score=dense_score.get(h.chunk_id, 0.0)) for h in fused]
+
+
 def test_retriever_topk_and_scores():
     repo_root = Path(__file__).resolve().parents[1]
     r = Retriever(repo_root)
@@ -51,64 +182,463 @@ def test_extract_symbol_mentions():
     assert symbols == ["itertools.chain"]
 
 
+class _RecordMeta:
+    """Meta store over a list of records indexed by vector_id."""
+
+    def __init__(self, records):
+        self.records = records
+
+    def text(self, vid):
+        return self.records[vid]["text"]
+
+    def heading(self, vid):
+        return (self.records[vid].get("meta") or {}).get("heading")
+
+    def module(self, vid):
+        return self.records[vid]["module"]
+
+
+def _symbol_reranker(records, *, symbol_index_rerank=False):
+    from src.retrieval.symbol_index import SymbolIndex
+
+    retriever = Retriever.__new__(Retriever)
+    retriever.meta_store = _RecordMeta(records)
+    retriever.symbol_index_rerank = symbol_index_rerank
+    retriever._symbols = SymbolIndex.build(records)
+    return retriever
+
+
 def test_symbol_rerank_prefers_symbol_hit_even_if_raw_score_lower():
-    hits = [
-        _fake_chunk("collections", "collections.Counter counts frequencies", 0.62),
-        _fake_chunk("itertools", "itertools.chain links iterables", 0.58),
-    ]
+    retriever = _symbol_reranker(
+        [
+            {"vector_id": 0, "module": "collections", "text": "collections.Counter counts frequencies"},
+            {"vector_id": 1, "module": "itertools", "text": "itertools.chain links iterables"},
+        ]
+    )
 
-    ranked = Retriever._symbol_rerank(hits, "What practical job does itertools.chain solve?")
+    ids, scores = retriever._symbol_rerank_ids(
+        np.array([0, 1], dtype=np.int64),
+        np.array([0.62, 0.58], dtype=np.float32),
+        "What practical job does itertools.chain solve?",
+    )
 
-    assert ranked[0].module == "itertools"
+    assert ids.tolist() == [1, 0]
+    assert scores.tolist() == pytest.approx([0.58, 0.62])
 
 
-def test_rrf_fuse_prefers_items_present_in_both_rankers():
-    dense_hits = [
-        _fake_chunk("collections", "collections.Counter counts frequencies", 0.91, chunk_id="shared"),
-        _fake_chunk("itertools", "itertools.chain links iterables", 0.89, chunk_id="dense_only"),
-    ]
+def test_rrf_fuse_ids_prefers_items_present_in_both_rankers():
+    ids, scores = Retriever._rrf_fuse_ids(
+        np.array([10, 11], dtype=np.int64),
+        np.array([0.91, 0.89], dtype=np.float32),
+        np.array([12, 10], dtype=np.int64),
+        np.array([8.0, 7.5], dtype=np.float32),
+        rrf_k=60,
+        dense_weight=1.0,
+        bm25_weight=1.0,
+    )
 
-    bm25_hits = [
-        _fake_chunk("itertools", "itertools.chain links iterables", 8.0, chunk_id="bm25_only"),
-        _fake_chunk("collections", "collections.Counter counts frequencies", 7.5, chunk_id="shared"),
-    ]
+    assert ids[0] == 10
+    # Scores stay on the dense scale; BM25-only hits score 0.0.
+    assert dict(zip(ids.tolist(), scores.tolist())) == pytest.approx({10: 0.91, 11: 0.89, 12: 0.0})
+
+
+def test_rrf_fuse_ids_respects_channel_weights():
+    legs = (
+        np.array([20, 21], dtype=np.int64),
+        np.array([0.91, 0.89], dtype=np.float32),
+        np.array([22, 23], dtype=np.int64),
+        np.array([8.0, 7.5], dtype=np.float32),
+    )
+
+    dense_weighted, _ = Retriever._rrf_fuse_ids(*legs, rrf_k=60, dense_weight=2.0, bm25_weight=0.2)
+    bm25_weighted, _ = Retriever._rrf_fuse_ids(*legs, rrf_k=60, dense_weight=0.2, bm25_weight=2.0)
+
+    assert dense_weighted[0] == 20
+    assert bm25_weighted[0] == 22
+
+
+def test_tiny_repo_dense_retrieval_with_mmap_matches_eager_loading(tmp_path):
+    eager = Retriever(_tiny_repo(tmp_path / "eager"), embedder=_HashEmbedder())
+    mapped = Retriever(_tiny_repo(tmp_path / "mmap", index={"mmap": True}), embedder=_HashEmbedder())
+
+    q = "how do I open an sqlite3 connection"
+    eager_hits = eager.retrieve(q, top_k=3)
+    mapped_hits = mapped.retrieve(q, top_k=3)
+
+    assert eager_hits[0].module == "sqlite3"
+    assert [h.chunk_id for h in mapped_hits] == [h.chunk_id for h in eager_hits]
+    assert [h.text for h in mapped_hits] == [h.text for h in eager_hits]
+
+
+def test_retrieve_hydrates_only_returned_hits(tmp_path, monkeypatch):
+    r = Retriever(_tiny_repo(tmp_path, retrieval={"mode": "hybrid"}), embedder=_HashEmbedder())
+    calls = []
+    original = r._to_retrieved_chunk
 
-    fused = Retriever._rrf_fuse(
-        dense_hits,
-        bm25_hits,
+    def counting(**kwargs):
+        calls.append(kwargs["vector_id"])
+        return original(**kwargs)
+
+    monkeypatch.setattr(r, "_to_retrieved_chunk", counting)
+
+    hits = r.retrieve("what does itertools.chain do", top_k=2)
+
+    assert len(hits) == 2
+    assert len(calls) == 2
+    assert hits[0].module == "itertools"
+
+
+def test_rrf_fuse_ids_matches_chunk_based_fusion(tmp_path):
+    r = Retriever(_tiny_repo(tmp_path, retrieval={"mode": "hybrid"}), embedder=_HashEmbedder())
+    q = "sqlite3 connect to a database path"
+
+    dense_ids, dense_scores = r._dense_search(q, fetch_k=4)
+    bm25_ids, bm25_scores = r._bm25_search(q, fetch_k=4)
+    ids, scores = Retriever._rrf_fuse_ids(
+        dense_ids, dense_scores, bm25_ids, bm25_scores, rrf_k=60, dense_weight=1.0, bm25_weight=1.0
+    )
+    expected = _reference_rrf_fuse(
+        r._hydrate(dense_ids, dense_scores),
+        r._hydrate(bm25_ids, bm25_scores),
         rrf_k=60,
         dense_weight=1.0,
         bm25_weight=1.0,
     )
 
-    assert fused[0].chunk_id == "shared"
+    assert [int(v) for v in ids] == [h.vector_id for h in expected]
+    assert [float(s) for s in scores] == [h.score for h in expected]
 
 
-def test_rrf_fuse_respects_channel_weights():
-    dense_hits = [
-        _fake_chunk("collections", "collections.Counter counts frequencies", 0.91, chunk_id="dense_best"),
-        _fake_chunk("itertools", "itertools.chain links iterables", 0.89, chunk_id="dense_second"),
-    ]
+def test_bm25_mode_loads_persisted_artifact_without_rebuilding(tmp_path, monkeypatch):
+    repo = _tiny_repo(tmp_path, retrieval={"mode": "bm25"})
+
+    def fail_build(*args, **kwargs):
+        raise AssertionError("BM25 should be loaded from the build artifact")
+
+    monkeypatch.setattr(BM25Index, "build", fail_build)
+    r = Retriever(repo)
+
+    hits = r.retrieve("sqlite3 connect database", top_k=2)
+    assert hits[0].module == "sqlite3"
+
+
+def test_retrieve_many_matches_single_query_retrieval(tmp_path):
+    class CountingEmbedder(_HashEmbedder):
+        calls = 0
+
+        def encode(self, texts):
+            CountingEmbedder.calls += 1
+            return super().encode(texts)
+
+    r = Retriever(_tiny_repo(tmp_path, retrieval={"mode": "hybrid"}), embedder=CountingEmbedder())
+    queries = ["open an sqlite3 connection", "what does itertools.chain do", "pathlib join", "islice iterator"]
+
+    batched = r.retrieve_many(queries, top_k=3)
+    assert CountingEmbedder.calls == 1
 
-    bm25_hits = [
-        _fake_chunk("itertools", "itertools.chain links iterables", 8.0, chunk_id="bm25_best"),
-        _fake_chunk("collections", "collections.Counter counts frequencies", 7.5, chunk_id="bm25_second"),
+    singles = [r.retrieve(q, top_k=3) for q in queries]
+    assert [[(h.chunk_id, h.score) for h in hits] for hits in batched] == [
+        [(h.chunk_id, h.score) for h in hits] for hits in singles
     ]
 
-    dense_weighted = Retriever._rrf_fuse(
-        dense_hits,
-        bm25_hits,
-        rrf_k=60,
-        dense_weight=2.0,
-        bm25_weight=0.2,
+
+def test_parallel_hybrid_matches_sequential_and_reports_leg_timings(tmp_path):
+    sequential = Retriever(_tiny_repo(tmp_path / "seq", retrieval={"mode": "hybrid"}), embedder=_HashEmbedder())
+    parallel = Retriever(
+        _tiny_repo(tmp_path / "par", retrieval={"mode": "hybrid", "parallel_hybrid": True}),
+        embedder=_HashEmbedder(),
     )
-    bm25_weighted = Retriever._rrf_fuse(
-        dense_hits,
-        bm25_hits,
-        rrf_k=60,
-        dense_weight=0.2,
-        bm25_weight=2.0,
+    try:
+        trace = {}
+        hits = parallel.retrieve("what does itertools.chain do", top_k=3, trace=trace)
+        expected = sequential.retrieve("what does itertools.chain do", top_k=3)
+        assert [(h.chunk_id, h.score) for h in hits] == [(h.chunk_id, h.score) for h in expected]
+        assert trace["latency_ms_dense"] >= 0.0 and trace["latency_ms_bm25"] >= 0.0
+        assert trace["bm25_deadline_missed"] is False
+    finally:
+        parallel.close()
+
+
+def test_bm25_deadline_miss_falls_back_to_dense_only(tmp_path):
+    retrieval = {"mode": "hybrid", "parallel_hybrid": True, "bm25_deadline_ms": 20}
+    hybrid = Retriever(_tiny_repo(tmp_path / "hybrid", retrieval=retrieval), embedder=_HashEmbedder())
+    dense = Retriever(_tiny_repo(tmp_path / "dense", retrieval={"mode": "dense"}), embedder=_HashEmbedder())
+
+    release = threading.Event()
+    search = hybrid._bm25_search
+
+    def slow_bm25_search(query, **kwargs):
+        release.wait(5)
+        return search(query, **kwargs)
+
+    hybrid._bm25_search = slow_bm25_search
+    try:
+        trace = {}
+        hits = hybrid.retrieve("open an sqlite3 connection", top_k=3, trace=trace)
+        assert trace["bm25_deadline_missed"] is True
+        assert "latency_ms_bm25" not in trace
+        expected = dense.retrieve("open an sqlite3 connection", top_k=3)
+        assert [(h.chunk_id, h.score) for h in hits] == [(h.chunk_id, h.score) for h in expected]
+    finally:
+        release.set()
+        hybrid.close()
+
+
+def test_module_filter_restricts_both_legs_to_the_module(tmp_path):
+    r = Retriever(_tiny_repo(tmp_path, retrieval={"mode": "hybrid"}), embedder=_HashEmbedder())
+    assert r.known_modules() == set(_TINY_DOCS)
+
+    hits = r.retrieve("open an sqlite3 connection", top_k=4, modules=["pathlib"])
+    assert hits and {h.module for h in hits} == {"pathlib"}
+
+    # Unknown modules are ignored rather than filtering everything out.
+    unfiltered = r.retrieve("open an sqlite3 connection", top_k=4)
+    ignored = r.retrieve("open an sqlite3 connection", top_k=4, modules=["not_a_module"])
+    assert [h.chunk_id for h in ignored] == [h.chunk_id for h in unfiltered]
+
+
+def test_pinned_definition_ids_are_added_to_both_legs_with_their_own_scores(tmp_path):
+    r = Retriever(_tiny_repo(tmp_path, retrieval={"mode": "hybrid"}), embedder=_HashEmbedder())
+    query = "what does itertools.islice do"
+    pinned = np.array([0], dtype=np.int64)  # a pathlib chunk dense/BM25 would not pick at k=1
+
+    base_ids, _ = r._dense_search_many([query], [1])[0]
+    ids, scores = r._dense_search_many([query], [1], None, [pinned])[0]
+    all_ids, all_scores = r._dense_search_many([query], [len(_TINY_DOCS) * 2])[0]
+    assert 0 not in base_ids.tolist() and 0 in ids.tolist()
+    assert scores[ids.tolist().index(0)] == all_scores[all_ids.tolist().index(0)]
+    assert np.all(np.diff(scores) <= 0)
+
+    bm25_ids, _ = r._bm25_search("islice iterator joins", fetch_k=1, pinned=pinned)
+    assert 0 in bm25_ids.tolist()
+
+
+def test_sharded_retrieval_matches_single_index(tmp_path):
+    retrieval = {"mode": "hybrid", "symbol_definitions": True}
+    single = Retriever(_tiny_repo(tmp_path / "single", retrieval=retrieval), embedder=_HashEmbedder())
+    sharded = Retriever(
+        _tiny_repo(tmp_path / "sharded", retrieval=retrieval, index={"shards": 3}),
+        embedder=_HashEmbedder(),
+    )
+    try:
+        assert sharded.index is None and sharded._bm25 is None
+        queries = [
+            "how do I open an sqlite3 connection",
+            "what does itertools.islice do",
+            "join path segments with pathlib",
+        ]
+        for modules in (None, [None, ["itertools"], ["pathlib", "sqlite3"]]):
+            expected = single.retrieve_many(queries, top_k=4, modules=modules)
+            got = sharded.retrieve_many(queries, top_k=4, modules=modules)
+            for exp_hits, got_hits in zip(expected, got):
+                assert [(h.vector_id, h.score) for h in got_hits] == [(h.vector_id, h.score) for h in exp_hits]
+
+        pinned = np.array([0], dtype=np.int64)
+        for leg in ("_dense_search_many", "_bm25_search_many"):
+            exp_ids, exp_scores = getattr(single, leg)(["islice iterator joins"], [1], None, [pinned])[0]
+            ids, scores = getattr(sharded, leg)(["islice iterator joins"], [1], None, [pinned])[0]
+            assert ids.tolist() == exp_ids.tolist()
+            np.testing.assert_array_equal(scores, exp_scores)
+    finally:
+        sharded.close()
+
+
+def test_sharded_searcher_failing_validation_leaves_no_worker_processes(tmp_path):
+    import json
+    import multiprocessing
+
+    from src.retrieval.shards import ShardedSearcher
+
+    repo = _tiny_repo(tmp_path, index={"shards": 2})
+    out_dir = shards_dir(repo / "indexes" / "faiss.index")
+    layout_path = out_dir / "shards.json"
+    layout = json.loads(layout_path.read_text(encoding="utf-8"))
+    before = set(multiprocessing.active_children())
+
+    layout["shards"][0]["end"] = int(layout["shards"][0]["end"]) + 1
+    layout_path.write_text(json.dumps(layout), encoding="utf-8")
+    with pytest.raises(ValueError, match="expected"):
+        ShardedSearcher(out_dir, IndexConfig(index_path="indexes/faiss.index", meta_path="indexes/meta.jsonl"))
+    assert set(multiprocessing.active_children()) <= before
+
+    (out_dir / layout["shards"][1]["dir"] / "faiss.index").unlink()
+    with pytest.raises(FileNotFoundError):
+        ShardedSearcher(out_dir, IndexConfig(index_path="indexes/faiss.index", meta_path="indexes/meta.jsonl"))
+    assert set(multiprocessing.active_children()) <= before
+
+
+def test_sq8_storage_with_exact_rescoring_restores_float32_scores(tmp_path):
+    exact = Retriever(_tiny_repo(tmp_path / "exact"), embedder=_HashEmbedder())
+    sq8 = Retriever(_tiny_repo(tmp_path / "sq8", index={"storage": "sq8"}), embedder=_HashEmbedder())
+    rescored = Retriever(
+        _tiny_repo(tmp_path / "rescored", index={"storage": "sq8", "rescore": "float32", "rescore_factor": 3}),
+        embedder=_HashEmbedder(),
     )
 
-    assert dense_weighted[0].chunk_id == "dense_best"
-    assert bm25_weighted[0].chunk_id == "bm25_best"
+    for q in ("how do I open an sqlite3 connection", "what does itertools.islice do"):
+        expected = exact.retrieve(q, top_k=2)
+        approx = sq8.retrieve(q, top_k=2)
+        got = rescored.retrieve(q, top_k=2)
+        assert approx[0].score != expected[0].score
+        assert [h.vector_id for h in got] == [h.vector_id for h in expected]
+        np.testing.assert_allclose([h.score for h in got], [h.score for h in expected], rtol=0, atol=1e-6)
+
+
+def test_neighbour_table_links_chunks_within_each_doc():
+    records = [
+        {"vector_id": 0, "doc_id": "a", "chunk_index": 1},
+        {"vector_id": 1, "doc_id": "b", "chunk_index": 0},
+        {"vector_id": 2, "doc_id": "a", "chunk_index": 0},
+        {"vector_id": 3, "doc_id": "a", "chunk_index": 3},  # chunk 2 folded away by dedup
+    ]
+    assert build_neighbour_table(records).tolist() == [[2, 3], [-1, -1], [-1, 0], [0, -1]]
+
+
+def test_expand_context_adds_adjacent_chunks_and_merges_overlapping_spans(tmp_path):
+    repo = _tiny_repo(tmp_path)
+    r = Retriever(repo, embedder=_HashEmbedder())
+    hits = r._hydrate(np.array([4, 0]), np.array([0.9, 0.5], dtype=np.float32))  # itertools c0, pathlib c0
+
+    adjacent = r.expand_context(hits, mode="adjacent")
+    assert [c.vector_id for c in adjacent] == [4, 5, 0, 1]
+    assert adjacent[1].meta["context_for"] == hits[0].chunk_id and adjacent[1].score == hits[0].score
+
+    # Tiny-repo chunks do not touch, so there is nothing to merge.
+    assert r.expand_context(hits, mode="merged") == hits
+
+    # Rewrite the itertools doc as two chunks overlapping by 10 characters.
+    doc = "itertools.chain links several iterables into one iterator; itertools.islice slices lazily"
+    meta_path = repo / r.cfg.index.meta_path
+    rows = list(iter_jsonl(meta_path))
+    rows[4].update(text=doc[:50], start_char=0, end_char=50)
+    rows[5].update(text=doc[40:], start_char=40, end_char=len(doc))
+    write_jsonl(meta_path, rows)
+    write_meta_offsets(meta_path)
+    r = Retriever(repo, embedder=_HashEmbedder())
+    hits = r._hydrate(np.array([5, 4]), np.array([0.9, 0.5], dtype=np.float32))
+
+    merged = r.expand_context(hits, mode="merged")
+    assert len(merged) == 1
+    assert merged[0].text == doc
+    assert (merged[0].start_char, merged[0].end_char, merged[0].vector_id) == (0, len(doc), 5)
+    assert merged[0].meta["merged_chunk_ids"] == [rows[4]["chunk_id"], rows[5]["chunk_id"]]
+
+
+def test_mode_argument_overrides_configured_mode(tmp_path):
+    repo = _tiny_repo(tmp_path, retrieval={"mode": "dense"})
+    r = Retriever(repo, embedder=_HashEmbedder(), mode="bm25")
+
+    assert r.mode == "bm25" and r._bm25 is not None
+    hits = r.retrieve("sqlite3 connection", top_k=1)
+    assert hits[0].module == "sqlite3"
+
+
+def test_snapshot_mode_reads_the_current_or_pinned_snapshot(tmp_path):
+    repo = _tiny_repo(tmp_path, index={"snapshots": True})
+    indexes = repo / "indexes"
+    root = snapshots_root(indexes / "faiss.index")
+    for snapshot_id in ("20260101T000000Z-aaaaaa", "20260102T000000Z-bbbbbb"):
+        staging = staging_dir(root, snapshot_id)
+        shutil.copytree(indexes, staging, ignore=shutil.ignore_patterns("snapshots"))
+        publish_snapshot(root, snapshot_id, staging, info={})
+
+    current = Retriever(repo, embedder=_HashEmbedder())
+    pinned = Retriever(repo, embedder=_HashEmbedder(), snapshot_id="20260101T000000Z-aaaaaa")
+
+    assert current.snapshot_id == "20260102T000000Z-bbbbbb"
+    assert pinned.snapshot_id == "20260101T000000Z-aaaaaa"
+    assert current.retrieve("sqlite3 connection", top_k=1)[0].module == "sqlite3"
+
+
+def test_rrf_fuse_ids_matches_chunk_based_fusion_on_random_legs():
+    rng = np.random.default_rng(7)
+    for trial in range(50):
+        pool = rng.permutation(40)
+        dense_ids = pool[: rng.integers(0, 15)].astype(np.int64)
+        # Overlapping BM25 leg; equal weights and ranks produce exact RRF ties.
+        bm25_ids = rng.permutation(pool[5:30])[: rng.integers(0, 15)].astype(np.int64)
+        dense_scores = np.sort(rng.random(dense_ids.size).astype(np.float32))[::-1]
+        bm25_scores = np.sort(rng.random(bm25_ids.size).astype(np.float32))[::-1]
+        weights = {"dense_weight": 1.0, "bm25_weight": 1.0} if trial % 2 else {"dense_weight": 0.7, "bm25_weight": 1.3}
+
+        ids, scores = Retriever._rrf_fuse_ids(dense_ids, dense_scores, bm25_ids, bm25_scores, rrf_k=60, **weights)
+        expected = _reference_rrf_fuse(
+            [_fake_chunk("m", "", float(s), chunk_id=str(v)) for v, s in zip(dense_ids, dense_scores)],
+            [_fake_chunk("m", "", float(s), chunk_id=str(v)) for v, s in zip(bm25_ids, bm25_scores)],
+            rrf_k=60,
+            **weights,
+        )
+
+        assert [str(v) for v in ids] == [h.chunk_id for h in expected]
+        assert [float(s) for s in scores] == [h.score for h in expected]
+
+
+def test_retrievers_on_one_index_share_faiss_and_bm25_handles(tmp_path):
+    repo = _tiny_repo(tmp_path, retrieval={"mode": "hybrid"})
+    first = Retriever(repo, embedder=_HashEmbedder())
+    second = Retriever(repo, embedder=_HashEmbedder())
+
+    assert first.index is second.index and first._bm25 is second._bm25
+    assert first.cfg is second.cfg
+
+
+def test_overdue_bm25_legs_are_bounded_by_skipping_new_ones(tmp_path):
+    retrieval = {"mode": "hybrid", "parallel_hybrid": True, "bm25_deadline_ms": 20, "bm25_workers": 1}
+    hybrid = Retriever(_tiny_repo(tmp_path, retrieval=retrieval), embedder=_HashEmbedder())
+
+    release = threading.Event()
+    search = hybrid._bm25_search
+    calls = []
+
+    def slow_bm25_search(query, **kwargs):
+        calls.append(query)
+        release.wait(5)
+        return search(query, **kwargs)
+
+    hybrid._bm25_search = slow_bm25_search
+    try:
+        first, second = {}, {}
+        hybrid.retrieve("open an sqlite3 connection", top_k=3, trace=first)
+        hybrid.retrieve("open an sqlite3 connection", top_k=3, trace=second)
+        assert first["bm25_deadline_missed"] and not first["bm25_skipped"]
+        assert second["bm25_skipped"] is True and second["bm25_overdue"] == 1
+        assert len(calls) == 1
+
+        release.set()
+        for _ in range(100):
+            if not hybrid._bm25_overdue:
+                break
+            time.sleep(0.01)
+        third = {}
+        hybrid.retrieve("open an sqlite3 connection", top_k=3, trace=third)
+        assert third["bm25_skipped"] is False and hybrid.bm25_overdue_total == 1
+    finally:
+        release.set()
+        hybrid.close()
+
+
+def test_symbol_index_rerank_counts_whole_pairs_and_definitions_as_mentions():
+    records = [
+        {"vector_id": 0, "module": "pickle", "text": "unlike ajson.dumps, pickle.dumps serializes objects"},
+        {"vector_id": 1, "module": "json", "text": ".. function:: dumps(obj)\n\n   Serialize obj."},
+        {"vector_id": 2, "module": "pickle", "text": "see json.dumps for text output"},
+        {"vector_id": 3, "module": "os", "text": "nothing relevant"},
+    ]
+    ids = np.array([3, 0, 2, 1], dtype=np.int64)
+    scores = np.array([0.50, 0.45, 0.44, 0.40], dtype=np.float32)
+    query = "what does json.dumps return"
+
+    # Default: substring mentions of the text. 0 (0.53) and 2 (0.52) get the
+    # mention bonus; 1 only the module bonus (0.43).
+    default_ids, _ = _symbol_reranker(records)._symbol_rerank_ids(ids, scores, query)
+    assert default_ids.tolist() == [0, 2, 3, 1]
+
+    retriever = _symbol_reranker(records, symbol_index_rerank=True)
+    out_ids, out_scores = retriever._symbol_rerank_ids(ids, scores, query)
+
+    # 2: whole-pair text mention (+0.08) -> 0.52.
+    # 1: the definition counts as a mention (+0.08), module json (+0.03) -> 0.51.
+    # 0: "ajson.dumps" is no mention of json.dumps (a substring match would
+    #    have lifted it to 0.53) -> stays at 0.45, below 3.
+    assert out_ids.tolist() == [2, 1, 3, 0]
+    assert sorted(out_scores.tolist()) == sorted(scores.tolist())
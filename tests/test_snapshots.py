@@ -0,0 +1,163 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from src.api.hot_swap import SnapshotSwapper
+from src.config import IndexConfig
+from src.retrieval.snapshots import (
+    current_snapshot_id,
+    list_snapshots,
+    load_snapshot_info,
+    prune_snapshots,
+    publish_snapshot,
+    resolve_index_paths,
+    snapshots_root,
+    staging_dir,
+)
+
+
+def _publish(root: Path, snapshot_id: str, payload: str = "x") -> Path:
+    staging = staging_dir(root, snapshot_id)
+    staging.mkdir(parents=True)
+    (staging / "faiss.index").write_text(payload, encoding="utf-8")
+    return publish_snapshot(root, snapshot_id, staging, info={"n_vectors": 1})
+
+
+def test_publish_renames_staging_and_moves_current(tmp_path):
+    root = snapshots_root(tmp_path / "indexes" / "faiss.index")
+    staging = staging_dir(root, "20260101T000000Z-aaaaaa")
+    staging.mkdir(parents=True)
+    (staging / "faiss.index").write_text("abc", encoding="utf-8")
+    assert list_snapshots(root) == []  # staging dirs are never listed
+
+    final = publish_snapshot(root, "20260101T000000Z-aaaaaa", staging, info={"n_vectors": 3})
+
+    assert not staging.exists() and final == root / "20260101T000000Z-aaaaaa"
+    assert current_snapshot_id(root) == "20260101T000000Z-aaaaaa"
+    info = load_snapshot_info(root, "20260101T000000Z-aaaaaa")
+    assert info["n_vectors"] == 3 and info["files"] == {"faiss.index": 3}
+
+
+def test_prune_keeps_newest_and_current(tmp_path):
+    root = tmp_path / "snapshots"
+    for i in range(4):
+        _publish(root, f"2026010{i + 1}T000000Z-000000")
+    # Roll CURRENT back to the oldest snapshot; pruning must not delete it.
+    (root / "CURRENT").write_text("20260101T000000Z-000000\n", encoding="utf-8")
+
+    removed = prune_snapshots(root, keep=2)
+
+    assert removed == ["20260102T000000Z-000000"]
+    assert list_snapshots(root) == [
+        "20260101T000000Z-000000",
+        "20260103T000000Z-000000",
+        "20260104T000000Z-000000",
+    ]
+
+
+def test_resolve_index_paths(tmp_path):
+    cfg = IndexConfig(index_path="indexes/faiss.index", meta_path="indexes/meta.jsonl")
+    assert resolve_index_paths(tmp_path, cfg)[2] is None
+
+    snap_cfg = cfg.model_copy(update={"snapshots": True})
+    with pytest.raises(FileNotFoundError):
+        resolve_index_paths(tmp_path, snap_cfg)
+
+    root = tmp_path / "indexes" / "snapshots"
+    _publish(root, "20260101T000000Z-aaaaaa")
+    index_path, meta_path, snapshot_id = resolve_index_paths(tmp_path, snap_cfg)
+    assert snapshot_id == "20260101T000000Z-aaaaaa"
+    assert index_path == root / snapshot_id / "faiss.index"
+    assert meta_path == root / snapshot_id / "meta.jsonl"
+
+
+class _FakeRetriever:
+    def __init__(self, snapshot_id):
+        self.snapshot_id = snapshot_id
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_swapper_loads_current_in_background_and_retires_old_pipeline(tmp_path):
+    root = tmp_path / "snapshots"
+    _publish(root, "20260101T000000Z-aaaaaa")
+    old = SimpleNamespace(retriever=_FakeRetriever("20260101T000000Z-aaaaaa"))
+    state = SimpleNamespace(pipeline=old)
+    swapper = SnapshotSwapper(state, root, lambda sid: SimpleNamespace(retriever=_FakeRetriever(sid)))
+
+    assert swapper.check() is None  # already serving CURRENT
+
+    _publish(root, "20260102T000000Z-bbbbbb")
+    assert swapper.check() == "20260102T000000Z-bbbbbb"
+    swapper.wait(timeout=5)
+
+    assert state.pipeline.retriever.snapshot_id == "20260102T000000Z-bbbbbb"
+    assert old.retriever.closed
+    status = swapper.status()
+    assert status["active"] == status["current"] == "20260102T000000Z-bbbbbb"
+    assert status["swaps"] == 1 and status["last_swap"]["from"] == "20260101T000000Z-aaaaaa"
+
+
+def test_swapper_closes_the_old_pipeline_only_after_its_last_lease(tmp_path):
+    root = tmp_path / "snapshots"
+    old = SimpleNamespace(retriever=_FakeRetriever("20260101T000000Z-aaaaaa"))
+    state = SimpleNamespace(pipeline=old)
+    swapper = SnapshotSwapper(state, root, lambda sid: SimpleNamespace(retriever=_FakeRetriever(sid)))
+
+    with swapper.lease() as first, swapper.lease() as second:
+        assert first is second is old
+        _publish(root, "20260102T000000Z-bbbbbb")
+        swapper.check()
+        swapper.wait(timeout=5)
+        assert not old.retriever.closed  # two requests still searching the old index
+        with swapper.lease() as fresh:
+            assert fresh.retriever.snapshot_id == "20260102T000000Z-bbbbbb"
+        assert swapper.status()["in_flight"] == 2 and swapper.status()["retiring"] == 1
+    assert old.retriever.closed and not state.pipeline.retriever.closed
+    assert swapper.status()["in_flight"] == 0 and swapper.status()["retiring"] == 0
+
+
+def test_swapper_keeps_serving_when_a_snapshot_fails_to_load(tmp_path):
+    root = tmp_path / "snapshots"
+    _publish(root, "20260102T000000Z-bbbbbb")
+    old = SimpleNamespace(retriever=_FakeRetriever("20260101T000000Z-aaaaaa"))
+    state = SimpleNamespace(pipeline=old)
+
+    def broken(sid):
+        raise FileNotFoundError(f"FAISS index not found in {sid}")
+
+    swapper = SnapshotSwapper(state, root, broken)
+    swapper.check()
+    swapper.wait(timeout=5)
+
+    assert state.pipeline is old and not old.retriever.closed
+    assert "20260102T000000Z-bbbbbb" in swapper.status()["last_error"]
+
+
+def test_swapper_does_not_retry_a_failed_snapshot_until_current_moves(tmp_path):
+    root = tmp_path / "snapshots"
+    _publish(root, "20260102T000000Z-bbbbbb")
+    state = SimpleNamespace(pipeline=SimpleNamespace(retriever=_FakeRetriever("20260101T000000Z-aaaaaa")))
+    attempts = []
+
+    def factory(sid):
+        attempts.append(sid)
+        if sid.endswith("bbbbbb"):
+            raise FileNotFoundError(f"FAISS index not found in {sid}")
+        return SimpleNamespace(retriever=_FakeRetriever(sid))
+
+    swapper = SnapshotSwapper(state, root, factory)
+    swapper.check()
+    swapper.wait(timeout=5)
+    assert swapper.check() is None  # polling skips the failed snapshot
+    assert swapper.status()["failed"] == "20260102T000000Z-bbbbbb"
+    assert attempts == ["20260102T000000Z-bbbbbb"]
+
+    _publish(root, "20260103T000000Z-cccccc")
+    assert swapper.check() == "20260103T000000Z-cccccc"
+    swapper.wait(timeout=5)
+    assert state.pipeline.retriever.snapshot_id == "20260103T000000Z-cccccc"
+    assert swapper.status()["failed"] is None
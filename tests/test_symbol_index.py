@@ -0,0 +1,48 @@
+import numpy as np
+
+from src.retrieval.symbol_index import SymbolIndex, extract_chunk_symbols
+
+
+_JSON_CHUNK = """
+.. function:: dumps(obj, *, skipkeys=False)
+
+   Serialize *obj* to a JSON formatted str. See also json.loads.
+
+.. class:: JSONDecoder(*, object_hook=None)
+
+   .. method:: decode(s)
+
+      Return the Python representation of *s*.
+
+.. function:: load(fp)
+"""
+
+
+def test_extracts_qualified_directives_and_dotted_mentions():
+    mentions, definitions = extract_chunk_symbols(_JSON_CHUNK, "Basic Usage", "json")
+
+    assert {"json.dumps", "json.jsondecoder", "json.jsondecoder.decode", "json.load"} <= definitions
+    # Nested members are qualified by their enclosing class; the dedented
+    # function after the class is not.
+    assert "jsondecoder.decode" in definitions
+    assert "json.jsondecoder.load" not in definitions
+    assert {"json.loads", "json.dumps", "jsondecoder.decode"} <= mentions
+
+
+def test_build_save_load_and_lookups(tmp_path):
+    records = [
+        {"vector_id": 0, "module": "json", "text": _JSON_CHUNK, "meta": {"heading": None}},
+        {"vector_id": 1, "module": "json", "text": "Prefer json.dumps for strings.", "meta": {}},
+        {"vector_id": 2, "module": "pathlib", "text": "pathlib.Path.exists checks a path", "meta": {}},
+    ]
+    index = SymbolIndex.build(records)
+    path = tmp_path / "symbols.json"
+    index.save(path)
+    loaded = SymbolIndex.load(path)
+
+    assert loaded.mentioned_in("json.dumps", 1)
+    assert loaded.mentioned_in("pathlib.path", 2) and loaded.mentioned_in("path.exists", 2)
+    assert not loaded.mentioned_in("json.dumps", 2)
+    assert loaded.definition_ids(["json.dumps"]).tolist() == [0]
+    assert loaded.definition_ids(["os.path"]).size == 0
+    np.testing.assert_array_equal(loaded.definitions["json.load"], index.definitions["json.load"])